@@ -0,0 +1,213 @@
+"""Batch position analysis on a process pool.
+
+Jobs are positions, either FEN lines or every ply of a set of games.
+Each job is searched on a worker process under its own time, depth and
+node limits, and results are yielded as they finish (not in input
+order), ready to be written out as NDJSON. Only a small window of jobs
+is in flight at a time, so inputs of any size stream in constant memory.
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from engine import Position, Searcher, Tablebases, IllegalMoveError, MATE_SCORE, move_to_uci
+from engine.search import MATE_BOUND, MAX_DEPTH
+from pgn import PgnReader
+
+DEFAULT_MOVETIME = 1.0  # seconds per position when no other limit is given
+WINDOW_PER_WORKER = 4   # jobs queued per worker process
+
+_searcher = None  # the Searcher owned by a worker process
+
+
+def _make_searcher(hash_mb, tb_path):
+    tablebases = Tablebases(tb_path) if tb_path and os.path.isdir(tb_path) else None
+    return Searcher(hash_mb=hash_mb, tablebases=tablebases)
+
+
+def _init_worker(hash_mb, tb_path):
+    global _searcher
+    _searcher = _make_searcher(hash_mb, tb_path)
+
+
+def analyse(job, searcher):
+    """Search one job (fen, optional moves and limits); returns a result dict."""
+    result = {k: job[k] for k in ('id', 'game', 'ply', 'played') if k in job}
+    try:
+        pos = Position(job.get('fen') or Position().fen())
+        for uci in job.get('moves', ()):
+            pos.push_uci(uci)
+    except (ValueError, KeyError, IndexError, IllegalMoveError) as e:
+        result['error'] = str(e)
+        return result
+    movetime = job.get('movetime')
+    found = searcher.think(pos, max_depth=job.get('depth') or MAX_DEPTH, soft_time=movetime,
+                           hard_time=movetime, max_nodes=job.get('nodes'))
+    result.update(
+        fen=pos.fen(),
+        best=move_to_uci(found.move) if found.move is not None else None,
+        score=found.score,
+        depth=found.depth,
+        nodes=found.nodes,
+        time_ms=int(found.time * 1000),
+        pv=[move_to_uci(m) for m in found.pv],
+    )
+    if abs(found.score) > MATE_BOUND:
+        # Moves to mate, negative when the side to move is mated
+        plies = MATE_SCORE - abs(found.score)
+        result['mate'] = (plies + 1) // 2 if found.score > 0 else -(plies // 2)
+    return result
+
+
+def _analyse_job(job, searcher=None):
+    try:
+        return analyse(job, searcher or _searcher)
+    except Exception as e:  # one bad job must not end the batch
+        return {'id': job.get('id'), 'error': repr(e)}
+
+
+# --- Job sources ---
+
+def fen_jobs(lines):
+    """Jobs from text lines: a FEN, or a JSON object with fen/moves/id and limits."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+        if line[0] == '{':
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                yield {'id': number, 'fen': None, 'error': f"Line {number}: {e}"}
+                continue
+            job.setdefault('id', number)
+            yield job
+        else:
+            yield {'id': number, 'fen': line}
+
+
+def game_jobs(games):
+    """One job per ply for (game id, start fen, uci moves) triples.
+
+    Each job is the position before a move and carries the move actually
+    played, so results can be compared with it (blunder checks, reviews).
+    """
+    for game_id, fen, moves in games:
+        try:
+            pos = Position(fen or Position().fen())
+        except (ValueError, KeyError, IndexError):
+            continue
+        for ply, uci in enumerate(moves):
+            job = {'id': f"{game_id}:{ply}", 'game': game_id, 'ply': ply, 'fen': pos.fen(), 'played': uci}
+            try:
+                pos.push_uci(uci)
+            except (ValueError, IllegalMoveError):
+                break
+            yield job
+
+
+def pgn_jobs(lines):
+    """game_jobs for every game of a PGN stream, numbered from 1."""
+    return game_jobs((n, game.fen, game.moves) for n, game in enumerate(PgnReader(lines), 1))
+
+
+# --- Analyzer ---
+
+class BatchAnalyzer:
+    """Fans jobs out over `workers` processes, each with its own Searcher.
+
+    Limits given here apply to every job that does not set its own. The
+    counters are cumulative over all runs. Runs may overlap (one per
+    server request); with a single worker they take turns on the
+    in-process Searcher one job at a time.
+    """
+
+    def __init__(self, workers=None, hash_mb=16, tb_path=None,
+                 movetime=None, depth=None, nodes=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        if movetime is None and depth is None and nodes is None:
+            movetime = DEFAULT_MOVETIME
+        self.limits = {'movetime': movetime, 'depth': depth, 'nodes': nodes}
+        self.positions = 0
+        self.nodes = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()  # the in-process Searcher and the counters
+        if self.workers == 1:
+            self._pool = None
+            self._local = _make_searcher(hash_mb, tb_path)
+        else:
+            ctx = multiprocessing.get_context()
+            self._pool = ctx.Pool(self.workers, initializer=_init_worker, initargs=(hash_mb, tb_path))
+
+    def _prepare(self, job):
+        for key, value in self.limits.items():
+            if job.get(key) is None:
+                job[key] = value
+        return job
+
+    def _count(self, result):
+        with self._lock:
+            self.positions += 1
+            self.nodes += result.get('nodes', 0)
+        return result
+
+    def rate(self):
+        """(positions, nodes) per second since the analyzer started."""
+        elapsed = time.perf_counter() - self.started
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return self.positions / elapsed, self.nodes / elapsed
+
+    def run(self, jobs):
+        """Yield a result dict per job, in completion order."""
+        if self._pool is None:
+            for job in jobs:
+                if 'error' in job:
+                    yield self._count({'id': job.get('id'), 'error': job['error']})
+                else:
+                    with self._lock:
+                        result = _analyse_job(self._prepare(job), self._local)
+                    yield self._count(result)
+            return
+        done = queue.Queue()
+        window = self.workers * WINDOW_PER_WORKER
+        pending = 0
+        for job in jobs:
+            if 'error' in job:
+                yield self._count({'id': job.get('id'), 'error': job['error']})
+                continue
+            self._pool.apply_async(_analyse_job, (self._prepare(job),), callback=done.put,
+                                   error_callback=lambda e: done.put({'error': repr(e)}))
+            pending += 1
+            while pending >= window or (pending and not done.empty()):
+                pending -= 1
+                yield self._count(done.get())
+        while pending:
+            pending -= 1
+            yield self._count(done.get())
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_results(out, results):
+    """Write results as NDJSON, flushing so readers see each line promptly."""
+    count = 0
+    for result in results:
+        out.write(json.dumps(result, separators=(',', ':')) + '\n')
+        out.flush()
+        count += 1
+    return count
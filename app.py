@@ -1,958 +1,2224 @@
-import webbrowser
-import os
-import sys
-import time
-from http.server import SimpleHTTPRequestHandler
-import socketserver
-import threading
-import subprocess
-import shutil
-import platform
-
-# Check for pywebview for Desktop App experience
-try:
-    import webview
-    HAS_WEBVIEW = True
-    # Handle deprecation warning for SAVE_DIALOG
-    if hasattr(webview, 'FileDialog'):
-        SAVE_DIALOG_TYPE = webview.FileDialog.SAVE
-    else:
-        SAVE_DIALOG_TYPE = getattr(webview, 'SAVE_DIALOG', 2)
-except ImportError:
-    HAS_WEBVIEW = False
-    SAVE_DIALOG_TYPE = 2
-
-# --- Python-JavaScript Bridge API ---
-class JsApi:
-    def log_event(self, message):
-        """Receives logs from JS and prints to Python console"""
-        print(f"[Game Event] {message}")
-
-    def save_content(self, content, filename):
-        if not HAS_WEBVIEW: 
-            return "Error: PyWebView not active."
-        try:
-            active_window = webview.windows[0]
-            result = active_window.create_file_dialog(
-                SAVE_DIALOG_TYPE, 
-                save_filename=filename, 
-                file_types=('JSON Files (*.json)', 'All files (*.*)')
-            )
-            if result:
-                save_path = result if isinstance(result, str) else result[0]
-                with open(save_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                return True
-            return False
-        except Exception as e:
-            return str(e)
-
-# --- The Complete HTML/JS/CSS Game Content ---
-GAME_HTML = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Python Chess Pro</title>
-    <link href="https://fonts.googleapis.com/css2?family=Cinzel:wght@700&family=Lato:wght@400;700&display=swap" rel="stylesheet">
-    <style>
-        :root {
-            --light-square: #e8d0aa;
-            --dark-square: #a67049;
-            --bg-image: url('https://images.unsplash.com/photo-1586165368502-1bad197a6461?q=80&w=2658&auto=format&fit=crop');
-            --highlight: rgba(255, 255, 0, 0.6);
-            --capture: rgba(255, 50, 50, 0.6);
-            --last-move: rgba(155, 199, 0, 0.5);
-            --panel-bg: rgba(0, 0, 0, 0.75);
-        }
-        body.theme-ocean { --light-square: #d0e8f0; --dark-square: #4988a6; --bg-image: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%); }
-        body.theme-forest { --light-square: #e0f2d8; --dark-square: #5c8a62; --bg-image: url('https://images.unsplash.com/photo-1448375240586-dfd8d395ea6c?q=80&w=2670&auto=format&fit=crop'); }
-        body.theme-dark { --light-square: #b0b0b0; --dark-square: #505050; --bg-image: linear-gradient(to bottom, #232526, #414345); }
-
-        body {
-            font-family: 'Lato', sans-serif;
-            background: var(--bg-image) no-repeat center center fixed;
-            background-size: cover;
-            color: #fff;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            min-height: 100vh;
-            margin: 0;
-            overflow: hidden;
-        }
-        
-        .game-container {
-            backdrop-filter: blur(10px);
-            background: rgba(255, 255, 255, 0.1);
-            padding: 20px;
-            border-radius: 20px;
-            border: 1px solid rgba(255, 255, 255, 0.15);
-            box-shadow: 0 15px 35px rgba(0, 0, 0, 0.5);
-            max-width: 98vw;
-            max-height: 98vh;
-        }
-
-        .main-layout { display: flex; flex-direction: row; gap: 20px; align-items: flex-start; }
-        .sidebar { display: flex; flex-direction: column; width: 300px; gap: 10px; max-height: 90vh; overflow-y: auto; padding-right: 5px; }
-
-        .logo-area h1 { font-family: 'Cinzel', serif; font-size: 1.8rem; margin: 0; text-shadow: 2px 2px 4px black; text-align: center; }
-        
-        .player-card {
-            background: var(--panel-bg); padding: 10px; border-radius: 10px;
-            border: 1px solid rgba(255,255,255,0.1); transition: all 0.3s;
-        }
-        .player-card.active-turn { border-color: #9bc700; box-shadow: 0 0 10px rgba(155, 199, 0, 0.3); }
-        .player-header { display: flex; justify-content: space-between; margin-bottom: 5px; }
-        .player-name-input { background: transparent; border: none; color: white; font-weight: bold; width: 120px; border-bottom: 1px solid #555; }
-        .timer { font-family: monospace; font-size: 1.4rem; font-weight: bold; }
-
-        .game-info-panel { text-align: center; background: rgba(0,0,0,0.4); padding: 10px; border-radius: 8px; }
-        .eval-bar-bg { width: 100%; height: 10px; background: #eee; border-radius: 5px; margin-top:5px; overflow:hidden; }
-        .eval-bar-fill { height: 100%; background: #222; width: 50%; transition: width 0.5s; }
-        .eval-labels { display:flex; justify-content:space-between; font-size:0.75rem; color:#ccc; }
-
-        #board {
-            display: grid;
-            grid-template-columns: repeat(8, minmax(0, 1fr));
-            grid-template-rows: repeat(8, minmax(0, 1fr));
-            width: 75vmin; height: 75vmin;
-            max-width: 680px; max-height: 680px;
-            min-width: 300px; min-height: 300px;
-            border: 8px solid #2b1d0e; border-radius: 4px;
-            user-select: none;
-        }
-        .square { width: 100%; height: 100%; display: flex; justify-content: center; align-items: center; font-size: 4rem; position: relative; }
-        @media (max-width: 600px) { .square { font-size: 9vmin; } }
-
-        .light { background-color: var(--light-square); color: black; }
-        .dark { background-color: var(--dark-square); color: black; }
-        .square.selected { background-color: rgba(100, 255, 100, 0.7) !important; }
-        .square.highlight { background-color: var(--highlight) !important; }
-        .square.capture-highlight { background-color: var(--capture) !important; }
-        .square.last-move { background-color: var(--last-move) !important; }
-        .square.check { background-color: rgba(255, 0, 0, 0.6) !important; box-shadow: inset 0 0 10px red; }
-        
-        /* Heatmap */
-        .square.heatmap-w { box-shadow: inset 0 0 0 3px rgba(255,255,255,0.3); }
-        .square.heatmap-b { box-shadow: inset 0 0 0 3px rgba(0,0,0,0.3); }
-
-        .piece { cursor: grab; z-index: 2; text-shadow: 0 0 2px black; filter: drop-shadow(2px 4px 2px rgba(0,0,0,0.5)); }
-        .piece.white { color: #fff; }
-        .piece.black { color: #111; text-shadow: 0 0 1px #fff; }
-
-        /* Overlay & Menu */
-        .overlay { position: absolute; top:0; left:0; right:0; bottom:0; background: rgba(10,10,10,0.95); z-index:100; display:flex; flex-direction:column; align-items:center; justify-content:center; }
-        .menu-content { background: #222; padding: 25px; border-radius: 10px; width: 320px; border: 1px solid #444; max-height: 90vh; overflow-y: auto;}
-        .menu-group { margin-bottom: 15px; width: 100%; }
-        .menu-label { display: block; color: #aaa; margin-bottom: 5px; font-size: 0.9rem; text-transform: uppercase; }
-        .option-row { display: flex; gap: 5px; }
-        .option-btn { flex: 1; padding: 8px; background: #333; border: 1px solid #555; color: #eee; cursor: pointer; border-radius: 4px; }
-        .option-btn.selected { background: #4a6fa5; border-color: #6b8cce; font-weight: bold; }
-        
-        .start-btn { width: 100%; padding: 12px; background: #2e7d32; color: white; border: none; border-radius: 5px; font-size: 1.1rem; cursor: pointer; margin-top: 10px; }
-        .start-btn:hover { background: #388e3c; }
-        
-        select, input[type="text"] { width: 100%; padding: 8px; background: #333; border: 1px solid #555; color: white; border-radius: 4px; }
-        
-        .history-panel { height: 100px; overflow-y: auto; background: rgba(0,0,0,0.3); border: 1px solid #444; margin-top: 10px; font-family: monospace; font-size: 0.85rem; padding: 5px; }
-        .history-move { cursor: pointer; margin-right: 5px; }
-        .history-move:hover { text-decoration: underline; color: #4a6fa5; }
-
-        @media (max-width: 900px) {
-            .main-layout { flex-direction: column-reverse; align-items: center; }
-            .sidebar { width: 100%; max-width: 600px; flex-direction: row; flex-wrap: wrap; }
-            .player-card { flex: 1; }
-            #board { width: 92vw; height: 92vw; }
-        }
-    </style>
-</head>
-<body class="theme-wood">
-
-    <div class="game-container">
-        <!-- Main Menu Overlay -->
-        <div id="menu-overlay" class="overlay">
-            <h1>Chess Master</h1>
-            <div class="menu-content">
-                <div class="menu-group">
-                    <span class="menu-label">Mode</span>
-                    <div class="option-row">
-                        <button id="btn-mode-pvp" onclick="selectMode('pvp')" class="option-btn selected">2 Players</button>
-                        <button id="btn-mode-bot" onclick="selectMode('bot')" class="option-btn">Vs Bot</button>
-                    </div>
-                </div>
-                
-                <div class="menu-group" id="diff-section" style="display:none;">
-                    <span class="menu-label">Bot Level</span>
-                    <div class="option-row">
-                        <button id="btn-lvl-1" onclick="selectLevel(1)" class="option-btn selected">1</button>
-                        <button id="btn-lvl-2" onclick="selectLevel(2)" class="option-btn">2</button>
-                        <button id="btn-lvl-3" onclick="selectLevel(3)" class="option-btn">3</button>
-                        <button id="btn-lvl-4" onclick="selectLevel(4)" class="option-btn" style="background:#6a1b9a;">GM</button>
-                    </div>
-                </div>
-
-                <div class="menu-group" id="pers-section" style="display:none;">
-                    <span class="menu-label">Bot Style</span>
-                    <select id="bot-style" onchange="logAction('Changed Bot Style: '+this.value)">
-                        <option value="standard">Standard</option>
-                        <option value="aggressive">Aggressive (Attacks)</option>
-                        <option value="defensive">Defensive (Solid)</option>
-                        <option value="gambit">Gambit (Risky)</option>
-                    </select>
-                </div>
-
-                <div class="menu-group">
-                    <span class="menu-label">Time Control</span>
-                    <select id="time-select" onchange="logAction('Changed Time Control')">
-                        <option value="60">1 Min</option>
-                        <option value="180">3 Min</option>
-                        <option value="300">5 Min</option>
-                        <option value="600" selected>10 Min</option>
-                        <option value="1800">30 Min</option>
-                    </select>
-                </div>
-
-                <div class="menu-group">
-                    <span class="menu-label">Theme</span>
-                    <select id="theme-select" onchange="changeTheme(this.value)">
-                        <option value="theme-wood">Classic Wood</option>
-                        <option value="theme-ocean">Ocean Breeze</option>
-                        <option value="theme-forest">Forest Glade</option>
-                        <option value="theme-dark">Midnight Slate</option>
-                    </select>
-                </div>
-
-                <button class="start-btn" onclick="launchGame()">Start Game</button>
-                <div style="display:flex; gap:5px; margin-top:8px;">
-                    <button class="option-btn" onclick="openSaveLoad()">Load Game</button>
-                </div>
-            </div>
-        </div>
-
-        <!-- Save/Load Modal -->
-        <div id="save-modal" class="overlay" style="display:none;">
-            <div class="menu-content">
-                <h3>Save / Load</h3>
-                <div class="menu-group">
-                    <span class="menu-label">Save Filename</span>
-                    <input type="text" id="save-name" placeholder="chess_game">
-                    <button class="start-btn" style="margin-top:5px; background:#4a6fa5;" onclick="doSave()">Download Save</button>
-                </div>
-                <div class="menu-group">
-                    <span class="menu-label">Load File</span>
-                    <button class="start-btn" style="background:#555;" onclick="document.getElementById('file-input').click()">Select File</button>
-                </div>
-                <button class="option-btn" onclick="document.getElementById('save-modal').style.display='none'; logAction('Closed Save Menu')" style="width:100%">Close</button>
-            </div>
-        </div>
-        <input type="file" id="file-input" style="display:none" onchange="doLoad(this)" accept=".json">
-
-        <!-- Game Interface -->
-        <div class="main-layout">
-            <div id="board"></div>
-
-            <div class="sidebar">
-                <div class="logo-area">
-                    <h1 style="font-size:1.5rem; margin-bottom:5px;">Python Chess</h1>
-                    <span id="clock" style="font-family:monospace; color:#aaa;">00:00</span>
-                </div>
-
-                <!-- Opponent -->
-                <div class="player-card" id="card-b">
-                    <div class="player-header">
-                        <input type="text" id="name-b" class="player-name-input" value="Black">
-                        <span class="timer" id="time-b">10:00</span>
-                    </div>
-                    <small class="score-display">Mat: <span id="mat-b">0</span></small>
-                </div>
-
-                <!-- Info -->
-                <div class="game-info-panel">
-                    <div id="status-text" style="color:#ffd700; font-weight:bold;">White's Turn</div>
-                    <div class="eval-bar-bg">
-                        <div id="eval-fill" class="eval-bar-fill"></div>
-                    </div>
-                    <div class="eval-labels">
-                        <span>White</span><span id="win-pct">50%</span><span>Black</span>
-                    </div>
-                    <div id="bot-msg" style="margin-top:8px; font-size:0.8rem; font-style:italic; color:#aaa; min-height:1.2em;"></div>
-                </div>
-
-                <!-- History -->
-                <div class="history-panel" id="pgn-container"></div>
-
-                <!-- Player -->
-                <div class="player-card active-turn" id="card-w">
-                    <div class="player-header">
-                        <input type="text" id="name-w" class="player-name-input" value="White">
-                        <span class="timer" id="time-w">10:00</span>
-                    </div>
-                    <small class="score-display">Mat: <span id="mat-w">0</span></small>
-                </div>
-
-                <!-- Controls -->
-                <div style="display:grid; grid-template-columns:1fr 1fr; gap:5px;">
-                    <button class="option-btn" onclick="toggleHeatmap()">Heatmap</button>
-                    <button class="option-btn" onclick="undoMove()">Undo</button>
-                    <button class="option-btn" onclick="openSaveLoad()">Save</button>
-                    <button class="option-btn" style="background:#b71c1c;" onclick="confirmQuit()">Quit</button>
-                    <button class="option-btn" style="grid-column:span 2; background:#2e7d32;" onclick="showMenu()">New Game</button>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        // --- LOGGING ---
-        function logAction(msg) {
-            if(window.pywebview) {
-                window.pywebview.api.log_event(msg);
-            } else {
-                fetch('/log_action', {method:'POST', body:msg}).catch(e=>{});
-            }
-        }
-
-        // --- CONSTANTS & CONFIG ---
-        const pieces = { w: { k:'♔', q:'♕', r:'♖', b:'♗', n:'♘', p:'♙' }, b: { k:'♚', q:'♛', r:'♜', b:'♝', n:'♞', p:'♟' } };
-        const vals = { p:100, n:320, b:330, r:500, q:900, k:20000 };
-        // PST (Simplified)
-        const pst = {
-            p: [ [0,0,0,0,0,0,0,0],[50,50,50,50,50,50,50,50],[10,10,20,30,30,20,10,10],[5,5,10,25,25,10,5,5],[0,0,0,20,20,0,0,0],[5,-5,-10,0,0,-10,-5,5],[5,10,10,-20,-20,10,10,5],[0,0,0,0,0,0,0,0] ],
-            n: [ [-50,-40,-30,-30,-30,-30,-40,-50],[-40,-20,0,0,0,0,-20,-40],[-30,0,10,15,15,10,0,-30],[-30,5,15,20,20,15,5,-30],[-30,0,15,20,20,15,0,-30],[-30,5,10,15,15,10,5,-30],[-40,-20,0,5,5,0,-20,-40],[-50,-40,-30,-30,-30,-30,-40,-50] ]
-        };
-        
-        // Opening Book (Source-Target Coordinates)
-        // e2e4 -> 6,4 to 4,4
-        const book = {
-            "": [{r:6,c:4, tr:4,tc:4}, {r:6,c:3, tr:4,tc:3}, {r:7,c:6, tr:5,tc:5}], // e4, d4, Nf3
-            "e2e4": [{r:1,c:4, tr:3,tc:4}, {r:1,c:2, tr:3,tc:2}], // e5, c5
-            "d2d4": [{r:1,c:3, tr:3,tc:3}, {r:0,c:6, tr:2,tc:5}], // d5, Nf6
-        };
-
-        // --- STATE ---
-        let board = [], turn = 'w', mode = 'pvp', level = 1, style = 'standard';
-        let history = [], pgn = [], moveStr = "";
-        let tW = 600, tB = 600, timer = null, active = false;
-        let selected = null, lastMove = null;
-        let showHM = false;
-
-        // --- INIT ---
-        setInterval(() => document.getElementById('clock').innerText = new Date().toLocaleTimeString([],{hour:'2-digit',minute:'2-digit'}), 1000);
-        
-        function showMenu() { 
-            stopTimer();
-            logAction("Opened Main Menu");
-            document.getElementById('menu-overlay').style.display = 'flex'; 
-        }
-
-        function changeTheme(themeClass) {
-            document.body.className = themeClass;
-            logAction("Changed Theme to " + themeClass);
-        }
-
-        function selectMode(m) {
-            mode = m;
-            logAction("Selected Mode: " + m);
-            document.getElementById('btn-mode-pvp').className = m==='pvp'?'option-btn selected':'option-btn';
-            document.getElementById('btn-mode-bot').className = m==='bot'?'option-btn selected':'option-btn';
-            document.getElementById('diff-section').style.display = m==='bot'?'block':'none';
-            document.getElementById('pers-section').style.display = m==='bot'?'block':'none';
-        }
-
-        function selectLevel(l) {
-            level = l;
-            logAction("Selected Bot Level: " + l);
-            for(let i=1; i<=4; i++) document.getElementById('btn-lvl-'+i).className = i===l?'option-btn selected':'option-btn';
-        }
-
-        function launchGame() {
-            style = document.getElementById('bot-style').value;
-            const t = parseInt(document.getElementById('time-select').value);
-            tW = t; tB = t;
-            
-            document.getElementById('name-w').value = (mode==='bot') ? "You" : "Player 1";
-            document.getElementById('name-b').value = (mode==='bot') ? `Bot (${style})` : "Player 2";
-            
-            logAction(`Game Started: ${mode}, Level ${level}, Time ${t}s`);
-            resetBoard();
-            document.getElementById('menu-overlay').style.display = 'none';
-            active = true;
-            render(); updateUI(); startTimer();
-        }
-
-        function resetBoard() {
-            board = [
-                ['br','bn','bb','bq','bk','bb','bn','br'],
-                ['bp','bp','bp','bp','bp','bp','bp','bp'],
-                ...Array(4).fill(null).map(()=>Array(8).fill('')),
-                ['wp','wp','wp','wp','wp','wp','wp','wp'],
-                ['wr','wn','wb','wq','wk','wb','wn','wr']
-            ];
-            turn = 'w'; history = []; pgn = []; moveStr = ""; lastMove = null; selected = null;
-        }
-
-        // --- CORE ENGINE ---
-        function onBoard(r,c) { return r>=0 && r<8 && c>=0 && c<8; }
-
-        function getMoves(b, r, c) {
-            const p = b[r][c], type = p[1], col = p[0];
-            const m = [];
-            const add = (nr,nc) => { if(onBoard(nr,nc) && (!b[nr][nc] || b[nr][nc][0]!==col)) m.push({r:nr, c:nc}); };
-            
-            if(type==='p') {
-                const d = col==='w'?-1:1;
-                if(onBoard(r+d,c) && !b[r+d][c]) {
-                    m.push({r:r+d, c:c});
-                    if((col==='w' && r===6) || (col==='b' && r===1)) if(!b[r+d*2][c]) m.push({r:r+d*2, c:c});
-                }
-                if(onBoard(r+d,c-1) && b[r+d][c-1] && b[r+d][c-1][0]!==col) m.push({r:r+d, c:c-1});
-                if(onBoard(r+d,c+1) && b[r+d][c+1] && b[r+d][c+1][0]!==col) m.push({r:r+d, c:c+1});
-            } else {
-                const dirs = {
-                    n:[[2,1],[2,-1],[-2,1],[-2,-1],[1,2],[1,-2],[-1,2],[-1,-2]],
-                    b:[[1,1],[1,-1],[-1,1],[-1,-1]],
-                    r:[[0,1],[0,-1],[1,0],[-1,0]],
-                    q:[[0,1],[0,-1],[1,0],[-1,0],[1,1],[1,-1],[-1,1],[-1,-1]],
-                    k:[[0,1],[0,-1],[1,0],[-1,0],[1,1],[1,-1],[-1,1],[-1,-1]]
-                };
-                if(type==='n' || type==='k') {
-                    for(let d of dirs[type]) add(r+d[0], c+d[1]);
-                } else {
-                    for(let d of dirs[type]) {
-                        for(let i=1; i<8; i++) {
-                            const nr=r+d[0]*i, nc=c+d[1]*i;
-                            if(!onBoard(nr,nc)) break;
-                            if(b[nr][nc]) { if(b[nr][nc][0]!==col) m.push({r:nr, c:nc}); break; }
-                            m.push({r:nr, c:nc});
-                        }
-                    }
-                }
-            }
-            return m;
-        }
-
-        function getLegalMoves(b, col) {
-            let moves = [];
-            for(let r=0; r<8; r++) {
-                for(let c=0; c<8; c++) {
-                    if(b[r][c] && b[r][c][0]===col) {
-                        const ms = getMoves(b, r, c);
-                        for(let m of ms) {
-                            // Virtual move
-                            const saved = b[m.r][m.c]; b[m.r][m.c] = b[r][c]; b[r][c] = '';
-                            if(!inCheck(b, col)) moves.push({from:{r,c}, to:m});
-                            b[r][c] = b[m.r][m.c]; b[m.r][m.c] = saved;
-                        }
-                    }
-                }
-            }
-            return moves;
-        }
-
-        function inCheck(b, col) {
-            let kr, kc;
-            for(let r=0; r<8; r++) for(let c=0; c<8; c++) if(b[r][c]===col+'k') { kr=r; kc=c; break; }
-            if(kr==null) return true; // King missing (shouldnt happen)
-            const opp = col==='w'?'b':'w';
-            
-            // Check attacks (simplified inverse)
-            for(let r=0; r<8; r++) {
-                for(let c=0; c<8; c++) {
-                    if(b[r][c] && b[r][c][0]===opp) {
-                        // Optimizing: only generate moves for pieces that could hit king
-                        const ms = getMoves(b, r, c);
-                        if(ms.some(m => m.r===kr && m.c===kc)) return true;
-                    }
-                }
-            }
-            return false;
-        }
-
-        // --- GAMEPLAY ---
-        function handleClick(r, c) {
-            if(!active || (mode==='bot' && turn==='b')) return;
-            logAction("Clicked square " + r + "," + c);
-            
-            // Move
-            if(selected) {
-                const legals = getLegalMoves(board, turn).filter(m => m.from.r===selected.r && m.from.c===selected.c);
-                const move = legals.find(m => m.to.r===r && m.to.c===c);
-                if(move) { executeMove(move); return; }
-            }
-            
-            // Select
-            if(board[r][c] && board[r][c][0]===turn) {
-                selected = {r,c};
-                highlightBoard(); // Call Highlight instead of render
-            } else {
-                selected = null;
-                highlightBoard();
-            }
-        }
-
-        function highlightBoard() {
-            // Clear existing
-            document.querySelectorAll('.square').forEach(el => {
-                el.classList.remove('selected', 'highlight', 'capture-highlight');
-            });
-            
-            if(!selected) return;
-
-            // Highlight source
-            const srcIdx = selected.r * 8 + selected.c;
-            const squares = document.getElementById('board').children;
-            if(squares[srcIdx]) squares[srcIdx].classList.add('selected');
-
-            // Highlight moves
-            const moves = getLegalMoves(board, turn).filter(m => m.from.r===selected.r && m.from.c===selected.c);
-            moves.forEach(m => {
-                const idx = m.to.r * 8 + m.to.c;
-                if(squares[idx]) {
-                    squares[idx].classList.add(board[m.to.r][m.to.c] ? 'capture-highlight' : 'highlight');
-                }
-            });
-        }
-
-        function executeMove(move) {
-            // Save state
-            history.push({board:JSON.parse(JSON.stringify(board)), turn, tW, tB, pgn:[...pgn], moveStr});
-            
-            const p = board[move.from.r][move.from.c];
-            const cap = board[move.to.r][move.to.c];
-            
-            // Update board
-            board[move.to.r][move.to.c] = p;
-            board[move.from.r][move.from.c] = '';
-            
-            // Promotion
-            if(p[1]==='p' && (move.to.r===0 || move.to.r===7)) board[move.to.r][move.to.c] = p[0]+'q';
-            
-            // Update PGN
-            const cols='abcdefgh', rows='87654321';
-            const san = (p[1]==='p'?'':p[1].toUpperCase()) + (cap?'x':'') + cols[move.to.c] + rows[move.to.r];
-            pgn.push(san);
-            
-            // Update Book string
-            moveStr += cols[move.from.c] + rows[move.from.r] + cols[move.to.c] + rows[move.to.r];
-
-            lastMove = move;
-            selected = null;
-            turn = turn==='w'?'b':'w';
-            
-            logAction(`Move executed: ${san}`);
-            
-            // Check End
-            const nextMoves = getLegalMoves(board, turn);
-            if(nextMoves.length === 0) {
-                active = false; stopTimer();
-                if(inCheck(board, turn)) {
-                    logAction("Checkmate");
-                    alert("Checkmate!"); 
-                } else {
-                    logAction("Stalemate");
-                    alert("Stalemate!");
-                }
-            }
-            
-            render(); updateUI();
-            
-            // Bot Turn
-            if(active && mode==='bot' && turn==='b') {
-                document.getElementById('bot-msg').innerText = "Thinking...";
-                setTimeout(botMove, 100);
-            }
-        }
-
-        function undoMove() {
-            logAction("User clicked Undo");
-            if(history.length === 0) return;
-            // Undo 2 if bot
-            const steps = (mode==='bot' && turn==='w' && history.length > 1) ? 2 : 1;
-            
-            for(let i=0; i<steps; i++) {
-                const s = history.pop();
-                board = s.board; turn = s.turn; tW = s.tW; tB = s.tB; pgn = s.pgn; moveStr = s.moveStr;
-            }
-            lastMove = null; selected = null; active = true;
-            render(); updateUI();
-        }
-
-        // --- BOT ---
-        function botMove() {
-            // 1. Opening Book
-            if(book[moveStr]) {
-                const opts = book[moveStr];
-                const bm = opts[Math.floor(Math.random()*opts.length)];
-                // Verify legal (book moves should be legal but safe check)
-                const move = {from:{r:bm.r, c:bm.c}, to:{r:bm.tr, c:bm.tc}};
-                document.getElementById('bot-msg').innerText = "Playing from Opening Book";
-                executeMove(move);
-                return;
-            }
-
-            // 2. Search
-            const moves = getLegalMoves(board, 'b');
-            if(moves.length === 0) return;
-
-            // Move Ordering: Captures first
-            moves.sort((a,b) => {
-                const vA = vals[board[a.to.r][a.to.c]?.[1]] || 0;
-                const vB = vals[board[b.to.r][b.to.c]?.[1]] || 0;
-                return vB - vA;
-            });
-
-            let bestMove = moves[0];
-            let bestScore = -Infinity;
-            const depth = level; 
-
-            // Simple Minimax
-            for(let m of moves) {
-                const saved = board[m.to.r][m.to.c]; board[m.to.r][m.to.c] = board[m.from.r][m.from.c]; board[m.from.r][m.from.c] = '';
-                const score = -minimax(depth-1, -100000, 100000, false);
-                board[m.from.r][m.from.c] = board[m.to.r][m.to.c]; board[m.to.r][m.to.c] = saved;
-                
-                if(score > bestScore) { bestScore = score; bestMove = m; }
-            }
-            
-            // Explain
-            const pName = {'p':'Pawn','n':'Knight','b':'Bishop','r':'Rook','q':'Queen','k':'King'};
-            const p = board[bestMove.from.r][bestMove.from.c];
-            document.getElementById('bot-msg').innerText = `Bot moved ${pName[p[1]]} to improve position.`;
-
-            executeMove(bestMove);
-        }
-
-        function minimax(depth, alpha, beta, isMax) {
-            if(depth===0) return evaluate();
-            
-            const moves = getLegalMoves(board, isMax?'b':'w');
-            if(moves.length===0) return inCheck(board, isMax?'b':'w') ? -20000 : 0;
-
-            for(let m of moves) {
-                const saved = board[m.to.r][m.to.c]; board[m.to.r][m.to.c] = board[m.from.r][m.from.c]; board[m.from.r][m.from.c] = '';
-                const score = -minimax(depth-1, -beta, -alpha, !isMax);
-                board[m.from.r][m.from.c] = board[m.to.r][m.to.c]; board[m.to.r][m.to.c] = saved;
-                
-                if(score >= beta) return beta;
-                if(score > alpha) alpha = score;
-            }
-            return alpha;
-        }
-
-        function evaluate() {
-            let score = 0;
-            for(let r=0; r<8; r++) for(let c=0; c<8; c++) {
-                const p = board[r][c];
-                if(p) {
-                    let v = vals[p[1]];
-                    // PST Tweak (simplified)
-                    if(p[1]==='p' || p[1]==='n') {
-                        if(p[0]==='w') v += (pst.p[r][c] || 0)/10;
-                        else v += (pst.p[7-r][c] || 0)/10;
-                    }
-                    score += (p[0]==='b' ? v : -v);
-                }
-            }
-            // Personality
-            if(style==='aggressive') score *= 1.1;
-            return score;
-        }
-
-        // --- SAVE/LOAD ---
-        function openSaveLoad() {
-            logAction("Opened Save/Load Menu");
-            // Default filename
-            const d = new Date();
-            const name = `chess_${d.getFullYear()}-${d.getMonth()+1}-${d.getDate()}_${d.getHours()}-${d.getMinutes()}`;
-            document.getElementById('save-name').value = name;
-            document.getElementById('save-modal').style.display = 'flex';
-        }
-
-        async function doSave() {
-            logAction("Initiated Game Save");
-            let name = document.getElementById('save-name').value || 'chess_save';
-            if(!name.endsWith('.json')) name += '.json';
-            
-            const data = JSON.stringify({board, turn, history, pgn, mode, level, style, tW, tB});
-            
-            // Desktop Save
-            if(window.pywebview) {
-                const res = await window.pywebview.api.save_content(data, name);
-                if(res === true) alert("Saved!"); else alert("Save Error");
-            } 
-            // Browser Save (Native or Blob)
-            else if(window.showSaveFilePicker) {
-                try {
-                    const handle = await showSaveFilePicker({suggestedName: name});
-                    const w = await handle.createWritable();
-                    await w.write(data); await w.close();
-                    alert("Saved!");
-                } catch(e) {}
-            } else {
-                // Blob Fallback
-                const blob = new Blob([data], {type:'application/json'});
-                const url = URL.createObjectURL(blob);
-                const a = document.createElement('a'); a.href = url; a.download = name; a.click();
-            }
-            document.getElementById('save-modal').style.display = 'none';
-        }
-
-        function doLoad(input) {
-            logAction("Loading Game from File...");
-            const f = input.files[0];
-            if(!f) return;
-            const r = new FileReader();
-            r.onload = (e) => {
-                try {
-                    const d = JSON.parse(e.target.result);
-                    board = d.board; turn = d.turn; history = d.history;
-                    pgn = d.pgn; mode = d.mode; level = d.level; style = d.style;
-                    tW = d.tW; tB = d.tB;
-                    
-                    // Restore UI
-                    if(mode==='bot') document.getElementById('name-b').value = `Bot (${style})`;
-                    
-                    active = true; lastMove=null; selected=null;
-                    render(); updateUI(); startTimer();
-                    document.getElementById('save-modal').style.display = 'none';
-                    logAction("Game Loaded Successfully");
-                } catch(err) { alert("Invalid File"); }
-            };
-            r.readAsText(f);
-            input.value = "";
-        }
-
-        // --- UI ---
-        function render() {
-            const el = document.getElementById('board');
-            el.innerHTML = '';
-            
-            const hm = showHM ? getHeatmap() : null;
-
-            for(let r=0; r<8; r++) for(let c=0; c<8; c++) {
-                const sq = document.createElement('div');
-                const isDark = (r+c)%2===1;
-                sq.className = `square ${isDark?'dark':'light'}`;
-                sq.onclick = () => handleClick(r,c);
-                sq.ondragover = (e) => e.preventDefault();
-                sq.ondrop = (e) => {
-                    e.preventDefault();
-                    logAction("Drop at " + r + "," + c);
-                    if(selected) {
-                        const moves = getLegalMoves(board, turn).filter(m => m.from.r===selected.r && m.from.c===selected.c);
-                        const move = moves.find(m => m.to.r===r && m.to.c===c);
-                        if(move) executeMove(move);
-                    }
-                };
-
-                if(selected && selected.r===r && selected.c===c) sq.classList.add('selected');
-                if(lastMove && ((lastMove.from.r===r && lastMove.from.c===c) || (lastMove.to.r===r && lastMove.to.c===c))) sq.classList.add('last-move');
-                
-                // Highlights
-                if(selected) {
-                    const moves = getLegalMoves(board, turn).filter(m => m.from.r===selected.r && m.from.c===selected.c);
-                    if(moves.some(m => m.to.r===r && m.to.c===c)) sq.classList.add(board[r][c]?'capture-highlight':'highlight');
-                }
-                
-                // Check
-                if(inCheck(board, turn) && board[r][c]===turn+'k') sq.classList.add('check');
-
-                // Heatmap
-                if(hm) {
-                    if(hm[r][c] > 0) sq.classList.add('heatmap-w');
-                    if(hm[r][c] < 0) sq.classList.add('heatmap-b');
-                }
-
-                if(board[r][c]) {
-                    const p = document.createElement('span');
-                    p.className = `piece ${board[r][c][0]==='w'?'white':'black'}`;
-                    p.innerText = pieces[board[r][c][0]][board[r][c][1]];
-                    if(board[r][c][0] === turn && !(mode==='bot' && turn==='b')) {
-                        p.draggable = true;
-                        p.ondragstart = (e) => { 
-                            logAction("Drag Start " + r + "," + c); 
-                            selected = {r,c}; 
-                            // Important: Don't re-render, just highlight
-                            highlightBoard(); 
-                            e.dataTransfer.effectAllowed = 'move';
-                            e.dataTransfer.setData('text/plain', JSON.stringify({r,c}));
-                        };
-                    }
-                    sq.appendChild(p);
-                }
-                el.appendChild(sq);
-            }
-        }
-
-        function highlightBoard() {
-            // Clear existing
-            document.querySelectorAll('.square').forEach(el => {
-                el.classList.remove('selected', 'highlight', 'capture-highlight');
-            });
-            
-            if(!selected) return;
-
-            // Highlight source
-            const srcIdx = selected.r * 8 + selected.c;
-            const squares = document.getElementById('board').children;
-            if(squares[srcIdx]) squares[srcIdx].classList.add('selected');
-
-            // Highlight moves
-            const moves = getLegalMoves(board, turn).filter(m => m.from.r===selected.r && m.from.c===selected.c);
-            moves.forEach(m => {
-                const idx = m.to.r * 8 + m.to.c;
-                if(squares[idx]) {
-                    squares[idx].classList.add(board[m.to.r][m.to.c] ? 'capture-highlight' : 'highlight');
-                }
-            });
-        }
-
-        function updateUI() {
-            // Timer
-            const f = t => { const m=Math.floor(t/60), s=t%60; return `${m}:${s<10?'0'+s:s}`; };
-            document.getElementById('time-w').innerText = f(tW);
-            document.getElementById('time-b').innerText = f(tB);
-            document.getElementById('card-w').className = `player-card ${turn==='w'?'active-turn':''}`;
-            document.getElementById('card-b').className = `player-card ${turn==='b'?'active-turn':''}`;
-            document.getElementById('status-text').innerText = turn==='w' ? "White's Turn" : "Black's Turn";
-            
-            // Score
-            let matW=0, matB=0;
-            for(let r=0; r<8; r++) for(let c=0; c<8; c++) if(board[r][c]) {
-                const v = vals[board[r][c][1]];
-                if(board[r][c][0]==='w') matW+=v; else matB+=v;
-            }
-            document.getElementById('mat-w').innerText = (matW/100).toFixed(1);
-            document.getElementById('mat-b').innerText = (matB/100).toFixed(1);
-            
-            // Eval Bar
-            const diff = matB - matW; // Basic material eval for bar visual
-            const pct = 50 + (diff / 2000 * 50); // Scale
-            document.getElementById('eval-fill').style.width = Math.min(Math.max(pct, 5), 95) + "%";
-            document.getElementById('win-pct').innerText = (diff > 0 ? "Black " : "White ") + Math.abs(diff/100).toFixed(1);
-
-            // History
-            const h = document.getElementById('pgn-container');
-            let html = "";
-            for(let i=0; i<pgn.length; i++) {
-                if(i%2===0) html += `<span style='color:#888'>${(i/2)+1}.</span> `;
-                html += `<span class='history-move'>${pgn[i]}</span> `;
-            }
-            h.innerHTML = html;
-            h.scrollTop = h.scrollHeight;
-        }
-
-        function startTimer() {
-            if(timer) clearInterval(timer);
-            timer = setInterval(() => {
-                if(!active) return;
-                if(turn==='w') { tW--; if(tW<=0) { active=false; alert("Black Wins!"); } }
-                else { tB--; if(tB<=0) { active=false; alert("White Wins!"); } }
-                updateUI();
-            }, 1000);
-        }
-        function stopTimer() { if(timer) clearInterval(timer); }
-
-        function toggleHeatmap() { showHM = !showHM; logAction("Toggled Heatmap"); render(); }
-        function getHeatmap() {
-            // Count attacks for simplistic heatmap
-            const map = Array(8).fill().map(()=>Array(8).fill(0));
-            // Just simulate attack density
-            for(let r=0; r<8; r++) for(let c=0; c<8; c++) if(board[r][c]) {
-                const ms = getMoves(board, r, c);
-                const v = board[r][c][0]==='w' ? 1 : -1;
-                for(let m of ms) map[m.r][m.c] += v;
-            }
-            return map;
-        }
-        function confirmQuit() {
-            logAction("User clicked Quit");
-            if(confirm("Quit?")) {
-                active = false; stopTimer();
-                window.close();
-                document.body.innerHTML = "<h1 style='color:white;text-align:center;margin-top:20%'>Game Closed</h1>";
-            }
-        }
-    </script>
-</body>
-</html>
-"""
-
-# --- Custom Log Handler ---
-class LogHandler(SimpleHTTPRequestHandler):
-    def log_message(self, format, *args):
-        pass # Suppress default logging
-    
-    def do_POST(self):
-        if self.path == '/log_action':
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length).decode('utf-8')
-            print(f"[Game Event] {post_data}")
-            self.send_response(200)
-            self.end_headers()
-        else:
-            self.send_error(404)
-
-# --- Python Launcher Logic ---
-
-def run_server():
-    # 2. Setup Local Server
-    filename = "chess_game_ui.html"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(GAME_HTML)
-
-    PORT = 8000
-
-    try:
-        # Start server
-        server = socketserver.TCPServer(("", PORT), LogHandler)
-        url = f"http://localhost:{PORT}/{filename}"
-        print(f"\n--- CHESS GAME LAUNCHED ---")
-        print(f"Server running on port {PORT}")
-        
-        # --- NEW: Cloud/Notebook Embedding ---
-        try:
-            from IPython.display import display, HTML
-            if os.path.exists("/content") or "google.colab" in sys.modules:
-                display(HTML(GAME_HTML))
-        except ImportError:
-            pass
-        # -------------------------------------
-        
-        def start_server():
-            server.serve_forever()
-
-        def launch_browser_tab():
-            time.sleep(1.5)
-            if os.path.exists("/content") or os.environ.get("HEADLESS") == "1": return
-            webbrowser.open(url)
-
-        if HAS_WEBVIEW and not (os.path.exists("/content") or os.environ.get("HEADLESS") == "1"):
-            print("Launching Desktop App via PyWebView...")
-            t = threading.Thread(target=start_server, daemon=True)
-            t.start()
-            
-            webview.create_window('Python Chess Pro', url, width=1100, height=850, resizable=True, js_api=JsApi())
-            webview.start()
-            sys.exit(0)
-        else:
-            threading.Thread(target=launch_browser_tab, daemon=True).start()
-            try:
-                print("Press Ctrl+C to stop the server.")
-                server.serve_forever()
-            except KeyboardInterrupt:
-                print("\nServer stopped.")
-                server.server_close()
-
-    except KeyboardInterrupt:
-        print("\nServer stopped.")
-        server.server_close()
-    except OSError as e:
-        print(f"Could not start server on port {PORT}: {e}")
-        abs_path = os.path.abspath(filename)
-        webbrowser.open(f"file://{abs_path}")
-
-if __name__ == "__main__":
-    run_server()
+import webbrowser
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler
+import socketserver
+import threading
+import subprocess
+import shutil
+import platform
+import json
+import argparse
+import signal
+import select
+import gzip
+import base64
+import contextlib
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from engine import (
+    Position, IllegalMoveError, OpeningBook, build_book, Searcher, ParallelSearcher, STYLES,
+    Tablebases, generate_tablebase, tablebase_signatures, allocate_time, move_to_uci, perft, divide, run_suite,
+)
+from engine.perft import nodes_per_second
+from eventlog import EventLog, parse_batch, DEFAULT_LOG_PATH
+from gamestore import GameStore, DEFAULT_DB_PATH
+from savefile import encode_save, convert_json_save
+from pgn import PgnReader, PgnError, write_games, to_store_game, format_game
+from sessions import SessionManager, SessionError, IDLE_TIMEOUT
+from push import PushHub
+from tournament import Tournament, parse_player, load_openings
+from metrics import SearchMetrics, ProfileCollector, profile_call, render as render_metrics, stats_families
+from analysis import BatchAnalyzer, fen_jobs, game_jobs, pgn_jobs, write_results, DEFAULT_MOVETIME as ANALYSIS_MOVETIME
+from urllib.parse import urlsplit, parse_qs
+
+# Check for pywebview for Desktop App experience
+try:
+    import webview
+    HAS_WEBVIEW = True
+    # Handle deprecation warning for SAVE_DIALOG
+    if hasattr(webview, 'FileDialog'):
+        SAVE_DIALOG_TYPE = webview.FileDialog.SAVE
+    else:
+        SAVE_DIALOG_TYPE = getattr(webview, 'SAVE_DIALOG', 2)
+except ImportError:
+    HAS_WEBVIEW = False
+    SAVE_DIALOG_TYPE = 2
+
+# Optional brotli compression for the served page
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# --- Python-JavaScript Bridge API ---
+class JsApi:
+    def log_event(self, message):
+        """Receives logs from JS and queues them for the event log"""
+        get_event_log().submit([message], client="desktop")
+
+    def save_content(self, content, filename, binary=False):
+        """Write a save chosen via a file dialog; binary saves arrive base64-encoded"""
+        if not HAS_WEBVIEW: 
+            return "Error: PyWebView not active."
+        try:
+            active_window = webview.windows[0]
+            result = active_window.create_file_dialog(
+                SAVE_DIALOG_TYPE, 
+                save_filename=filename, 
+                file_types=('Chess Saves (*.chess)', 'JSON Files (*.json)', 'All files (*.*)')
+            )
+            if result:
+                save_path = result if isinstance(result, str) else result[0]
+                if binary:
+                    with open(save_path, 'wb') as f:
+                        f.write(base64.b64decode(content))
+                else:
+                    with open(save_path, 'w', encoding='utf-8') as f:
+                        f.write(content)
+                return True
+            return False
+        except Exception as e:
+            return str(e)
+
+# --- The Complete HTML/JS/CSS Game Content ---
+GAME_HTML = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Python Chess Pro</title>
+    <link href="https://fonts.googleapis.com/css2?family=Cinzel:wght@700&family=Lato:wght@400;700&display=swap" rel="stylesheet">
+    <style>
+        :root {
+            --light-square: #e8d0aa;
+            --dark-square: #a67049;
+            --bg-image: url('https://images.unsplash.com/photo-1586165368502-1bad197a6461?q=80&w=2658&auto=format&fit=crop');
+            --highlight: rgba(255, 255, 0, 0.6);
+            --capture: rgba(255, 50, 50, 0.6);
+            --last-move: rgba(155, 199, 0, 0.5);
+            --panel-bg: rgba(0, 0, 0, 0.75);
+        }
+        body.theme-ocean { --light-square: #d0e8f0; --dark-square: #4988a6; --bg-image: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%); }
+        body.theme-forest { --light-square: #e0f2d8; --dark-square: #5c8a62; --bg-image: url('https://images.unsplash.com/photo-1448375240586-dfd8d395ea6c?q=80&w=2670&auto=format&fit=crop'); }
+        body.theme-dark { --light-square: #b0b0b0; --dark-square: #505050; --bg-image: linear-gradient(to bottom, #232526, #414345); }
+
+        body {
+            font-family: 'Lato', sans-serif;
+            background: var(--bg-image) no-repeat center center fixed;
+            background-size: cover;
+            color: #fff;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            min-height: 100vh;
+            margin: 0;
+            overflow: hidden;
+        }
+        
+        .game-container {
+            backdrop-filter: blur(10px);
+            background: rgba(255, 255, 255, 0.1);
+            padding: 20px;
+            border-radius: 20px;
+            border: 1px solid rgba(255, 255, 255, 0.15);
+            box-shadow: 0 15px 35px rgba(0, 0, 0, 0.5);
+            max-width: 98vw;
+            max-height: 98vh;
+        }
+
+        .main-layout { display: flex; flex-direction: row; gap: 20px; align-items: flex-start; }
+        .sidebar { display: flex; flex-direction: column; width: 300px; gap: 10px; max-height: 90vh; overflow-y: auto; padding-right: 5px; }
+
+        .logo-area h1 { font-family: 'Cinzel', serif; font-size: 1.8rem; margin: 0; text-shadow: 2px 2px 4px black; text-align: center; }
+        
+        .player-card {
+            background: var(--panel-bg); padding: 10px; border-radius: 10px;
+            border: 1px solid rgba(255,255,255,0.1); transition: all 0.3s;
+        }
+        .player-card.active-turn { border-color: #9bc700; box-shadow: 0 0 10px rgba(155, 199, 0, 0.3); }
+        .player-header { display: flex; justify-content: space-between; margin-bottom: 5px; }
+        .player-name-input { background: transparent; border: none; color: white; font-weight: bold; width: 120px; border-bottom: 1px solid #555; }
+        .timer { font-family: monospace; font-size: 1.4rem; font-weight: bold; }
+
+        .game-info-panel { text-align: center; background: rgba(0,0,0,0.4); padding: 10px; border-radius: 8px; }
+        .eval-bar-bg { width: 100%; height: 10px; background: #eee; border-radius: 5px; margin-top:5px; overflow:hidden; }
+        .eval-bar-fill { height: 100%; background: #222; width: 50%; transition: width 0.5s; }
+        .eval-labels { display:flex; justify-content:space-between; font-size:0.75rem; color:#ccc; }
+
+        #board {
+            display: grid;
+            grid-template-columns: repeat(8, minmax(0, 1fr));
+            grid-template-rows: repeat(8, minmax(0, 1fr));
+            width: 75vmin; height: 75vmin;
+            max-width: 680px; max-height: 680px;
+            min-width: 300px; min-height: 300px;
+            border: 8px solid #2b1d0e; border-radius: 4px;
+            user-select: none;
+        }
+        .square { width: 100%; height: 100%; display: flex; justify-content: center; align-items: center; font-size: 4rem; position: relative; }
+        @media (max-width: 600px) { .square { font-size: 9vmin; } }
+
+        .light { background-color: var(--light-square); color: black; }
+        .dark { background-color: var(--dark-square); color: black; }
+        .square.selected { background-color: rgba(100, 255, 100, 0.7) !important; }
+        .square.highlight { background-color: var(--highlight) !important; }
+        .square.capture-highlight { background-color: var(--capture) !important; }
+        .square.last-move { background-color: var(--last-move) !important; }
+        .square.check { background-color: rgba(255, 0, 0, 0.6) !important; box-shadow: inset 0 0 10px red; }
+        
+        /* Heatmap */
+        .square.heatmap-w { box-shadow: inset 0 0 0 3px rgba(255,255,255,0.3); }
+        .square.heatmap-b { box-shadow: inset 0 0 0 3px rgba(0,0,0,0.3); }
+
+        .piece { cursor: grab; z-index: 2; text-shadow: 0 0 2px black; filter: drop-shadow(2px 4px 2px rgba(0,0,0,0.5)); }
+        .piece.white { color: #fff; }
+        .piece.black { color: #111; text-shadow: 0 0 1px #fff; }
+
+        /* Overlay & Menu */
+        .overlay { position: absolute; top:0; left:0; right:0; bottom:0; background: rgba(10,10,10,0.95); z-index:100; display:flex; flex-direction:column; align-items:center; justify-content:center; }
+        .menu-content { background: #222; padding: 25px; border-radius: 10px; width: 320px; border: 1px solid #444; max-height: 90vh; overflow-y: auto;}
+        .menu-group { margin-bottom: 15px; width: 100%; }
+        .menu-label { display: block; color: #aaa; margin-bottom: 5px; font-size: 0.9rem; text-transform: uppercase; }
+        .option-row { display: flex; gap: 5px; }
+        .option-btn { flex: 1; padding: 8px; background: #333; border: 1px solid #555; color: #eee; cursor: pointer; border-radius: 4px; }
+        .option-btn.selected { background: #4a6fa5; border-color: #6b8cce; font-weight: bold; }
+        
+        .start-btn { width: 100%; padding: 12px; background: #2e7d32; color: white; border: none; border-radius: 5px; font-size: 1.1rem; cursor: pointer; margin-top: 10px; }
+        .start-btn:hover { background: #388e3c; }
+        
+        select, input[type="text"] { width: 100%; padding: 8px; background: #333; border: 1px solid #555; color: white; border-radius: 4px; }
+        
+        .history-panel { height: 100px; overflow-y: auto; background: rgba(0,0,0,0.3); border: 1px solid #444; margin-top: 10px; font-family: monospace; font-size: 0.85rem; padding: 5px; }
+        .history-move { cursor: pointer; margin-right: 5px; }
+        .history-move:hover { text-decoration: underline; color: #4a6fa5; }
+
+        @media (max-width: 900px) {
+            .main-layout { flex-direction: column-reverse; align-items: center; }
+            .sidebar { width: 100%; max-width: 600px; flex-direction: row; flex-wrap: wrap; }
+            .player-card { flex: 1; }
+            #board { width: 92vw; height: 92vw; }
+        }
+    </style>
+</head>
+<body class="theme-wood">
+
+    <div class="game-container">
+        <!-- Main Menu Overlay -->
+        <div id="menu-overlay" class="overlay">
+            <h1>Chess Master</h1>
+            <div class="menu-content">
+                <div class="menu-group">
+                    <span class="menu-label">Mode</span>
+                    <div class="option-row">
+                        <button id="btn-mode-pvp" onclick="selectMode('pvp')" class="option-btn selected">2 Players</button>
+                        <button id="btn-mode-bot" onclick="selectMode('bot')" class="option-btn">Vs Bot</button>
+                    </div>
+                </div>
+                
+                <div class="menu-group" id="diff-section" style="display:none;">
+                    <span class="menu-label">Bot Level</span>
+                    <div class="option-row">
+                        <button id="btn-lvl-1" onclick="selectLevel(1)" class="option-btn selected">1</button>
+                        <button id="btn-lvl-2" onclick="selectLevel(2)" class="option-btn">2</button>
+                        <button id="btn-lvl-3" onclick="selectLevel(3)" class="option-btn">3</button>
+                        <button id="btn-lvl-4" onclick="selectLevel(4)" class="option-btn" style="background:#6a1b9a;">GM</button>
+                    </div>
+                </div>
+
+                <div class="menu-group" id="pers-section" style="display:none;">
+                    <span class="menu-label">Bot Style</span>
+                    <select id="bot-style" onchange="logAction('Changed Bot Style: '+this.value)">
+                        <option value="standard">Standard</option>
+                        <option value="aggressive">Aggressive (Attacks)</option>
+                        <option value="defensive">Defensive (Solid)</option>
+                        <option value="gambit">Gambit (Risky)</option>
+                    </select>
+                </div>
+
+                <div class="menu-group">
+                    <span class="menu-label">Time Control</span>
+                    <select id="time-select" onchange="logAction('Changed Time Control')">
+                        <option value="60">1 Min</option>
+                        <option value="180">3 Min</option>
+                        <option value="300">5 Min</option>
+                        <option value="600" selected>10 Min</option>
+                        <option value="1800">30 Min</option>
+                    </select>
+                </div>
+
+                <div class="menu-group">
+                    <span class="menu-label">Theme</span>
+                    <select id="theme-select" onchange="changeTheme(this.value)">
+                        <option value="theme-wood">Classic Wood</option>
+                        <option value="theme-ocean">Ocean Breeze</option>
+                        <option value="theme-forest">Forest Glade</option>
+                        <option value="theme-dark">Midnight Slate</option>
+                    </select>
+                </div>
+
+                <button class="start-btn" onclick="launchGame()">Start Game</button>
+                <div style="display:flex; gap:5px; margin-top:8px;">
+                    <button class="option-btn" onclick="openSaveLoad()">Load Game</button>
+                </div>
+            </div>
+        </div>
+
+        <!-- Save/Load Modal -->
+        <div id="save-modal" class="overlay" style="display:none;">
+            <div class="menu-content">
+                <h3>Save / Load</h3>
+                <div class="menu-group">
+                    <span class="menu-label">Save Filename</span>
+                    <input type="text" id="save-name" placeholder="chess_game">
+                    <button class="start-btn" style="margin-top:5px; background:#4a6fa5;" onclick="doSave()">Download Save</button>
+                </div>
+                <div class="menu-group">
+                    <span class="menu-label">Load File</span>
+                    <button class="start-btn" style="background:#555;" onclick="document.getElementById('file-input').click()">Select File</button>
+                </div>
+                <button class="option-btn" onclick="document.getElementById('save-modal').style.display='none'; logAction('Closed Save Menu')" style="width:100%">Close</button>
+            </div>
+        </div>
+        <input type="file" id="file-input" style="display:none" onchange="doLoad(this)" accept=".chess,.json">
+
+        <!-- Game Interface -->
+        <div class="main-layout">
+            <div id="board"></div>
+
+            <div class="sidebar">
+                <div class="logo-area">
+                    <h1 style="font-size:1.5rem; margin-bottom:5px;">Python Chess</h1>
+                    <span id="clock" style="font-family:monospace; color:#aaa;">00:00</span>
+                </div>
+
+                <!-- Opponent -->
+                <div class="player-card" id="card-b">
+                    <div class="player-header">
+                        <input type="text" id="name-b" class="player-name-input" value="Black">
+                        <span class="timer" id="time-b">10:00</span>
+                    </div>
+                    <small class="score-display">Mat: <span id="mat-b">0</span></small>
+                </div>
+
+                <!-- Info -->
+                <div class="game-info-panel">
+                    <div id="status-text" style="color:#ffd700; font-weight:bold;">White's Turn</div>
+                    <div class="eval-bar-bg">
+                        <div id="eval-fill" class="eval-bar-fill"></div>
+                    </div>
+                    <div class="eval-labels">
+                        <span>White</span><span id="win-pct">50%</span><span>Black</span>
+                    </div>
+                    <div id="bot-msg" style="margin-top:8px; font-size:0.8rem; font-style:italic; color:#aaa; min-height:1.2em;"></div>
+                </div>
+
+                <!-- History -->
+                <div class="history-panel" id="pgn-container"></div>
+
+                <!-- Player -->
+                <div class="player-card active-turn" id="card-w">
+                    <div class="player-header">
+                        <input type="text" id="name-w" class="player-name-input" value="White">
+                        <span class="timer" id="time-w">10:00</span>
+                    </div>
+                    <small class="score-display">Mat: <span id="mat-w">0</span></small>
+                </div>
+
+                <!-- Controls -->
+                <div style="display:grid; grid-template-columns:1fr 1fr; gap:5px;">
+                    <button class="option-btn" onclick="toggleHeatmap()">Heatmap</button>
+                    <button class="option-btn" onclick="undoMove()">Undo</button>
+                    <button class="option-btn" onclick="openSaveLoad()">Save</button>
+                    <button class="option-btn" style="background:#b71c1c;" onclick="confirmQuit()">Quit</button>
+                    <button class="option-btn" style="grid-column:span 2; background:#2e7d32;" onclick="showMenu()">New Game</button>
+                </div>
+            </div>
+        </div>
+    </div>
+
+    <script>
+        // --- LOGGING ---
+        // Events are buffered and sent as one NDJSON batch per timer tick or size threshold
+        const LOG_FLUSH_MS = 2000, LOG_BATCH_MAX = 25;
+        const logBuffer = [];
+        let logTimer = null;
+
+        function logAction(msg) {
+            if(window.pywebview) {
+                window.pywebview.api.log_event(msg);
+                return;
+            }
+            logBuffer.push(JSON.stringify({t: Date.now(), msg}));
+            if(logBuffer.length >= LOG_BATCH_MAX) flushLog();
+            else if(!logTimer) logTimer = setTimeout(flushLog, LOG_FLUSH_MS);
+        }
+
+        function flushLog(onUnload) {
+            if(logTimer) { clearTimeout(logTimer); logTimer = null; }
+            if(logBuffer.length === 0) return;
+            const body = logBuffer.splice(0).join('\\n') + '\\n';
+            if(onUnload === true && navigator.sendBeacon) {
+                navigator.sendBeacon('/log_action', new Blob([body], {type:'application/x-ndjson'}));
+            } else {
+                fetch('/log_action', {method:'POST', headers:{'Content-Type':'application/x-ndjson'}, body, keepalive:true}).catch(e=>{});
+            }
+        }
+        window.addEventListener('pagehide', () => flushLog(true));
+        document.addEventListener('visibilitychange', () => { if(document.visibilityState==='hidden') flushLog(true); });
+
+        // --- CONSTANTS & CONFIG ---
+        const pieces = { w: { k:'♔', q:'♕', r:'♖', b:'♗', n:'♘', p:'♙' }, b: { k:'♚', q:'♛', r:'♜', b:'♝', n:'♞', p:'♟' } };
+        const vals = { p:100, n:320, b:330, r:500, q:900, k:20000 };
+        const pName = {'p':'Pawn','n':'Knight','b':'Bishop','r':'Rook','q':'Queen','k':'King'};
+        const cols = 'abcdefgh', rows = '87654321';
+        // Castling rights kept when a move touches square r*8+c (king and rook home squares)
+        const CASTLE_KEEP = Array(64).fill(15);
+        CASTLE_KEEP[60] = 12; CASTLE_KEEP[63] = 14; CASTLE_KEEP[56] = 13;
+        CASTLE_KEEP[4] = 3; CASTLE_KEEP[7] = 11; CASTLE_KEEP[0] = 7;
+        // Move directions as [dr, dc]; KING_DIRS lists the four rook directions first
+        const KNIGHT_DIRS = [[2,1],[2,-1],[-2,1],[-2,-1],[1,2],[1,-2],[-1,2],[-1,-2]];
+        const KING_DIRS = [[0,1],[0,-1],[1,0],[-1,0],[1,1],[1,-1],[-1,1],[-1,-1]];
+        const DIRS = {n: KNIGHT_DIRS, b: KING_DIRS.slice(4), r: KING_DIRS.slice(0, 4), q: KING_DIRS, k: KING_DIRS};
+        // PST (Simplified)
+        const pst = {
+            p: [ [0,0,0,0,0,0,0,0],[50,50,50,50,50,50,50,50],[10,10,20,30,30,20,10,10],[5,5,10,25,25,10,5,5],[0,0,0,20,20,0,0,0],[5,-5,-10,0,0,-10,-5,5],[5,10,10,-20,-20,10,10,5],[0,0,0,0,0,0,0,0] ],
+            n: [ [-50,-40,-30,-30,-30,-30,-40,-50],[-40,-20,0,0,0,0,-20,-40],[-30,0,10,15,15,10,0,-30],[-30,5,15,20,20,15,5,-30],[-30,0,15,20,20,15,0,-30],[-30,5,10,15,15,10,5,-30],[-40,-20,0,5,5,0,-20,-40],[-50,-40,-30,-30,-30,-30,-40,-50] ]
+        };
+        
+        // Opening Book (Source-Target Coordinates)
+        // e2e4 -> 6,4 to 4,4
+        const book = {
+            "": [{r:6,c:4, tr:4,tc:4}, {r:6,c:3, tr:4,tc:3}, {r:7,c:6, tr:5,tc:5}], // e4, d4, Nf3
+            "e2e4": [{r:1,c:4, tr:3,tc:4}, {r:1,c:2, tr:3,tc:2}], // e5, c5
+            "d2d4": [{r:1,c:3, tr:3,tc:3}, {r:0,c:6, tr:2,tc:5}], // d5, Nf6
+        };
+
+        // --- STATE ---
+        let board = [], turn = 'w', mode = 'pvp', level = 1, style = 'standard';
+        let history = [], pgn = [], moveStr = ""; // history: undo records from makeMove
+        let castling = 15, ep = null; // Castling rights K=1 Q=2 k=4 q=8; en passant target {r,c}
+        let mat = {w:0, b:0}; // Material totals, maintained by executeMove/undoMove
+        let uciMoves = []; // Game moves in UCI notation (sent to the server engine)
+        let startFen = ''; // Set when a game starts from a saved position instead of the opening
+        let tW = 600, tB = 600, timer = null, tickAt = 0, active = false;
+        let timeControl = 600, gameStart = 0;
+        let selected = null, lastMove = null;
+        let showHM = false;
+
+        // --- INIT ---
+        setInterval(() => document.getElementById('clock').innerText = new Date().toLocaleTimeString([],{hour:'2-digit',minute:'2-digit'}), 1000);
+        
+        function showMenu() { 
+            stopTimer();
+            logAction("Opened Main Menu");
+            document.getElementById('menu-overlay').style.display = 'flex'; 
+        }
+
+        function changeTheme(themeClass) {
+            document.body.className = themeClass;
+            logAction("Changed Theme to " + themeClass);
+        }
+
+        function selectMode(m) {
+            mode = m;
+            logAction("Selected Mode: " + m);
+            document.getElementById('btn-mode-pvp').className = m==='pvp'?'option-btn selected':'option-btn';
+            document.getElementById('btn-mode-bot').className = m==='bot'?'option-btn selected':'option-btn';
+            document.getElementById('diff-section').style.display = m==='bot'?'block':'none';
+            document.getElementById('pers-section').style.display = m==='bot'?'block':'none';
+        }
+
+        function selectLevel(l) {
+            level = l;
+            logAction("Selected Bot Level: " + l);
+            for(let i=1; i<=4; i++) document.getElementById('btn-lvl-'+i).className = i===l?'option-btn selected':'option-btn';
+        }
+
+        function launchGame() {
+            style = document.getElementById('bot-style').value;
+            const t = parseInt(document.getElementById('time-select').value);
+            tW = t; tB = t; timeControl = t; gameStart = Date.now();
+            
+            document.getElementById('name-w').value = (mode==='bot') ? "You" : "Player 1";
+            document.getElementById('name-b').value = (mode==='bot') ? `Bot (${style})` : "Player 2";
+            
+            logAction(`Game Started: ${mode}, Level ${level}, Time ${t}s`);
+            resetBoard();
+            document.getElementById('menu-overlay').style.display = 'none';
+            active = true;
+            render(); updateUI(); startTimer();
+        }
+
+        function resetBoard() {
+            board = [
+                ['br','bn','bb','bq','bk','bb','bn','br'],
+                ['bp','bp','bp','bp','bp','bp','bp','bp'],
+                ...Array(4).fill(null).map(()=>Array(8).fill('')),
+                ['wp','wp','wp','wp','wp','wp','wp','wp'],
+                ['wr','wn','wb','wq','wk','wb','wn','wr']
+            ];
+            turn = 'w'; history = []; pgn = []; moveStr = ""; uciMoves = []; startFen = ''; lastMove = null; selected = null;
+            castling = 15; ep = null;
+            countMaterial();
+        }
+
+        function countMaterial() {
+            // Full scan only when a board is set up or loaded
+            mat = {w:0, b:0};
+            for(let r=0; r<8; r++) for(let c=0; c<8; c++) if(board[r][c]) mat[board[r][c][0]] += vals[board[r][c][1]];
+        }
+
+        // --- CORE ENGINE ---
+        function onBoard(r,c) { return r>=0 && r<8 && c>=0 && c<8; }
+
+        function getMoves(b, r, c) {
+            const p = b[r][c], type = p[1], col = p[0];
+            const m = [];
+            const add = (nr,nc) => { if(onBoard(nr,nc) && (!b[nr][nc] || b[nr][nc][0]!==col)) m.push({r:nr, c:nc}); };
+            
+            if(type==='p') {
+                const d = col==='w'?-1:1;
+                if(onBoard(r+d,c) && !b[r+d][c]) {
+                    m.push({r:r+d, c:c});
+                    if((col==='w' && r===6) || (col==='b' && r===1)) if(!b[r+d*2][c]) m.push({r:r+d*2, c:c});
+                }
+                if(onBoard(r+d,c-1) && b[r+d][c-1] && b[r+d][c-1][0]!==col) m.push({r:r+d, c:c-1});
+                if(onBoard(r+d,c+1) && b[r+d][c+1] && b[r+d][c+1][0]!==col) m.push({r:r+d, c:c+1});
+            } else {
+                if(type==='n' || type==='k') {
+                    for(let d of DIRS[type]) add(r+d[0], c+d[1]);
+                } else {
+                    for(let d of DIRS[type]) {
+                        for(let i=1; i<8; i++) {
+                            const nr=r+d[0]*i, nc=c+d[1]*i;
+                            if(!onBoard(nr,nc)) break;
+                            if(b[nr][nc]) { if(b[nr][nc][0]!==col) m.push({r:nr, c:nc}); break; }
+                            m.push({r:nr, c:nc});
+                        }
+                    }
+                }
+            }
+            return m;
+        }
+
+        function getLegalMoves(b, col) {
+            // Pseudo-legal moves plus castling and en passant, kept if the own king is not attacked afterwards
+            const opp = col==='w'?'b':'w', moves = [];
+            let kr = -1, kc = -1;
+            for(let r=0; r<8; r++) for(let c=0; c<8; c++) if(b[r][c]===col+'k') { kr=r; kc=c; }
+            if(kr < 0) return moves;
+            const keep = (from, to, epR) => {
+                // Virtual move
+                const saved = b[to.r][to.c], epP = epR!=null ? b[epR][to.c] : '';
+                b[to.r][to.c] = b[from.r][from.c]; b[from.r][from.c] = '';
+                if(epR!=null) b[epR][to.c] = '';
+                const isKing = from.r===kr && from.c===kc;
+                const ok = !attacked(b, isKing ? to.r : kr, isKing ? to.c : kc, opp);
+                b[from.r][from.c] = b[to.r][to.c]; b[to.r][to.c] = saved;
+                if(epR!=null) b[epR][to.c] = epP;
+                return ok;
+            };
+            for(let r=0; r<8; r++) {
+                for(let c=0; c<8; c++) {
+                    if(!b[r][c] || b[r][c][0]!==col) continue;
+                    const from = {r,c}, pawn = b[r][c][1]==='p';
+                    for(let m of getMoves(b, r, c)) {
+                        if(!keep(from, m)) continue;
+                        if(pawn && (m.r===0 || m.r===7)) for(let p of 'qrbn') moves.push({from, to:m, promo:p});
+                        else moves.push({from, to:m});
+                    }
+                    // En passant: the target square is empty, the captured pawn sits beside us
+                    if(pawn && ep && ep.r===r+(col==='w'?-1:1) && Math.abs(ep.c-c)===1 && keep(from, ep, r))
+                        moves.push({from, to:{r:ep.r, c:ep.c}});
+                }
+            }
+            // Castling: rights left, squares between empty, king not passing through check
+            const home = col==='w'?7:0, k = col==='w'?1:4;
+            if(kr===home && kc===4 && castling & (3*k) && !attacked(b, home, 4, opp)) {
+                const row = b[home];
+                if(castling & k && row[7]===col+'r' && !row[5] && !row[6] && !attacked(b, home, 5, opp) && !attacked(b, home, 6, opp))
+                    moves.push({from:{r:home, c:4}, to:{r:home, c:6}});
+                if(castling & (2*k) && row[0]===col+'r' && !row[1] && !row[2] && !row[3] && !attacked(b, home, 3, opp) && !attacked(b, home, 2, opp))
+                    moves.push({from:{r:home, c:4}, to:{r:home, c:2}});
+            }
+            return moves;
+        }
+
+        function attacked(b, r, c, by) {
+            // Is (r,c) attacked by side `by`? Looks outwards from the square instead of generating every enemy move
+            const pr = by==='w' ? r+1 : r-1;
+            if(onBoard(pr,c-1) && b[pr][c-1]===by+'p') return true;
+            if(onBoard(pr,c+1) && b[pr][c+1]===by+'p') return true;
+            for(let d of KNIGHT_DIRS) { const nr=r+d[0], nc=c+d[1]; if(onBoard(nr,nc) && b[nr][nc]===by+'n') return true; }
+            for(let d of KING_DIRS) { const nr=r+d[0], nc=c+d[1]; if(onBoard(nr,nc) && b[nr][nc]===by+'k') return true; }
+            for(let i=0; i<8; i++) {
+                const d = KING_DIRS[i], slider = i < 4 ? 'r' : 'b';
+                for(let nr=r+d[0], nc=c+d[1]; onBoard(nr,nc); nr+=d[0], nc+=d[1]) {
+                    const p = b[nr][nc];
+                    if(!p) continue;
+                    if(p[0]===by && (p[1]===slider || p[1]==='q')) return true;
+                    break;
+                }
+            }
+            return false;
+        }
+
+        function inCheck(b, col) {
+            for(let r=0; r<8; r++) for(let c=0; c<8; c++) if(b[r][c]===col+'k') return attacked(b, r, c, col==='w'?'b':'w');
+            return true; // King missing (shouldnt happen)
+        }
+
+        // --- GAMEPLAY ---
+        function handleClick(r, c) {
+            if(!active || (mode==='bot' && turn==='b')) return;
+            logAction("Clicked square " + r + "," + c);
+            
+            // Move
+            if(selected) {
+                const move = pickMove(r, c);
+                if(move) { executeMove(move); return; }
+            }
+            
+            // Select
+            if(board[r][c] && board[r][c][0]===turn) {
+                selected = {r,c};
+                highlightBoard(); // Call Highlight instead of render
+            } else {
+                selected = null;
+                highlightBoard();
+            }
+        }
+
+        function pickMove(r, c) {
+            // Legal move of the selected piece to (r,c); a pawn reaching the last rank asks what to promote to
+            const moves = getLegalMoves(board, turn).filter(m => m.from.r===selected.r && m.from.c===selected.c && m.to.r===r && m.to.c===c);
+            if(moves.length < 2) return moves[0] || null;
+            const choice = (prompt("Promote to: q = Queen, r = Rook, b = Bishop, n = Knight", "q") || '').trim().toLowerCase();
+            return moves.find(m => m.promo===choice[0]) || null;
+        }
+
+        function highlightBoard() {
+            // Clear existing
+            document.querySelectorAll('.square').forEach(el => {
+                el.classList.remove('selected', 'highlight', 'capture-highlight');
+            });
+            
+            if(!selected) return;
+
+            // Highlight source
+            const srcIdx = selected.r * 8 + selected.c;
+            const squares = document.getElementById('board').children;
+            if(squares[srcIdx]) squares[srcIdx].classList.add('selected');
+
+            // Highlight moves
+            const moves = getLegalMoves(board, turn).filter(m => m.from.r===selected.r && m.from.c===selected.c);
+            moves.forEach(m => {
+                const idx = m.to.r * 8 + m.to.c;
+                if(squares[idx]) {
+                    squares[idx].classList.add(board[m.to.r][m.to.c] ? 'capture-highlight' : 'highlight');
+                }
+            });
+        }
+
+        function makeMove(move) {
+            // Apply a move in place and push a small undo record (shared by the game and the in-page search)
+            const p = board[move.from.r][move.from.c];
+            const u = {move, piece: p, captured: board[move.to.r][move.to.c], epSq: null, promo: '', castle: false, castling, ep, tW, tB};
+            board[move.to.r][move.to.c] = p;
+            board[move.from.r][move.from.c] = '';
+            
+            // En passant: a pawn moving diagonally onto an empty square
+            if(p[1]==='p' && move.from.c!==move.to.c && !u.captured) {
+                u.epSq = {r: move.from.r, c: move.to.c};
+                u.captured = board[move.from.r][move.to.c];
+                board[move.from.r][move.to.c] = '';
+            }
+            
+            // Castling: the king moves two files, bring the rook across
+            if(p[1]==='k' && Math.abs(move.to.c - move.from.c)===2) {
+                u.castle = true;
+                const rc = move.to.c > move.from.c ? 7 : 0, nc = move.to.c > move.from.c ? 5 : 3;
+                board[move.from.r][nc] = board[move.from.r][rc];
+                board[move.from.r][rc] = '';
+            }
+
+            if(u.captured) mat[u.captured[0]] -= vals[u.captured[1]];
+
+            // Promotion
+            if(p[1]==='p' && (move.to.r===0 || move.to.r===7)) {
+                u.promo = move.promo || 'q';
+                board[move.to.r][move.to.c] = p[0]+u.promo;
+                mat[p[0]] += vals[u.promo] - vals.p;
+            }
+
+            castling &= CASTLE_KEEP[move.from.r*8 + move.from.c] & CASTLE_KEEP[move.to.r*8 + move.to.c];
+            ep = (p[1]==='p' && Math.abs(move.to.r - move.from.r)===2) ? {r: (move.from.r + move.to.r)/2, c: move.from.c} : null;
+            turn = turn==='w'?'b':'w';
+            history.push(u);
+            return u;
+        }
+
+        function unmakeMove() {
+            const u = history.pop(), m = u.move;
+            board[m.from.r][m.from.c] = u.piece;
+            board[m.to.r][m.to.c] = u.epSq ? '' : u.captured;
+            if(u.epSq) board[u.epSq.r][u.epSq.c] = u.captured;
+            if(u.castle) {
+                const rc = m.to.c > m.from.c ? 7 : 0, nc = m.to.c > m.from.c ? 5 : 3;
+                board[m.from.r][rc] = board[m.from.r][nc];
+                board[m.from.r][nc] = '';
+            }
+            if(u.captured) mat[u.captured[0]] += vals[u.captured[1]];
+            if(u.promo) mat[u.piece[0]] -= vals[u.promo] - vals.p;
+            castling = u.castling; ep = u.ep; turn = u.piece[0];
+            return u;
+        }
+
+        function playMove(move) {
+            // Apply a game move (no UI); returns its SAN
+            const u = makeMove(move);
+            const san = u.castle ? (move.to.c > move.from.c ? 'O-O' : 'O-O-O')
+                : (u.piece[1]==='p'?'':u.piece[1].toUpperCase()) + (u.captured?'x':'') + cols[move.to.c] + rows[move.to.r] + (u.promo ? '='+u.promo.toUpperCase() : '');
+            pgn.push(san);
+            
+            // Update Book string
+            const uci = cols[move.from.c] + rows[move.from.r] + cols[move.to.c] + rows[move.to.r];
+            moveStr += uci;
+            uciMoves.push(uci + u.promo);
+            return san;
+        }
+
+        function executeMove(move) {
+            if(active) { tickClock(); if(!active) return; } // settle the mover's clock first
+            const san = playMove(move);
+            lastMove = move;
+            selected = null;
+            
+            logAction(`Move executed: ${san}`);
+            
+            // Check End
+            const nextMoves = getLegalMoves(board, turn);
+            if(nextMoves.length === 0) {
+                active = false; stopTimer();
+                if(inCheck(board, turn)) {
+                    logAction("Checkmate");
+                    archiveGame(turn==='w' ? '0-1' : '1-0', 'checkmate');
+                    alert("Checkmate!"); 
+                } else {
+                    logAction("Stalemate");
+                    archiveGame('1/2-1/2', 'stalemate');
+                    alert("Stalemate!");
+                }
+            }
+            
+            render(); updateUI();
+            
+            // Bot Turn
+            if(active && mode==='bot' && turn==='b') {
+                document.getElementById('bot-msg').innerText = "Thinking...";
+                setTimeout(botMove, 100);
+            }
+        }
+
+        function undoMove() {
+            logAction("User clicked Undo");
+            if(history.length === 0) return;
+            // Undo 2 if bot
+            const steps = (mode==='bot' && turn==='w' && history.length > 1) ? 2 : 1;
+            
+            for(let i=0; i<steps; i++) {
+                const u = unmakeMove();
+                tW = u.tW; tB = u.tB;
+                pgn.pop(); uciMoves.pop(); moveStr = moveStr.slice(0, -4);
+            }
+            lastMove = null; selected = null; active = true; tickAt = performance.now();
+            render(); updateUI();
+        }
+
+        // --- BOT ---
+        function uciToMove(u) {
+            const move = {from:{r:rows.indexOf(u[1]), c:cols.indexOf(u[0])}, to:{r:rows.indexOf(u[3]), c:cols.indexOf(u[2])}};
+            if(u.length > 4) move.promo = u[4];
+            return move;
+        }
+
+        function inferCastling() {
+            // Rights for boards without move history: king and rook still on their home squares
+            castling = 0;
+            if(board[7][4]==='wk') { if(board[7][7]==='wr') castling |= 1; if(board[7][0]==='wr') castling |= 2; }
+            if(board[0][4]==='bk') { if(board[0][7]==='br') castling |= 4; if(board[0][0]==='br') castling |= 8; }
+        }
+
+        function boardToFen() {
+            // Fallback when the move list is unknown (e.g. older saves)
+            const ranks = board.map(row => {
+                let s = '', e = 0;
+                for(const p of row) {
+                    if(!p) { e++; continue; }
+                    if(e) { s += e; e = 0; }
+                    s += p[0]==='w' ? p[1].toUpperCase() : p[1];
+                }
+                return s + (e ? e : '');
+            });
+            const castle = [...'KQkq'].filter((ch, i) => castling & (1 << i)).join('');
+            const epSq = ep ? cols[ep.c] + rows[ep.r] : '-';
+            return `${ranks.join('/')} ${turn} ${castle || '-'} ${epSq} 0 ${Math.floor(pgn.length/2)+1}`;
+        }
+
+        // Ask the server engine for a move; fall back to the in-page search if unreachable
+        async function botMove() {
+            const ply = history.length;
+            try {
+                const req = uciMoves.length===history.length ? {fen: startFen || undefined, moves: uciMoves} : {fen: boardToFen()};
+                Object.assign(req, {level, style, time_left: tB});
+                const res = await fetch('/api/bestmove', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(req)});
+                const d = await res.json();
+                if(!res.ok || !d.move) throw new Error(d.error || 'No move');
+                if(!active || turn!=='b' || history.length!==ply) return; // Game changed while thinking
+                const move = uciToMove(d.move);
+                const p = board[move.from.r][move.from.c];
+                document.getElementById('bot-msg').innerText = d.book ? `Playing from Opening Book (${d.games} games)`
+                    : `Bot moved ${pName[p[1]]} (depth ${d.depth}, eval ${(d.score/100).toFixed(2)}, ${d.nodes} nodes in ${d.time_ms} ms).`;
+                executeMove(move);
+            } catch(e) {
+                if(active && turn==='b' && history.length===ply) localBotMove();
+            }
+        }
+
+        function localBotMove() {
+            // 1. Opening Book
+            if(book[moveStr]) {
+                const opts = book[moveStr];
+                const bm = opts[Math.floor(Math.random()*opts.length)];
+                // Verify legal (book moves should be legal but safe check)
+                const move = {from:{r:bm.r, c:bm.c}, to:{r:bm.tr, c:bm.tc}};
+                document.getElementById('bot-msg').innerText = "Playing from Opening Book";
+                executeMove(move);
+                return;
+            }
+
+            // 2. Search
+            const moves = getLegalMoves(board, 'b');
+            if(moves.length === 0) return;
+
+            // Move Ordering: Captures first
+            moves.sort((a,b) => {
+                const vA = vals[board[a.to.r][a.to.c]?.[1]] || 0;
+                const vB = vals[board[b.to.r][b.to.c]?.[1]] || 0;
+                return vB - vA;
+            });
+
+            let bestMove = moves[0];
+            let bestScore = -Infinity;
+            const depth = level; 
+            const t0 = performance.now();
+            searchNodes = 0;
+
+            // Simple Minimax
+            for(let m of moves) {
+                makeMove(m);
+                const score = -minimax(depth-1, -100000, 100000, false);
+                unmakeMove();
+                
+                if(score > bestScore) { bestScore = score; bestMove = m; }
+            }
+            
+            // Explain
+            const p = board[bestMove.from.r][bestMove.from.c];
+            const ms = Math.round(performance.now() - t0);
+            document.getElementById('bot-msg').innerText = `Bot moved ${pName[p[1]]} (in-page search: depth ${depth}, ${searchNodes} nodes in ${ms} ms).`;
+
+            executeMove(bestMove);
+        }
+
+        let searchNodes = 0;
+        function minimax(depth, alpha, beta, isMax) {
+            searchNodes++;
+            if(depth===0) return evaluate();
+            
+            const moves = getLegalMoves(board, isMax?'b':'w');
+            if(moves.length===0) return inCheck(board, isMax?'b':'w') ? -20000 : 0;
+
+            for(let m of moves) {
+                makeMove(m);
+                const score = -minimax(depth-1, -beta, -alpha, !isMax);
+                unmakeMove();
+                
+                if(score >= beta) return beta;
+                if(score > alpha) alpha = score;
+            }
+            return alpha;
+        }
+
+        function evaluate() {
+            let score = 0;
+            for(let r=0; r<8; r++) for(let c=0; c<8; c++) {
+                const p = board[r][c];
+                if(p) {
+                    let v = vals[p[1]];
+                    // PST Tweak (simplified)
+                    if(p[1]==='p' || p[1]==='n') {
+                        if(p[0]==='w') v += (pst.p[r][c] || 0)/10;
+                        else v += (pst.p[7-r][c] || 0)/10;
+                    }
+                    score += (p[0]==='b' ? v : -v);
+                }
+            }
+            // Personality
+            if(style==='aggressive') score *= 1.1;
+            return score;
+        }
+
+        // --- ARCHIVE ---
+        function archiveGame(result, termination) {
+            // Store the finished game on the server (needs the full move list)
+            if(uciMoves.length !== pgn.length) return;
+            const game = {
+                white: document.getElementById('name-w').value, black: document.getElementById('name-b').value,
+                result, termination, mode, level: mode==='bot' ? level : null, style: mode==='bot' ? style : null,
+                time_control: timeControl, start_fen: startFen || null, moves: uciMoves, started_at: gameStart/1000, finished_at: Date.now()/1000
+            };
+            fetch('/api/games', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(game)}).catch(e=>{});
+        }
+
+        // --- SAVE/LOAD ---
+        function openSaveLoad() {
+            logAction("Opened Save/Load Menu");
+            // Default filename
+            const d = new Date();
+            const name = `chess_${d.getFullYear()}-${d.getMonth()+1}-${d.getDate()}_${d.getHours()}-${d.getMinutes()}`;
+            document.getElementById('save-name').value = name;
+            document.getElementById('save-modal').style.display = 'flex';
+        }
+
+        // --- SAVE FORMAT ---
+        // Binary saves: 'PCS1', flags (1 = bot game, 2 = start FEN follows), level, style index,
+        // varint clocks, [varint length + start FEN], varint move count, then 2 bytes per move
+        // (little-endian from | to<<6 | promo<<12, a1=0, promo 1-4 = n,b,r,q). Board and
+        // history are rebuilt by replaying the moves.
+        const SAVE_MAGIC = 'PCS1', STYLE_NAMES = ['standard','aggressive','defensive','gambit'], PROMO_CODES = ' nbrq';
+        const sqIndex = (f, r) => cols.indexOf(f) + 8*(7-rows.indexOf(r));
+        const sqName = (i) => cols[i&7] + rows[7-(i>>3)];
+
+        function pushVarint(out, n) {
+            n = Math.max(0, Math.floor(n));
+            while(n >= 0x80) { out.push((n & 0x7f) | 0x80); n = Math.floor(n / 128); }
+            out.push(n);
+        }
+
+        function encodeSave() {
+            const out = [...SAVE_MAGIC].map(ch => ch.charCodeAt(0));
+            // Without a complete move list (old saves) the current position becomes the start
+            const complete = uciMoves.length === history.length;
+            const fen = complete ? startFen : boardToFen(), moves = complete ? uciMoves : [];
+            out.push((mode==='bot' ? 1 : 0) | (fen ? 2 : 0), level, Math.max(0, STYLE_NAMES.indexOf(style)));
+            pushVarint(out, tW); pushVarint(out, tB);
+            if(fen) { pushVarint(out, fen.length); for(const ch of fen) out.push(ch.charCodeAt(0)); }
+            pushVarint(out, moves.length);
+            for(const u of moves) {
+                const code = sqIndex(u[0], u[1]) | (sqIndex(u[2], u[3]) << 6) | ((u.length > 4 ? PROMO_CODES.indexOf(u[4]) : 0) << 12);
+                out.push(code & 0xff, code >> 8);
+            }
+            return new Uint8Array(out);
+        }
+
+        function decodeSave(bytes) {
+            let i = 4;
+            const varint = () => {
+                let n = 0, mul = 1, b;
+                do { b = bytes[i++]; n += (b & 0x7f) * mul; mul *= 128; } while(b & 0x80);
+                return n;
+            };
+            const flags = bytes[i++];
+            const d = {mode: (flags & 1) ? 'bot' : 'pvp', level: bytes[i++], style: STYLE_NAMES[bytes[i++]] || 'standard', fen: ''};
+            d.tW = varint(); d.tB = varint();
+            if(flags & 2) { const n = varint(); d.fen = String.fromCharCode(...bytes.subarray(i, i+n)); i += n; }
+            const n = varint();
+            if(i + 2*n > bytes.length) throw new Error('Truncated save');
+            d.moves = [];
+            for(let k=0; k<n; k++, i+=2) {
+                const code = bytes[i] | (bytes[i+1] << 8), promo = code >> 12;
+                d.moves.push(sqName(code & 63) + sqName((code >> 6) & 63) + (promo ? PROMO_CODES[promo] : ''));
+            }
+            return d;
+        }
+
+        function fenToBoard(fen) {
+            const [placement, side, rights, epSq] = fen.split(' ');
+            board = placement.split('/').map(rank => {
+                const row = [];
+                for(const ch of rank) {
+                    if(ch >= '1' && ch <= '8') for(let k=0; k<+ch; k++) row.push('');
+                    else row.push((ch === ch.toUpperCase() ? 'w' : 'b') + ch.toLowerCase());
+                }
+                return row;
+            });
+            turn = side || 'w';
+            castling = 0;
+            for(const ch of rights || '') if('KQkq'.includes(ch)) castling |= 1 << 'KQkq'.indexOf(ch);
+            ep = (epSq && epSq !== '-') ? {r: rows.indexOf(epSq[1]), c: cols.indexOf(epSq[0])} : null;
+        }
+
+        function isBinarySave(bytes) {
+            return bytes.length >= 4 && String.fromCharCode(...bytes.subarray(0, 4)) === SAVE_MAGIC;
+        }
+
+        async function doSave() {
+            logAction("Initiated Game Save");
+            let name = document.getElementById('save-name').value || 'chess_save';
+            if(!name.endsWith('.chess')) name += '.chess';
+            
+            const data = encodeSave();
+            
+            // Desktop Save (bytes travel base64-encoded over the bridge)
+            if(window.pywebview) {
+                const res = await window.pywebview.api.save_content(btoa(String.fromCharCode(...data)), name, true);
+                if(res === true) alert("Saved!"); else alert("Save Error");
+            } 
+            // Browser Save (Native or Blob)
+            else if(window.showSaveFilePicker) {
+                try {
+                    const handle = await showSaveFilePicker({suggestedName: name});
+                    const w = await handle.createWritable();
+                    await w.write(data); await w.close();
+                    alert("Saved!");
+                } catch(e) {}
+            } else {
+                // Blob Fallback
+                const blob = new Blob([data], {type:'application/octet-stream'});
+                const url = URL.createObjectURL(blob);
+                const a = document.createElement('a'); a.href = url; a.download = name; a.click();
+            }
+            document.getElementById('save-modal').style.display = 'none';
+        }
+
+        function loadBinarySave(d) {
+            resetBoard();
+            if(d.fen) { fenToBoard(d.fen); startFen = d.fen; countMaterial(); }
+            mode = d.mode; level = d.level; style = d.style; tW = d.tW; tB = d.tB;
+            for(const u of d.moves) playMove(uciToMove(u));
+        }
+
+        function loadJsonSave(d) {
+            // Older saves: full board snapshots for every ply. Replay the move list when it is
+            // complete, otherwise continue from the final board (undo history is lost)
+            const moves = d.uciMoves || [];
+            if(moves.length && moves.length === d.history.length) {
+                loadBinarySave({fen: '', moves, mode: d.mode, level: d.level, style: d.style, tW: d.tW, tB: d.tB});
+                return;
+            }
+            resetBoard();
+            board = d.board; turn = d.turn; inferCastling();
+            mode = d.mode; level = d.level; style = d.style; tW = d.tW; tB = d.tB;
+            startFen = boardToFen(); pgn = d.pgn;
+            countMaterial();
+        }
+
+        function doLoad(input) {
+            logAction("Loading Game from File...");
+            const f = input.files[0];
+            if(!f) return;
+            const r = new FileReader();
+            r.onload = (e) => {
+                try {
+                    const bytes = new Uint8Array(e.target.result);
+                    if(isBinarySave(bytes)) loadBinarySave(decodeSave(bytes));
+                    else loadJsonSave(JSON.parse(new TextDecoder().decode(bytes)));
+                    
+                    // Restore UI
+                    if(mode==='bot') document.getElementById('name-b').value = `Bot (${style})`;
+                    
+                    active = true; lastMove=null; selected=null;
+                    render(); updateUI(); startTimer();
+                    document.getElementById('save-modal').style.display = 'none';
+                    logAction("Game Loaded Successfully");
+                } catch(err) { alert("Invalid File"); }
+            };
+            r.readAsArrayBuffer(f);
+            input.value = "";
+        }
+
+        // --- UI ---
+        function render() {
+            const el = document.getElementById('board');
+            el.innerHTML = '';
+            
+            const hm = showHM ? getHeatmap() : null;
+            // Targets of the selected piece and check state, computed once per render
+            const targets = selected ? getLegalMoves(board, turn).filter(m => m.from.r===selected.r && m.from.c===selected.c) : [];
+            const checked = inCheck(board, turn);
+
+            for(let r=0; r<8; r++) for(let c=0; c<8; c++) {
+                const sq = document.createElement('div');
+                const isDark = (r+c)%2===1;
+                sq.className = `square ${isDark?'dark':'light'}`;
+                sq.onclick = () => handleClick(r,c);
+                sq.ondragover = (e) => e.preventDefault();
+                sq.ondrop = (e) => {
+                    e.preventDefault();
+                    logAction("Drop at " + r + "," + c);
+                    if(selected) {
+                        const move = pickMove(r, c);
+                        if(move) executeMove(move);
+                    }
+                };
+
+                if(selected && selected.r===r && selected.c===c) sq.classList.add('selected');
+                if(lastMove && ((lastMove.from.r===r && lastMove.from.c===c) || (lastMove.to.r===r && lastMove.to.c===c))) sq.classList.add('last-move');
+                
+                // Highlights
+                if(targets.some(m => m.to.r===r && m.to.c===c)) sq.classList.add(board[r][c]?'capture-highlight':'highlight');
+                
+                // Check
+                if(checked && board[r][c]===turn+'k') sq.classList.add('check');
+
+                // Heatmap
+                if(hm) {
+                    if(hm[r][c] > 0) sq.classList.add('heatmap-w');
+                    if(hm[r][c] < 0) sq.classList.add('heatmap-b');
+                }
+
+                if(board[r][c]) {
+                    const p = document.createElement('span');
+                    p.className = `piece ${board[r][c][0]==='w'?'white':'black'}`;
+                    p.innerText = pieces[board[r][c][0]][board[r][c][1]];
+                    if(board[r][c][0] === turn && !(mode==='bot' && turn==='b')) {
+                        p.draggable = true;
+                        p.ondragstart = (e) => { 
+                            logAction("Drag Start " + r + "," + c); 
+                            selected = {r,c}; 
+                            // Important: Don't re-render, just highlight
+                            highlightBoard(); 
+                            e.dataTransfer.effectAllowed = 'move';
+                            e.dataTransfer.setData('text/plain', JSON.stringify({r,c}));
+                        };
+                    }
+                    sq.appendChild(p);
+                }
+                el.appendChild(sq);
+            }
+        }
+
+        function highlightBoard() {
+            // Clear existing
+            document.querySelectorAll('.square').forEach(el => {
+                el.classList.remove('selected', 'highlight', 'capture-highlight');
+            });
+            
+            if(!selected) return;
+
+            // Highlight source
+            const srcIdx = selected.r * 8 + selected.c;
+            const squares = document.getElementById('board').children;
+            if(squares[srcIdx]) squares[srcIdx].classList.add('selected');
+
+            // Highlight moves
+            const moves = getLegalMoves(board, turn).filter(m => m.from.r===selected.r && m.from.c===selected.c);
+            moves.forEach(m => {
+                const idx = m.to.r * 8 + m.to.c;
+                if(squares[idx]) {
+                    squares[idx].classList.add(board[m.to.r][m.to.c] ? 'capture-highlight' : 'highlight');
+                }
+            });
+        }
+
+        function updateUI() {
+            // Timer
+            const f = t => { t=Math.ceil(t); const m=Math.floor(t/60), s=t%60; return `${m}:${s<10?'0'+s:s}`; };
+            document.getElementById('time-w').innerText = f(tW);
+            document.getElementById('time-b').innerText = f(tB);
+            document.getElementById('card-w').className = `player-card ${turn==='w'?'active-turn':''}`;
+            document.getElementById('card-b').className = `player-card ${turn==='b'?'active-turn':''}`;
+            document.getElementById('status-text').innerText = turn==='w' ? "White's Turn" : "Black's Turn";
+            
+            // Score (maintained totals, no board scan)
+            const matW = mat.w, matB = mat.b;
+            document.getElementById('mat-w').innerText = (matW/100).toFixed(1);
+            document.getElementById('mat-b').innerText = (matB/100).toFixed(1);
+            
+            // Eval Bar
+            const diff = matB - matW; // Basic material eval for bar visual
+            const pct = 50 + (diff / 2000 * 50); // Scale
+            document.getElementById('eval-fill').style.width = Math.min(Math.max(pct, 5), 95) + "%";
+            document.getElementById('win-pct').innerText = (diff > 0 ? "Black " : "White ") + Math.abs(diff/100).toFixed(1);
+
+            // History
+            const h = document.getElementById('pgn-container');
+            let html = "";
+            for(let i=0; i<pgn.length; i++) {
+                if(i%2===0) html += `<span style='color:#888'>${(i/2)+1}.</span> `;
+                html += `<span class='history-move'>${pgn[i]}</span> `;
+            }
+            h.innerHTML = html;
+            h.scrollTop = h.scrollHeight;
+        }
+
+        // Charge the side to move with the real time since the last tick, so
+        // late timer callbacks and a page blocked by the in-page bot still count
+        function tickClock() {
+            const now = performance.now(), dt = (now - tickAt) / 1000;
+            tickAt = now;
+            if(!active) return;
+            if(turn==='w') { tW = Math.max(0, tW - dt); if(tW<=0) { active=false; archiveGame('0-1', 'timeout'); alert("Black Wins!"); } }
+            else { tB = Math.max(0, tB - dt); if(tB<=0) { active=false; archiveGame('1-0', 'timeout'); alert("White Wins!"); } }
+            updateUI();
+        }
+        function startTimer() {
+            if(timer) clearInterval(timer);
+            tickAt = performance.now();
+            timer = setInterval(tickClock, 250);
+        }
+        function stopTimer() { if(timer) clearInterval(timer); }
+
+        function toggleHeatmap() { showHM = !showHM; logAction("Toggled Heatmap"); render(); }
+        function getHeatmap() {
+            // Count attacks for simplistic heatmap
+            const map = Array(8).fill().map(()=>Array(8).fill(0));
+            // Just simulate attack density
+            for(let r=0; r<8; r++) for(let c=0; c<8; c++) if(board[r][c]) {
+                const ms = getMoves(board, r, c);
+                const v = board[r][c][0]==='w' ? 1 : -1;
+                for(let m of ms) map[m.r][m.c] += v;
+            }
+            return map;
+        }
+        function confirmQuit() {
+            logAction("User clicked Quit");
+            if(confirm("Quit?")) {
+                active = false; stopTimer();
+                window.close();
+                document.body.innerHTML = "<h1 style='color:white;text-align:center;margin-top:20%'>Game Closed</h1>";
+            }
+        }
+    </script>
+</body>
+</html>
+"""
+
+# --- Bot Engine Service ---
+# Max search depth per bot level; every level is also bounded by the clock
+BOT_LEVELS = {1: 1, 2: 2, 3: 3, 4: 64}
+DEFAULT_MOVETIME = 3.0   # seconds, when the request carries no clock
+MAX_THINK_SECONDS = 15.0
+BOT_SEARCHERS = 2        # in-process searches that may run at once
+
+# Opening book built with `python app.py build-book` (used when the file exists)
+DEFAULT_BOOK_PATH = "opening_book.bin"
+# Endgame tablebases built with `python app.py build-tb` (used when present)
+DEFAULT_TB_PATH = "tablebases"
+
+
+class BotService:
+    """Server-side bot: a small pool of searchers, each with its own transposition table.
+
+    A search borrows an idle searcher, preferring the one that last searched
+    the same game (`key`) so later turns reuse its table; `hash_mb` is split
+    between the searchers. The parallel searcher used by the GM level with
+    several workers is one shared resource.
+    """
+
+    def __init__(self, hash_mb=64, workers=1, book_path=None, tb_path=None, searchers=BOT_SEARCHERS):
+        self.book = OpeningBook(book_path) if book_path and os.path.exists(book_path) else None
+        self.tablebases = Tablebases(tb_path) if tb_path and os.path.isdir(tb_path) else None
+        searchers = max(1, searchers)
+        self.idle = [Searcher(hash_mb=max(1, hash_mb // searchers), tablebases=self.tablebases)
+                     for _ in range(searchers)]
+        self.last_key = {}  # id(searcher) -> key of the game it last searched
+        self.available = threading.Condition()
+        self.parallel = ParallelSearcher(workers, hash_mb, tablebases=self.tablebases) if workers > 1 else None
+        self.parallel_lock = threading.Lock()
+        self.metrics = SearchMetrics()
+        self.profiler = None  # a ProfileCollector when every search is profiled (--profile)
+
+    @contextlib.contextmanager
+    def borrow(self, parallel=False, key=None):
+        """An idle searcher for the duration of one search (waits for one)."""
+        if parallel:
+            with self.parallel_lock:
+                yield self.parallel
+            return
+        with self.available:
+            while not self.idle:
+                self.available.wait()
+            searcher = next((s for s in self.idle if key is not None and self.last_key.get(id(s)) == key),
+                            self.idle[-1])
+            self.idle.remove(searcher)
+        try:
+            yield searcher
+        finally:
+            with self.available:
+                self.last_key[id(searcher)] = key
+                self.idle.append(searcher)
+                self.available.notify()
+
+    def best_move(self, pos, level=1, style='standard',
+                  time_left=None, increment=0.0, movetime=None, clock=None, key=None):
+        """Pick the bot's reply: a weighted book move if the position is in
+        the opening book, otherwise a timed search.
+
+        `clock` may be a function returning (time_left, increment); it is
+        called once a searcher is free, so waiting for one is not time the
+        search believes it still has.
+        """
+        level = level if level in BOT_LEVELS else 1
+        style = style if style in STYLES else 'standard'
+        start = time.perf_counter()
+        entry = self.book.choose(pos) if self.book else None
+        if entry:
+            uci = move_to_uci(entry.move)
+            self.metrics.record('book', time.perf_counter() - start)
+            return {'move': uci, 'book': True, 'score': 0, 'depth': 0, 'pv': [uci], 'nodes': 0, 'time_ms': 0,
+                    'games': entry.wins + entry.draws + entry.losses,
+                    'wdl': [entry.wins, entry.draws, entry.losses]}
+
+        with self.borrow(self.uses_parallel(level), key) as searcher:
+            if clock is not None:
+                time_left, increment = clock()
+            if movetime is not None:
+                soft = hard = float(movetime)
+            elif time_left is not None:
+                soft, hard = allocate_time(max(0.0, float(time_left)), float(increment or 0))
+            else:
+                soft = hard = DEFAULT_MOVETIME
+            hard = min(hard, MAX_THINK_SECONDS)
+            soft = min(soft, hard)
+            think = lambda: searcher.think(pos, max_depth=BOT_LEVELS[level], soft_time=soft, hard_time=hard)
+            searcher.set_style(style)
+            result = self.profiler.call(think) if self.profiler else think()
+            stats = searcher.stats()
+        elapsed = time.perf_counter() - start
+        if stats['tb_hits'] and not stats['nodes']:
+            self.metrics.record('tablebase', elapsed)
+        else:
+            self.metrics.record('search', elapsed, result.depth, stats)
+        return {
+            'move': move_to_uci(result.move) if result.move is not None else None,
+            'book': False,
+            'score': result.score,
+            'depth': result.depth,
+            'pv': [move_to_uci(m) for m in result.pv],
+            'nodes': result.nodes,
+            'time_ms': int(result.time * 1000),
+            'stats': stats,
+        }
+
+    def uses_parallel(self, level):
+        return level == 4 and self.parallel is not None
+
+
+BOT = None
+EVENT_LOG = None
+STORE = None
+SESSIONS = None
+PUSH = None
+ANALYZER = None
+ANALYZER_OPTIONS = {}
+MAX_ANALYSIS_JOBS = 2000  # positions per /api/analyse request
+
+
+def get_bot():
+    global BOT
+    if BOT is None:
+        BOT = BotService(int(os.environ.get("CHESS_HASH_MB", 64)), int(os.environ.get("CHESS_WORKERS", 1)),
+                         os.environ.get("CHESS_BOOK", DEFAULT_BOOK_PATH),
+                         os.environ.get("CHESS_TABLEBASES", DEFAULT_TB_PATH),
+                         int(os.environ.get("CHESS_BOT_SEARCHERS", BOT_SEARCHERS)))
+    return BOT
+
+
+def configure_bot(hash_mb, workers, book_path=DEFAULT_BOOK_PATH, tb_path=DEFAULT_TB_PATH, searchers=BOT_SEARCHERS):
+    global BOT
+    BOT = BotService(hash_mb, workers, book_path, tb_path, searchers)
+
+
+def get_analyzer():
+    # The pool starts on the first batch request, not with the server
+    global ANALYZER
+    if ANALYZER is None:
+        options = dict(workers=None, hash_mb=16, tb_path=os.environ.get("CHESS_TABLEBASES", DEFAULT_TB_PATH))
+        options.update(ANALYZER_OPTIONS)
+        ANALYZER = BatchAnalyzer(**options)
+    return ANALYZER
+
+
+def configure_analyzer(**options):
+    ANALYZER_OPTIONS.update(options)
+
+
+def get_event_log():
+    global EVENT_LOG
+    if EVENT_LOG is None:
+        EVENT_LOG = EventLog()
+    return EVENT_LOG
+
+
+def configure_event_log(path, echo=False):
+    global EVENT_LOG
+    EVENT_LOG = EventLog(path, echo=echo)
+
+
+def get_store():
+    global STORE
+    if STORE is None:
+        STORE = GameStore()
+    return STORE
+
+
+def configure_store(path):
+    global STORE
+    STORE = GameStore(path)
+
+
+def _session_bot(pos, level, style, clock=None, key=None):
+    return get_bot().best_move(pos, level=level, style=style, clock=clock, key=key)
+
+
+def get_push():
+    global PUSH
+    if PUSH is None:
+        PUSH = PushHub()
+    return PUSH
+
+
+def get_sessions():
+    global SESSIONS
+    if SESSIONS is None:
+        SESSIONS = SessionManager(get_store(), bot=_session_bot, listener=get_push().publish)
+    return SESSIONS
+
+
+def configure_sessions(idle_timeout=IDLE_TIMEOUT):
+    global SESSIONS
+    SESSIONS = SessionManager(get_store(), bot=_session_bot, idle_timeout=idle_timeout,
+                              listener=get_push().publish)
+
+
+# --- In-Memory Page ---
+PAGE_PATHS = ('/', '/index.html', '/chess_game_ui.html')
+
+
+class CompressedPage:
+    """A page encoded once at startup, with one ETag per content-encoding."""
+
+    def __init__(self, html):
+        raw = html.encode('utf-8')
+        digest = hashlib.sha256(raw).hexdigest()[:32]
+        self.variants = {'identity': raw, 'gzip': gzip.compress(raw, 9)}
+        if HAS_BROTLI:
+            self.variants['br'] = brotli.compress(raw)
+        self.etags = {enc: f'"{digest}-{enc}"' for enc in self.variants}
+
+    def choose(self, accept_encoding):
+        """Best encoding the client accepts (br > gzip > identity).
+
+        `*` stands only for encodings the header does not name, so
+        `gzip;q=0, *` still refuses gzip.
+        """
+        accepted, refused = set(), set()
+        for part in (accept_encoding or '').split(','):
+            name, _, params = part.partition(';')
+            params = params.strip().replace(' ', '')
+            try:
+                q = float(params[2:]) if params.startswith('q=') else 1.0
+            except ValueError:
+                q = 0.0
+            (accepted if q > 0 else refused).add(name.strip().lower())
+        for enc in ('br', 'gzip'):
+            if enc in self.variants and enc not in refused and (enc in accepted or '*' in accepted):
+                return enc
+        return 'identity'
+
+
+PAGE = CompressedPage(GAME_HTML)
+
+
+# --- HTTP Server ---
+HTTP_WORKERS = 32
+KEEPALIVE_TIMEOUT = 15  # seconds an idle keep-alive connection may hold a worker
+IDLE_POLL = 0.05  # how often an idle connection checks for queued connections
+MAX_BODY_BYTES = 4 * 1024 * 1024  # POST bodies: log batches, moves, PGN for analysis
+
+
+class ChessHTTPServer(socketserver.TCPServer):
+    """TCPServer that hands each connection to a bounded thread pool.
+
+    The accept loop stays free, so a slow client or a burst of log posts
+    cannot block page loads. At most `workers` connections are served at
+    once; a few more may queue before accept() applies backpressure. An idle
+    keep-alive connection gives its worker up as soon as another one queues.
+    """
+    allow_reuse_address = True
+    request_queue_size = 1024  # listen backlog: bursts of event-stream connects
+
+    def __init__(self, address, handler, workers=HTTP_WORKERS):
+        super().__init__(address, handler)
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        self.slots = threading.BoundedSemaphore(workers * 4)
+        self.detached = set()
+        self.queued = 0  # accepted connections still waiting for a worker
+        self.active = 0  # connections being served
+        self._count_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        with self._count_lock:
+            self.queued += 1
+        self.pool.submit(self._serve_connection, request, client_address)
+
+    def wait_for_request(self, sock, timeout):
+        """Wait for the next request on a keep-alive connection.
+
+        False once `timeout` passes or a queued connection needs the worker.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.queued and self.active >= self.workers:
+                return False
+            if select.select([sock], [], [], min(IDLE_POLL, remaining))[0]:
+                return True
+
+    def _serve_connection(self, request, client_address):
+        with self._count_lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            if request in self.detached:
+                self.detached.discard(request)  # now owned by the push hub
+            else:
+                self.shutdown_request(request)
+            with self._count_lock:
+                self.active -= 1
+            self.slots.release()
+
+    def detach(self, request):
+        """Leave `request` open when its handler returns (long-lived streams)."""
+        self.detached.add(request)
+
+    def server_close(self):
+        # Graceful: stop accepting, then let in-flight requests finish
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+# --- Custom Log Handler ---
+class LogHandler(BaseHTTPRequestHandler):
+    # Routes only: nothing is served from the working directory, which holds
+    # the game database and event logs
+    protocol_version = 'HTTP/1.1'  # keep-alive; every response sets Content-Length
+    timeout = KEEPALIVE_TIMEOUT
+
+    def log_message(self, format, *args):
+        pass # Suppress default logging
+
+    def handle(self):
+        # BaseHTTPRequestHandler.handle, except that between requests the worker
+        # is given up when other connections are waiting for one
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.server.wait_for_request(self.connection, self.timeout):
+            self.handle_one_request()
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] in PAGE_PATHS:
+            self.send_page()
+        elif self.path == '/api/log_stats':
+            self.send_json(get_event_log().stats())
+        elif self.path.startswith('/api/games'):
+            self.handle_get_games()
+        elif self.path == '/api/session_stats':
+            self.send_json(get_sessions().metrics())
+        elif self.path == '/api/push_stats':
+            self.send_json(get_push().stats())
+        elif self.path == '/metrics':
+            self.send_metrics()
+        elif self.path.startswith('/api/sessions/'):
+            self.handle_session()
+        else:
+            self.send_error(404)
+
+    def do_HEAD(self):
+        if self.path.split('?', 1)[0] in PAGE_PATHS:
+            self.send_page(head=True)
+        else:
+            self.send_error(404)
+
+    def send_page(self, head=False):
+        # Game page straight from memory, pre-compressed, revalidated by ETag
+        enc = PAGE.choose(self.headers.get('Accept-Encoding'))
+        etag = PAGE.etags[enc]
+        if_none_match = self.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = PAGE.variants[enc]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if enc != 'identity':
+            self.send_header('Content-Encoding', enc)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+    
+    def do_POST(self):
+        if not self.check_body():
+            return
+        if self.path == '/log_action':
+            # NDJSON batch from the page (or a single plain-text event); queued, never written inline
+            post_data = self.rfile.read(self.body_length)
+            events = parse_batch(post_data, self.headers.get('Content-Type', ''))
+            get_event_log().submit(events, client=self.client_address[0])
+            self.send_response(204)
+            self.end_headers()
+        elif self.path == '/api/legal_moves':
+            self.handle_legal_moves()
+        elif self.path == '/api/bestmove':
+            self.handle_bestmove()
+        elif self.path == '/api/games':
+            self.handle_save_game()
+        elif self.path == '/api/analyse':
+            self.handle_analyse()
+        elif self.path == '/api/sessions' or self.path.startswith('/api/sessions/'):
+            self.handle_session()
+        else:
+            self.send_error(404)
+
+    def check_body(self):
+        # Validate Content-Length before anything reads the body; on failure the
+        # unread body cannot be skipped, so the connection is closed
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if 0 <= length <= MAX_BODY_BYTES:
+            self.body_length = length
+            return True
+        self.close_connection = True
+        if length < 0:
+            self.send_json({'error': 'Invalid Content-Length'}, status=400)
+        else:
+            self.send_json({'error': f"Request body over {MAX_BODY_BYTES} bytes"}, status=413)
+        return False
+
+    def read_json(self):
+        req = json.loads(self.rfile.read(self.body_length).decode('utf-8') or '{}')
+        if not isinstance(req, dict):
+            raise ValueError("Expected a JSON object")
+        return req
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_position(self):
+        """Parse a JSON body with `fen` and/or `moves`; returns (request, position)."""
+        req = self.read_json()
+        pos = Position(req.get('fen') or Position().fen())
+        for uci in req.get('moves', []):
+            pos.push_uci(uci)
+        return req, pos
+
+    def handle_legal_moves(self):
+        # Server-side move generation/validation with the bitboard engine
+        try:
+            req, pos = self.read_position()
+        except (ValueError, IllegalMoveError) as e:
+            self.send_json({'error': str(e)}, status=400)
+            return
+        legal = pos.legal_moves()
+        check = pos.in_check()
+        status = 'checkmate' if check and not legal else 'stalemate' if not legal else 'ongoing'
+        self.send_json({
+            'fen': pos.fen(),
+            'moves': [move_to_uci(m) for m in legal],
+            'check': check,
+            'status': status,
+        })
+
+    def handle_bestmove(self):
+        # "profile": "cprofile" or "sample" adds a profiler report of this search
+        try:
+            req, pos = self.read_position()
+            level = int(req.get('level', 1))
+            choose = lambda: get_bot().best_move(
+                pos,
+                level=level,
+                style=req.get('style', 'standard'),
+                time_left=req.get('time_left'),
+                increment=req.get('increment', 0),
+                movetime=req.get('movetime'),
+            )
+            mode = req.get('profile')
+            if mode and get_bot().uses_parallel(level):
+                # Both profilers watch this thread, which only waits for the worker processes
+                raise ValueError("Profiling is not available for parallel searches (level 4 with --workers > 1)")
+            if mode:
+                reply, report = profile_call(choose, 'cprofile' if mode is True else mode)
+                reply['profile'] = report
+            else:
+                reply = choose()
+        except (ValueError, TypeError, IllegalMoveError) as e:
+            self.send_json({'error': str(e)}, status=400)
+            return
+        self.send_json(reply)
+
+    def send_metrics(self):
+        # Prometheus text format; components that were never used are left out
+        families = []
+        if BOT is not None:
+            families += BOT.metrics.families()
+        if SESSIONS is not None:
+            families += stats_families('chess_sessions', SESSIONS.metrics(), description="Game sessions:",
+                                       counters=('created', 'evicted', 'moves_played', 'bot_moves', 'bot_failures',
+                                                 'time_forfeits'))
+        if PUSH is not None:
+            families += stats_families('chess_push', PUSH.stats(), description="Event push:",
+                                       counters=('events', 'messages', 'bytes_sent', 'dropped_slow'))
+        if EVENT_LOG is not None:
+            families += stats_families('chess_event_log', EVENT_LOG.stats(), description="Event log:",
+                                       counters=('accepted', 'dropped', 'written', 'batches'))
+        body = render_metrics(families).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_analyse(self):
+        # Batch analysis: {positions: [fen | {fen, moves, id, ...}], games: [{id, start_fen, moves}],
+        # pgn: text, movetime, depth, nodes}; results stream back as NDJSON as they finish
+        try:
+            req = self.read_json()
+            sources = (
+                ({'id': n, **item} if isinstance(item, dict) else {'id': n, 'fen': item}
+                 for n, item in enumerate(req.get('positions', []), 1)),
+                game_jobs((g.get('id', n), g.get('start_fen'), g.get('moves', []))
+                          for n, g in enumerate(req.get('games', []), 1)),
+                pgn_jobs(req['pgn'].splitlines()) if req.get('pgn') else (),
+            )
+            # Games and PGN expand lazily: stop one past the limit instead of replaying them all
+            jobs = list(itertools.islice(itertools.chain.from_iterable(sources), MAX_ANALYSIS_JOBS + 1))
+            if len(jobs) > MAX_ANALYSIS_JOBS:
+                raise ValueError(f"At most {MAX_ANALYSIS_JOBS} positions per request")
+            for job in jobs:
+                for key in ('movetime', 'depth', 'nodes'):
+                    if job.get(key) is None:
+                        job[key] = req.get(key)
+                # Every position is bounded by the clock, even with a depth or node limit
+                if not job['movetime']:
+                    job['movetime'] = MAX_THINK_SECONDS if job['depth'] or job['nodes'] else ANALYSIS_MOVETIME
+                job['movetime'] = min(float(job['movetime']), MAX_THINK_SECONDS)
+        except (ValueError, TypeError, AttributeError) as e:
+            self.send_json({'error': str(e)}, status=400)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        start = time.perf_counter()
+        count = nodes = 0
+        for result in get_analyzer().run(jobs):
+            count += 1
+            nodes += result.get('nodes', 0)
+            self.write_chunk(json.dumps(result) + '\n')
+        elapsed = time.perf_counter() - start
+        self.write_chunk(json.dumps({'summary': {
+            'positions': count, 'nodes': nodes, 'time_ms': int(elapsed * 1000),
+            'positions_per_s': round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        }}) + '\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def handle_session(self):
+        # POST /api/sessions creates a game; GET /api/sessions/<id> reads one
+        # (/events streams it, /timings has per-move clock data);
+        # POST /api/sessions/<id>/(move|undo|resign) acts on it
+        manager = get_sessions()
+        parts = self.path.split('?', 1)[0].rstrip('/').split('/')[3:]
+        try:
+            if self.command == 'POST' and not parts:
+                req = self.read_json()
+                session = manager.create(
+                    mode=req.get('mode', 'pvp'), white=req.get('white'), black=req.get('black'),
+                    level=req.get('level', 1), style=req.get('style', 'standard'),
+                    bot_color=req.get('bot_color', 'b'), time_control=req.get('time_control'),
+                    fen=req.get('fen'), increment=req.get('increment', 0), delay=req.get('delay', 0))
+                self.send_json(manager.state(session.id), status=201)
+            elif self.command == 'GET' and len(parts) == 1:
+                self.send_json(manager.state(parts[0]))
+            elif self.command == 'GET' and len(parts) == 2 and parts[1] == 'events':
+                self.stream_session(manager, parts[0])
+            elif self.command == 'GET' and len(parts) == 2 and parts[1] == 'timings':
+                self.send_json(manager.timings(parts[0]))
+            elif self.command == 'POST' and len(parts) == 2 and parts[1] == 'move':
+                self.send_json(manager.play(parts[0], self.read_json().get('move', '')))
+            elif self.command == 'POST' and len(parts) == 2 and parts[1] == 'undo':
+                self.send_json(manager.undo(parts[0], self.read_json().get('plies', 1)))
+            elif self.command == 'POST' and len(parts) == 2 and parts[1] == 'resign':
+                self.send_json(manager.resign(parts[0], self.read_json().get('color', 'w')))
+            else:
+                self.send_json({'error': 'Not found'}, status=404)
+        except KeyError as e:
+            game_id = e.args[0] if e.args else None
+            self.send_json({'error': 'Game not found', 'archived_id': manager.archived.get(game_id)}, status=404)
+        except (ValueError, TypeError, IllegalMoveError) as e:
+            self.send_json({'error': str(e)}, status=409 if isinstance(e, SessionError) else 400)
+
+    def stream_session(self, manager, game_id):
+        # Server-Sent Events: send the headers here, then the push hub owns the socket
+        manager.get(game_id)
+        query = parse_qs(urlsplit(self.path).query)
+        role = 'player' if query.get('role', [''])[0] == 'player' else 'spectator'
+        detach = getattr(self.server, 'detach', None)
+        if detach is None:
+            self.send_json({'error': 'Streaming is not available on this server'}, status=501)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        detach(self.connection)
+        get_push().attach(self.connection, game_id, role, lambda: manager.state(game_id))
+
+    def handle_save_game(self):
+        # Archive a finished game; the move list must replay legally
+        try:
+            game = self.read_json()
+            pos = Position(game.get('start_fen') or Position().fen())
+            for uci in game.get('moves', []):
+                pos.push_uci(uci)
+            game_id = get_store().add_game(game)
+        except (ValueError, TypeError, KeyError, IllegalMoveError) as e:
+            self.send_json({'error': str(e)}, status=400)
+            return
+        self.send_json({'id': game_id}, status=201)
+
+    def handle_get_games(self):
+        url = urlsplit(self.path)
+        parts = url.path.rstrip('/').split('/')
+        if len(parts) == 4:
+            game = get_store().get_game(int(parts[3])) if parts[3].isdigit() else None
+            if game is None:
+                self.send_json({'error': 'Game not found'}, status=404)
+            else:
+                self.send_json(game)
+            return
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            games, cursor = get_store().list_games(
+                player=query.get('player'), result=query.get('result'), opening=query.get('opening'),
+                since=query.get('since'), until=query.get('until'),
+                limit=query.get('limit', 50), cursor=query.get('cursor'))
+        except ValueError as e:
+            self.send_json({'error': str(e)}, status=400)
+            return
+        self.send_json({'games': games, 'next_cursor': cursor})
+
+# --- Python Launcher Logic ---
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def run_server(http_workers=HTTP_WORKERS):
+    # 2. Setup Local Server (the page is served from memory)
+    filename = "chess_game_ui.html"
+
+    PORT = 8000
+
+    try:
+        # Start server
+        server = ChessHTTPServer(("", PORT), LogHandler, workers=http_workers)
+        get_sessions().start_reaper()
+        url = f"http://localhost:{PORT}/{filename}"
+        print(f"\n--- CHESS GAME LAUNCHED ---")
+        print(f"Server running on port {PORT}")
+        
+        # --- NEW: Cloud/Notebook Embedding ---
+        try:
+            from IPython.display import display, HTML
+            if os.path.exists("/content") or "google.colab" in sys.modules:
+                display(HTML(GAME_HTML))
+        except ImportError:
+            pass
+        # -------------------------------------
+        
+        def start_server():
+            server.serve_forever()
+
+        def launch_browser_tab():
+            time.sleep(1.5)
+            if os.path.exists("/content") or os.environ.get("HEADLESS") == "1": return
+            webbrowser.open(url)
+
+        if HAS_WEBVIEW and not (os.path.exists("/content") or os.environ.get("HEADLESS") == "1"):
+            print("Launching Desktop App via PyWebView...")
+            t = threading.Thread(target=start_server, daemon=True)
+            t.start()
+            
+            webview.create_window('Python Chess Pro', url, width=1100, height=850, resizable=True, js_api=JsApi())
+            webview.start()
+            sys.exit(0)
+        else:
+            threading.Thread(target=launch_browser_tab, daemon=True).start()
+            # Treat SIGTERM like Ctrl+C so in-flight requests can finish
+            signal.signal(signal.SIGTERM, _raise_interrupt)
+            try:
+                print("Press Ctrl+C to stop the server.")
+                server.serve_forever()
+            except KeyboardInterrupt:
+                print("\nServer stopped.")
+                server.server_close()
+                get_sessions().close()
+                get_push().close()
+                get_event_log().close()
+
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+        server.server_close()
+        get_sessions().close()
+        get_push().close()
+        get_event_log().close()
+    except OSError as e:
+        print(f"Could not start server on port {PORT}: {e}")
+        # Offline fallback: the page runs from a file with its in-page bot
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(GAME_HTML)
+        abs_path = os.path.abspath(filename)
+        webbrowser.open(f"file://{abs_path}")
+
+# --- Command Line ---
+
+def run_perft(args):
+    if args.suite:
+        ok, _, _ = run_suite(args.depth)
+        return 0 if ok else 1
+    try:
+        pos = Position(args.fen)
+    except ValueError as e:
+        print(e)
+        return 2
+    start = time.perf_counter()
+    if args.divide:
+        counts = divide(pos, args.depth)
+        for uci in sorted(counts):
+            print(f"{uci}: {counts[uci]}")
+        nodes = sum(counts.values())
+    else:
+        nodes = perft(pos, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"Nodes: {nodes}  Time: {elapsed:.2f}s  NPS: {nodes_per_second(nodes, elapsed)}")
+    return 0
+
+
+def run_convert_save(args):
+    # Old JSON saves (a board snapshot per ply) -> compact .chess files
+    with open(args.input, 'r', encoding='utf-8') as f:
+        text = f.read()
+    try:
+        game = convert_json_save(text)
+        data = encode_save(game)
+    except (ValueError, KeyError, TypeError, IndexError) as e:
+        print(f"Cannot convert {args.input}: {e}")
+        return 2
+    output = args.output or os.path.splitext(args.input)[0] + '.chess'
+    with open(output, 'wb') as f:
+        f.write(data)
+    print(f"Wrote {output}: {len(game['moves'])} moves, {len(data)} bytes (was {os.path.getsize(args.input)})")
+    return 0
+
+
+def _open_text(path, mode):
+    if path == '-':
+        return contextlib.nullcontext(sys.stdin if mode == 'r' else sys.stdout)
+    return open(path, mode, encoding='utf-8', errors='replace', newline='\n' if mode == 'w' else None)
+
+
+def run_import_pgn(args):
+    # Stream games into the archive in batches, one transaction per batch
+    store = GameStore(args.db)
+    with _open_text(args.input, 'r') as f:
+        reader = PgnReader(f, strict=args.strict)
+        batch = []
+        try:
+            for game in reader:
+                batch.append(to_store_game(game))
+                if len(batch) >= args.batch:
+                    store.add_games(batch)
+                    batch = []
+                    print(f"  {reader.games} games ({reader.rate():.0f} games/s)", file=sys.stderr)
+        except PgnError as e:
+            print(f"Game {reader.games + 1}: {e}")
+            return 2
+        if batch:
+            store.add_games(batch)
+    elapsed = time.perf_counter() - reader.started
+    print(f"Imported {reader.games} games ({reader.errors} skipped) in {elapsed:.1f}s: {reader.rate():.0f} games/s")
+    return 0
+
+
+def run_export_pgn(args):
+    store = GameStore(args.db)
+    games = store.iter_games(player=args.player, result=args.result, since=args.since, until=args.until)
+    start = time.perf_counter()
+    with _open_text(args.output, 'w') as f:
+        count = write_games(f, games)
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Exported {count} games in {elapsed:.1f}s: {rate:.0f} games/s", file=sys.stderr)
+    return 0
+
+
+def run_build_book(args):
+    def games():
+        for path in args.pgn:
+            with _open_text(path, 'r') as f:
+                for game in PgnReader(f):
+                    yield game.fen, game.moves, game.result
+        if args.from_db:
+            for game in GameStore(args.db).iter_games():
+                yield game['start_fen'], game['moves'], game['result']
+
+    start = time.perf_counter()
+    positions, entries = build_book(games(), args.output, max_ply=args.plies, min_games=args.min_games)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {args.output}: {positions} positions, {entries} moves in {elapsed:.1f}s")
+    return 0
+
+
+def run_analyse(args):
+    # Positions (FEN lines / JSON objects) or games (PGN, archive) -> NDJSON results
+    def jobs():
+        for path in args.inputs or (() if args.from_db else ('-',)):
+            with _open_text(path, 'r') as f:
+                if args.pgn or path.lower().endswith('.pgn'):
+                    yield from pgn_jobs(f)
+                else:
+                    yield from fen_jobs(f)
+        if args.from_db:
+            games = GameStore(args.db).iter_games(player=args.player, result=args.result)
+            yield from game_jobs((g['id'], g['start_fen'], g['moves']) for g in games)
+
+    start = time.perf_counter()
+    with BatchAnalyzer(args.jobs, args.hash_mb, args.tablebases,
+                       args.movetime, args.depth, args.nodes) as analyzer:
+        with _open_text(args.output, 'w') as out:
+            count = write_results(out, analyzer.run(jobs()))
+        elapsed = time.perf_counter() - start
+        positions, nodes = analyzer.rate()
+    print(f"Analysed {count} positions in {elapsed:.1f}s on {analyzer.workers} processes: "
+          f"{positions:.1f} positions/s, {nodes:.0f} nodes/s", file=sys.stderr)
+    return 0
+
+
+def run_tournament(args):
+    # Self-play match between two engine configurations
+    try:
+        first, second = (parse_player(spec, BOT_LEVELS) for spec in (args.first, args.second))
+        openings = None
+        if args.openings:
+            with _open_text(args.openings, 'r') as f:
+                openings = load_openings(f, args.opening_plies)
+        match = Tournament(first, second, openings, args.games, args.jobs, args.tablebases,
+                           args.elo0, args.elo1)
+    except ValueError as e:
+        print(e)
+        return 2
+    print(f"{first.name} vs {second.name}: {match.total} games, {len(match.openings)} openings, "
+          f"{match.workers} processes")
+    pgn_out = open(args.pgn, 'w', encoding='utf-8') if args.pgn else None
+    try:
+        for game in match.run(sprt=args.sprt):
+            stats = match.stats
+            elo, error = stats.elo()
+            print(f"Game {game['game']:>4}: {game['white']} - {game['black']} {game['result']} "
+                  f"({game['termination']}, {len(game['moves'])} plies) | "
+                  f"+{stats.wins} ={stats.draws} -{stats.losses} Elo {elo:+.0f} +/- {error:.0f} "
+                  f"LLR {stats.llr():.2f}")
+            if pgn_out:
+                tags = {"Event": "Self-play", "Round": str(game['game']), "White": game['white'],
+                        "Black": game['black'], "Result": game['result'], "Termination": game['termination']}
+                pgn_out.write(format_game(tags, game['moves'], game['fen']))
+    finally:
+        if pgn_out:
+            pgn_out.close()
+    print('\n'.join(match.summary()))
+    return 0
+
+
+def run_build_tb(args):
+    names = args.signatures or tablebase_signatures(args.pieces)
+    start = time.perf_counter()
+    tablebases = Tablebases(args.tablebases)
+    for name in names:
+        try:
+            generate_tablebase(name, args.tablebases, tablebases)
+        except ValueError as e:
+            print(f"{name}: {e}")
+            return 2
+    elapsed = time.perf_counter() - start
+    print(f"{len(tablebases)} tables in {args.tablebases} ({elapsed:.1f}s)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Python Chess Pro")
+    parser.add_argument("--hash-mb", type=int, default=int(os.environ.get("CHESS_HASH_MB", 64)),
+                        help="bot transposition table size in MB (split between --bot-searchers)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite game archive")
+    parser.add_argument("--book", default=os.environ.get("CHESS_BOOK", DEFAULT_BOOK_PATH),
+                        help="opening book file (see build-book)")
+    parser.add_argument("--tablebases", default=os.environ.get("CHESS_TABLEBASES", DEFAULT_TB_PATH),
+                        help="endgame tablebase directory (see build-tb)")
+    parser.add_argument("--event-log", default=DEFAULT_LOG_PATH,
+                        help="rotating NDJSON file for game events")
+    parser.add_argument("--echo-events", action="store_true", help="also print game events to the console")
+    parser.add_argument("--http-workers", type=int, default=HTTP_WORKERS,
+                        help="concurrent HTTP connections served by the thread pool")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("CHESS_WORKERS", 1)),
+                        help="search processes for the GM level (Lazy SMP)")
+    parser.add_argument("--bot-searchers", type=int,
+                        default=int(os.environ.get("CHESS_BOT_SEARCHERS", BOT_SEARCHERS)),
+                        help="bot searches that may run at once in the server process")
+    parser.add_argument("--session-idle", type=float, default=IDLE_TIMEOUT,
+                        help="seconds before an idle server-side game is archived and evicted")
+    parser.add_argument("--analysis-workers", type=int,
+                        help="processes for /api/analyse batches (default: one per CPU)")
+    parser.add_argument("--profile", action="store_true",
+                        help="run under cProfile (a command as a whole, or every bot search of the server) "
+                             "and print the hottest functions on exit; only code in this process is profiled, "
+                             "not analysis, tournament or parallel search worker processes")
+    parser.add_argument("--profile-out", metavar="FILE", help="profile like --profile but save the pstats data to FILE")
+    sub = parser.add_subparsers(dest="command")
+    p = sub.add_parser("perft", help="count move-generator leaf nodes (correctness/throughput benchmark)")
+    p.add_argument("--fen", default=Position().fen(), help="position to count from (default: start position)")
+    p.add_argument("--depth", type=int, default=4)
+    p.add_argument("--divide", action="store_true", help="print counts per root move")
+    p.add_argument("--suite", action="store_true", help="run the standard perft positions up to --depth")
+    p = sub.add_parser("convert-save", help="convert an old JSON save to the compact .chess format")
+    p.add_argument("input")
+    p.add_argument("-o", "--output", help="output file (default: input name with .chess)")
+    p = sub.add_parser("import-pgn", help="stream a PGN file into the game archive (--db)")
+    p.add_argument("input", help="PGN file, or - for stdin")
+    p.add_argument("--batch", type=int, default=1000, help="games per database transaction")
+    p.add_argument("--strict", action="store_true", help="stop at the first invalid game instead of skipping it")
+    p = sub.add_parser("export-pgn", help="write archived games (--db) as PGN, newest first")
+    p.add_argument("output", help="PGN file, or - for stdout")
+    p.add_argument("--player")
+    p.add_argument("--result", choices=("1-0", "0-1", "1/2-1/2", "*"))
+    p.add_argument("--since", type=float, help="unix time lower bound on finish time")
+    p.add_argument("--until", type=float, help="unix time upper bound on finish time")
+    p = sub.add_parser("build-book", help="build an opening book from PGN files and/or the game archive")
+    p.add_argument("pgn", nargs="*", help="PGN files (- for stdin)")
+    p.add_argument("-o", "--output", default=DEFAULT_BOOK_PATH)
+    p.add_argument("--from-db", action="store_true", help="also use the games in the archive (--db)")
+    p.add_argument("--plies", type=int, default=24, help="book depth in half-moves")
+    p.add_argument("--min-games", type=int, default=2, help="drop moves played in fewer games")
+    p = sub.add_parser("analyse", help="analyse positions or games on a process pool, streaming NDJSON results")
+    p.add_argument("inputs", nargs="*", help="FEN files (one FEN or JSON object per line) or .pgn files; - for stdin")
+    p.add_argument("-o", "--output", default="-", help="NDJSON output file (default: stdout)")
+    p.add_argument("--pgn", action="store_true", help="read inputs as PGN whatever their extension")
+    p.add_argument("--from-db", action="store_true", help="analyse every ply of the archived games (--db)")
+    p.add_argument("--player", help="with --from-db: only this player's games")
+    p.add_argument("--result", choices=("1-0", "0-1", "1/2-1/2", "*"), help="with --from-db: only this result")
+    p.add_argument("--movetime", type=float, help=f"seconds per position (default {ANALYSIS_MOVETIME:g} "
+                                                  "unless --depth or --nodes is given)")
+    p.add_argument("--depth", type=int, help="maximum search depth per position")
+    p.add_argument("--nodes", type=int, help="node limit per position")
+    p.add_argument("-j", "--jobs", type=int, help="worker processes (default: one per CPU); --hash-mb is per process")
+    p = sub.add_parser("tournament", help="self-play match between two engine configurations")
+    p.add_argument("first", help="player as [name:]key=value,... with level, depth, style, tc=base+inc, "
+                                 "movetime, nodes, hash")
+    p.add_argument("second", help="the opponent, same format")
+    p.add_argument("--games", type=int, help="number of games (default: every opening with both colours)")
+    p.add_argument("--openings", help="opening suite: PGN file or FEN/EPD lines (default: built-in suite)")
+    p.add_argument("--opening-plies", type=int, default=8, help="plies taken from each PGN opening")
+    p.add_argument("--sprt", action="store_true", help="stop as soon as the SPRT is decided")
+    p.add_argument("--elo0", type=float, default=0.0, help="SPRT null hypothesis (Elo)")
+    p.add_argument("--elo1", type=float, default=5.0, help="SPRT alternative hypothesis (Elo)")
+    p.add_argument("--pgn", help="write the games to this PGN file")
+    p.add_argument("-j", "--jobs", type=int, help="games played at once (default: one per CPU)")
+    p = sub.add_parser("build-tb", help="generate endgame tablebases into --tablebases")
+    p.add_argument("signatures", nargs="*", help="material signatures such as KQvK or KRvKP")
+    p.add_argument("--pieces", type=int, choices=(3, 4), default=3,
+                   help="with no signatures: build every ending with this many pieces")
+    args = parser.parse_args(argv)
+
+    profiler = ProfileCollector() if args.profile or args.profile_out else None
+    try:
+        if args.command:
+            return profiler.call(lambda: run_command(args)) if profiler else run_command(args)
+        configure_bot(args.hash_mb, args.workers, args.book, args.tablebases, args.bot_searchers)
+        get_bot().profiler = profiler
+        configure_event_log(args.event_log, echo=args.echo_events)
+        configure_store(args.db)
+        configure_sessions(args.session_idle)
+        configure_analyzer(workers=args.analysis_workers, tb_path=args.tablebases)
+        run_server(args.http_workers)
+        return 0
+    finally:
+        if profiler is not None:
+            write_profile(profiler, args.profile_out)
+
+
+def write_profile(profiler, path=None):
+    if path is None:
+        print(profiler.report(), file=sys.stderr)
+    else:
+        profiler.dump(path)
+        print(f"Profile of {profiler.runs} runs written to {path} (read it with pstats)", file=sys.stderr)
+
+
+def run_command(args):
+    if args.command == "perft":
+        return run_perft(args)
+    if args.command == "convert-save":
+        return run_convert_save(args)
+    if args.command == "import-pgn":
+        return run_import_pgn(args)
+    if args.command == "export-pgn":
+        return run_export_pgn(args)
+    if args.command == "build-book":
+        return run_build_book(args)
+    if args.command == "build-tb":
+        return run_build_tb(args)
+    if args.command == "analyse":
+        return run_analyse(args)
+    if args.command == "tournament":
+        return run_tournament(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Server-authoritative chess clocks.
+
+All times are integer nanoseconds from ``time.monotonic_ns``, so wall
+clock changes and timer drift cannot move a clock. A side's turn starts
+when the previous move is applied on the server and ends when its own
+move arrives, which charges bot search time like any other think time.
+Time controls take an increment (Fischer: added after each move) or a
+delay (US/simple delay: the first `delay` of each turn is free).
+
+``ClockWatcher`` flags players who stop moving: one thread sleeps until
+the earliest deadline of all running clocks in the process.
+"""
+
+import array
+import heapq
+import sys
+import threading
+import time
+
+NS = 1_000_000_000
+MS = 1_000_000
+
+
+class GameClock:
+    """Both players' clocks; `side` (0 White, 1 Black) starts running at `now`."""
+
+    __slots__ = ("base", "increment", "delay", "remaining", "side", "turn_start",
+                 "running", "flagged", "think", "after")
+
+    def __init__(self, base_s, increment_s=0.0, delay_s=0.0, side=0, now=None):
+        self.base = int(base_s * NS)
+        self.increment = int(increment_s * NS)
+        self.delay = int(delay_s * NS)
+        self.remaining = [self.base, self.base]
+        self.side = side
+        self.turn_start = time.monotonic_ns() if now is None else now
+        self.running = True
+        self.flagged = None  # side that ran out of time
+        self.think = array.array('q')  # per ply: think time, then time left after the move
+        self.after = array.array('q')
+
+    def _charge(self, elapsed):
+        return max(0, elapsed - self.delay)
+
+    def left(self, side, now=None):
+        """Time `side` has left at `now`, counting the running turn."""
+        if side != self.side or not self.running:
+            return self.remaining[side]
+        now = time.monotonic_ns() if now is None else now
+        return self.remaining[side] - self._charge(now - self.turn_start)
+
+    def deadline(self):
+        """First monotonic time at which the side to move has flagged."""
+        return self.turn_start + self.delay + self.remaining[self.side] + 1
+
+    def check(self, now=None):
+        """Flag the side to move if its time is up; returns the flagged side or None."""
+        if self.running and self.left(self.side, now) < 0:
+            self.remaining[self.side] = 0
+            self.running = False
+            self.flagged = self.side
+        return self.flagged
+
+    def stop(self, now=None):
+        """Freeze both clocks (game over), charging the running turn."""
+        if self.running:
+            now = time.monotonic_ns() if now is None else now
+            self.remaining[self.side] -= self._charge(now - self.turn_start)
+            self.running = False
+
+    def press(self, now=None):
+        """End the turn of the side to move at `now`.
+
+        Returns False (and flags) if the move came too late; otherwise the
+        think time is charged, the increment added and the other clock
+        started at `now`.
+        """
+        now = time.monotonic_ns() if now is None else now
+        if self.check(now) is not None:
+            return False
+        side = self.side
+        elapsed = now - self.turn_start
+        self.remaining[side] -= self._charge(elapsed)
+        self.remaining[side] += self.increment
+        self.think.append(elapsed)
+        self.after.append(self.remaining[side])
+        self.side = 1 - side
+        self.turn_start = now
+        return True
+
+    def undo(self, plies, now=None):
+        """Restore the clocks from before the last `plies` moves; the side to move restarts now."""
+        plies = min(plies, len(self.think))
+        for _ in range(plies):
+            self.think.pop()
+            self.after.pop()
+            self.side = 1 - self.side
+        # The last ply was played by the side not to move, the one before by the other
+        n = len(self.after)
+        self.remaining[1 - self.side] = self.after[n - 1] if n >= 1 else self.base
+        self.remaining[self.side] = self.after[n - 2] if n >= 2 else self.base
+        self.running = True
+        self.flagged = None
+        self.turn_start = time.monotonic_ns() if now is None else now
+
+    def _first(self):
+        # Side that made the first recorded move
+        return self.side ^ (len(self.think) & 1)
+
+    def snapshot(self, now=None):
+        """JSON-ready clock state in milliseconds."""
+        now = time.monotonic_ns() if now is None else now
+        return {
+            'white_ms': max(0, self.left(0, now)) // MS,
+            'black_ms': max(0, self.left(1, now)) // MS,
+            'running': 'wb'[self.side] if self.running else None,
+            'increment_ms': self.increment // MS,
+            'delay_ms': self.delay // MS,
+            'flagged': 'wb'[self.flagged] if self.flagged is not None else None,
+        }
+
+    def timings(self):
+        """Per-move timing records for latency analysis."""
+        first = self._first()
+        return [{
+            'ply': ply + 1,
+            'side': 'wb'[first ^ (ply & 1)],
+            'think_ms': round(think / MS, 3),
+            'charged_ms': round(self._charge(think) / MS, 3),
+            'left_ms': after // MS,
+        } for ply, (think, after) in enumerate(zip(self.think, self.after))]
+
+
+class ClockWatcher:
+    """Calls `callback(key)` once a scheduled monotonic deadline passes.
+
+    One thread and a heap serve every running clock; stale entries are
+    cheap, the callback re-checks the clock before flagging anyone.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self._heap = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def schedule(self, deadline_ns, key):
+        with self._cond:
+            heapq.heappush(self._heap, (deadline_ns, key))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="clock-watcher", daemon=True)
+                self._thread.start()
+            elif self._heap[0][0] == deadline_ns:
+                self._cond.notify()  # new earliest deadline
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = time.monotonic_ns()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    timeout = (self._heap[0][0] - now) / NS if self._heap else None
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+                _, key = heapq.heappop(self._heap)
+            try:
+                self.callback(key)
+            except Exception as e:  # the watcher serves every game; keep it alive
+                print(f"Clock callback failed for {key}: {e}", file=sys.stderr)
+
+    def pending(self):
+        return len(self._heap)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
@@ -0,0 +1,14 @@
+"""Python chess engine: bitboard move generation, evaluation and search."""
+
+from .bitboard import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+from .position import (
+    Position, IllegalMoveError, START_FEN, make_move, move_to_uci,
+)
+from .san import move_to_san, parse_san
+from .evaluate import evaluate, STYLES
+from .search import Searcher, SearchResult, best_move, allocate_time, MATE_SCORE
+from .tt import TranspositionTable
+from .perft import perft, divide, run_suite
+from .parallel import ParallelSearcher
+from .book import OpeningBook, BookEntry, build_book
+from .tablebase import Tablebases, generate as generate_tablebase, signatures as tablebase_signatures
@@ -0,0 +1,149 @@
+"""Bitboard primitives and precomputed attack tables.
+
+Squares are numbered a1=0, b1=1 ... h8=63, so bit ``1 << sq`` of a 64-bit
+integer marks square ``sq``.
+"""
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+FULL = 0xFFFFFFFFFFFFFFFF
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_2 = RANK_1 << 8
+RANK_3 = RANK_1 << 16
+RANK_6 = RANK_1 << 40
+RANK_7 = RANK_1 << 48
+RANK_8 = RANK_1 << 56
+
+SQUARE_NAMES = [f + r for r in '12345678' for f in 'abcdefgh']
+SQUARES = {name: i for i, name in enumerate(SQUARE_NAMES)}
+
+
+def lsb(bb):
+    """Index of the least significant set bit."""
+    return (bb & -bb).bit_length() - 1
+
+
+def popcount(bb):
+    return bin(bb).count('1')
+
+
+def iter_bits(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+# --- Leaper tables ---
+
+def _on_board(r, f):
+    return 0 <= r < 8 and 0 <= f < 8
+
+
+def _step_attacks(deltas):
+    table = []
+    for sq in range(64):
+        r, f = divmod(sq, 8)
+        bb = 0
+        for dr, df in deltas:
+            if _on_board(r + dr, f + df):
+                bb |= 1 << ((r + dr) * 8 + f + df)
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _step_attacks(((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)))
+KING_ATTACKS = _step_attacks(((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)))
+# PAWN_ATTACKS[color][sq]: squares a pawn of `color` on `sq` attacks
+PAWN_ATTACKS = [_step_attacks(((1, -1), (1, 1))), _step_attacks(((-1, -1), (-1, 1)))]
+
+
+# --- Slider tables ---
+# Each line through a square (rank, file, diagonal, anti-diagonal) gets a
+# relevant-occupancy mask (edges excluded) and a dict mapping every subset of
+# that mask to the attack set along the line.
+
+def _ray_attacks(sq, occ, directions):
+    r, f = divmod(sq, 8)
+    bb = 0
+    for dr, df in directions:
+        nr, nf = r + dr, f + df
+        while _on_board(nr, nf):
+            bit = 1 << (nr * 8 + nf)
+            bb |= bit
+            if occ & bit:
+                break
+            nr += dr
+            nf += df
+    return bb
+
+
+def _line_tables(directions):
+    masks, tables = [], []
+    for sq in range(64):
+        r, f = divmod(sq, 8)
+        mask = 0
+        for dr, df in directions:
+            nr, nf = r + dr, f + df
+            while _on_board(nr + dr, nf + df):
+                mask |= 1 << (nr * 8 + nf)
+                nr += dr
+                nf += df
+        table = {}
+        sub = 0
+        while True:
+            table[sub] = _ray_attacks(sq, sub, directions)
+            sub = (sub - mask) & mask
+            if not sub:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+
+RANK_MASK, RANK_TABLE = _line_tables(((0, 1), (0, -1)))
+FILE_MASK, FILE_TABLE = _line_tables(((1, 0), (-1, 0)))
+DIAG_MASK, DIAG_TABLE = _line_tables(((1, 1), (-1, -1)))
+ANTI_MASK, ANTI_TABLE = _line_tables(((1, -1), (-1, 1)))
+
+ROOK_RAYS = [_ray_attacks(sq, 0, ((0, 1), (0, -1), (1, 0), (-1, 0))) for sq in range(64)]
+BISHOP_RAYS = [_ray_attacks(sq, 0, ((1, 1), (-1, -1), (1, -1), (-1, 1))) for sq in range(64)]
+
+
+def rook_attacks(sq, occ):
+    return RANK_TABLE[sq][occ & RANK_MASK[sq]] | FILE_TABLE[sq][occ & FILE_MASK[sq]]
+
+
+def bishop_attacks(sq, occ):
+    return DIAG_TABLE[sq][occ & DIAG_MASK[sq]] | ANTI_TABLE[sq][occ & ANTI_MASK[sq]]
+
+
+def queen_attacks(sq, occ):
+    return rook_attacks(sq, occ) | bishop_attacks(sq, occ)
+
+
+# --- Line geometry ---
+
+def _between_and_line():
+    between = [[0] * 64 for _ in range(64)]
+    line = [[0] * 64 for _ in range(64)]
+    for a in range(64):
+        for b in range(64):
+            if a == b:
+                continue
+            ends = (1 << a) | (1 << b)
+            if ROOK_RAYS[a] >> b & 1:
+                line[a][b] = (ROOK_RAYS[a] & ROOK_RAYS[b]) | ends
+                between[a][b] = rook_attacks(a, 1 << b) & rook_attacks(b, 1 << a)
+            elif BISHOP_RAYS[a] >> b & 1:
+                line[a][b] = (BISHOP_RAYS[a] & BISHOP_RAYS[b]) | ends
+                between[a][b] = bishop_attacks(a, 1 << b) & bishop_attacks(b, 1 << a)
+    return between, line
+
+
+# BETWEEN[a][b]: squares strictly between two aligned squares
+# LINE[a][b]: the whole rank/file/diagonal through them (0 if not aligned)
+BETWEEN, LINE = _between_and_line()
@@ -0,0 +1,144 @@
+"""Opening book: a sorted, memory-mapped file of Zobrist-keyed moves.
+
+The layout follows Polyglot (fixed-size big-endian entries sorted by key,
+several entries per position) but keys are the engine's own Zobrist
+hashes and each entry carries win/draw/loss counts instead of a learn
+field::
+
+    header  b"PCBK", version (u32), entry count (u64)
+    entry   key (u64), move (u16), weight (u16), wins, draws, losses (u32)
+
+Results are counted from the point of view of the side making the move.
+Probing binary-searches the mapped file, so only the pages touched are
+read and the book is never loaded into memory.
+"""
+
+import mmap
+import os
+import random
+import struct
+from collections import namedtuple
+
+from .position import Position, START_FEN
+
+MAGIC = b"PCBK"
+VERSION = 1
+HEADER = struct.Struct(">4sIQ")
+ENTRY = struct.Struct(">QHHIII")
+MAX_WEIGHT = 0xFFFF
+
+# Result -> index into [wins, draws, losses] for White and for Black
+RESULT_INDEX = {"1-0": (0, 2), "0-1": (2, 0), "1/2-1/2": (1, 1)}
+
+BookEntry = namedtuple("BookEntry", "move weight wins draws losses")
+
+
+class OpeningBook:
+    """Read-only view of a book file; safe to share between threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            self._file.close()
+            raise ValueError(f"Not an opening book: {path}")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or HEADER.size + self.count * ENTRY.size > size:
+            self.close()
+            raise ValueError(f"Not an opening book: {path}")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _key_at(self, i):
+        return struct.unpack_from(">Q", self._map, HEADER.size + i * ENTRY.size)[0]
+
+    def entries(self, key):
+        """All entries for a Zobrist key, heaviest first."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        offset = HEADER.size + lo * ENTRY.size
+        while lo < self.count:
+            k, move, weight, wins, draws, losses = ENTRY.unpack_from(self._map, offset)
+            if k != key:
+                break
+            found.append(BookEntry(move, weight, wins, draws, losses))
+            lo += 1
+            offset += ENTRY.size
+        return found
+
+    def probe(self, pos):
+        """Book entries for `pos` whose moves are legal there."""
+        entries = self.entries(pos.hash)
+        if not entries:
+            return []
+        legal = set(pos.legal_moves())
+        return [e for e in entries if e.move in legal]
+
+    def choose(self, pos, rng=random):
+        """Weighted random book move for `pos` (an entry), or None."""
+        entries = [e for e in self.probe(pos) if e.weight > 0]
+        if not entries:
+            return None
+        return rng.choices(entries, weights=[e.weight for e in entries])[0]
+
+
+def build_book(games, path, max_ply=24, min_games=1):
+    """Write a book from `games`: iterable of (fen or None, uci moves, result).
+
+    Games without a result are skipped. Returns (positions, entries).
+    Weights are 2 * wins + draws for the mover, scaled per position to
+    fit 16 bits.
+    """
+    stats = {}
+    for fen, moves, result in games:
+        outcome = RESULT_INDEX.get(result)
+        if outcome is None:
+            continue
+        pos = Position(fen or START_FEN)
+        for ply, uci in enumerate(moves):
+            if ply >= max_ply:
+                break
+            move = pos.parse_uci(uci)
+            stats.setdefault((pos.hash, move), [0, 0, 0])[outcome[pos.side]] += 1
+            pos.make(move)
+    by_key = {}
+    for (key, move), counts in stats.items():
+        if sum(counts) >= min_games:
+            by_key.setdefault(key, []).append((move, counts))
+    entries = 0
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0))
+        for key in sorted(by_key):
+            moves = [(move, 2 * w + d, w, d, l) for move, (w, d, l) in by_key[key]]
+            top = max(weight for _, weight, _, _, _ in moves)
+            scale = MAX_WEIGHT / top if top > MAX_WEIGHT else 1
+            moves.sort(key=lambda m: -m[1])
+            for move, weight, w, d, l in moves:
+                f.write(ENTRY.pack(key, move, int(weight * scale), w, d, l))
+                entries += 1
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, entries))
+    os.replace(tmp, path)
+    return len(by_key), entries
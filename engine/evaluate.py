@@ -0,0 +1,131 @@
+"""Static evaluation: tapered material plus piece-square tables.
+
+The position keeps its midgame/endgame sums and game phase up to date in
+make/unmake (see ``Position.mg``/``eg``/``phase``), so ``evaluate`` is O(1).
+"""
+
+from .bitboard import WHITE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+
+# Centipawn values, same scale as the browser engine's `vals`
+PIECE_VALUES = (100, 320, 330, 500, 900, 20000)
+
+# Phase weight per piece type; 24 = full middlegame material
+PHASE_WEIGHTS = (0, 1, 1, 2, 4, 0)
+MAX_PHASE = 24
+
+# Piece-square tables (simplified evaluation function) written from White's
+# point of view, rank 8 first -- the layout of `pst` in the browser engine.
+PST_ROWS = {
+    PAWN: [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [50, 50, 50, 50, 50, 50, 50, 50],
+        [10, 10, 20, 30, 30, 20, 10, 10],
+        [5, 5, 10, 25, 25, 10, 5, 5],
+        [0, 0, 0, 20, 20, 0, 0, 0],
+        [5, -5, -10, 0, 0, -10, -5, 5],
+        [5, 10, 10, -20, -20, 10, 10, 5],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+    ],
+    KNIGHT: [
+        [-50, -40, -30, -30, -30, -30, -40, -50],
+        [-40, -20, 0, 0, 0, 0, -20, -40],
+        [-30, 0, 10, 15, 15, 10, 0, -30],
+        [-30, 5, 15, 20, 20, 15, 5, -30],
+        [-30, 0, 15, 20, 20, 15, 0, -30],
+        [-30, 5, 10, 15, 15, 10, 5, -30],
+        [-40, -20, 0, 5, 5, 0, -20, -40],
+        [-50, -40, -30, -30, -30, -30, -40, -50],
+    ],
+    BISHOP: [
+        [-20, -10, -10, -10, -10, -10, -10, -20],
+        [-10, 0, 0, 0, 0, 0, 0, -10],
+        [-10, 0, 5, 10, 10, 5, 0, -10],
+        [-10, 5, 5, 10, 10, 5, 5, -10],
+        [-10, 0, 10, 10, 10, 10, 0, -10],
+        [-10, 10, 10, 10, 10, 10, 10, -10],
+        [-10, 5, 0, 0, 0, 0, 5, -10],
+        [-20, -10, -10, -10, -10, -10, -10, -20],
+    ],
+    ROOK: [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [5, 10, 10, 10, 10, 10, 10, 5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [0, 0, 0, 5, 5, 0, 0, 0],
+    ],
+    QUEEN: [
+        [-20, -10, -10, -5, -5, -10, -10, -20],
+        [-10, 0, 0, 0, 0, 0, 0, -10],
+        [-10, 0, 5, 5, 5, 5, 0, -10],
+        [-5, 0, 5, 5, 5, 5, 0, -5],
+        [0, 0, 5, 5, 5, 5, 0, -5],
+        [-10, 5, 5, 5, 5, 5, 0, -10],
+        [-10, 0, 5, 0, 0, 0, 0, -10],
+        [-20, -10, -10, -5, -5, -10, -10, -20],
+    ],
+    KING: [
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-20, -30, -30, -40, -40, -30, -30, -20],
+        [-10, -20, -20, -20, -20, -20, -20, -10],
+        [20, 20, 0, 0, 0, 0, 20, 20],
+        [20, 30, 10, 0, 0, 10, 30, 20],
+    ],
+}
+
+# Only the king changes character in the endgame: it should centralise
+KING_ENDGAME_ROWS = [
+    [-50, -40, -30, -20, -20, -30, -40, -50],
+    [-30, -20, -10, 0, 0, -10, -20, -30],
+    [-30, -10, 20, 30, 30, 20, -10, -30],
+    [-30, -10, 30, 40, 40, 30, -10, -30],
+    [-30, -10, 30, 40, 40, 30, -10, -30],
+    [-30, -10, 20, 30, 30, 20, -10, -30],
+    [-30, -30, 0, 0, 0, 0, -30, -30],
+    [-50, -30, -30, -30, -30, -30, -30, -50],
+]
+
+
+def _square_table(rows):
+    # rows[0] is rank 8; square 0 is a1
+    return [rows[7 - sq // 8][sq % 8] for sq in range(64)]
+
+
+def _psq_tables(endgame):
+    """PSQ[piece][sq]: material + PST, signed (+ for White), mirrored for Black."""
+    tables = []
+    for color in (0, 1):
+        for ptype in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            rows = KING_ENDGAME_ROWS if endgame and ptype == KING else PST_ROWS[ptype]
+            value = PIECE_VALUES[ptype] if ptype != KING else 0
+            table = [value + v for v in _square_table(rows)]
+            if color == WHITE:
+                tables.append(table)
+            else:
+                tables.append([-table[sq ^ 56] for sq in range(64)])
+    return tables
+
+
+PSQ_MG = _psq_tables(endgame=False)
+PSQ_EG = _psq_tables(endgame=True)
+
+STYLES = ('standard', 'aggressive', 'defensive', 'gambit')
+# Evaluation scale in tenths for styles that score differently; the others
+# (defensive, gambit) evaluate exactly like 'standard'
+STYLE_SCALE = {'aggressive': 11}
+
+
+def evaluate(pos, style='standard'):
+    """Score in centipawns from the side to move's point of view."""
+    phase = pos.phase if pos.phase < MAX_PHASE else MAX_PHASE
+    score = (pos.mg * phase + pos.eg * (MAX_PHASE - phase)) // MAX_PHASE
+    scale = STYLE_SCALE.get(style)
+    if scale:
+        score = score * scale // 10
+    return score if pos.side == WHITE else -score
+
@@ -0,0 +1,84 @@
+"""Move ordering: hash move, MVV-LVA captures, killer moves, history heuristic."""
+
+from .bitboard import PAWN
+
+MAX_PLY = 128
+
+HASH_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 24
+KILLER_SCORES = (1 << 23, (1 << 23) - 1)
+HISTORY_MAX = 1 << 20
+
+# Victim value ranks for MVV-LVA (p, n, b, r, q, k)
+_MVV = (1, 3, 3, 5, 9, 0)
+
+
+class MoveOrderer:
+    """Per-search move ordering state shared by every node."""
+
+    def __init__(self):
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [[0] * 64 for _ in range(12)]
+
+    def clear(self):
+        self.__init__()
+
+    def new_search(self):
+        # Killers are position specific; history keeps a decayed memory
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        for table in self.history:
+            for sq in range(64):
+                table[sq] >>= 2
+
+    def order(self, pos, moves, hash_move=0, ply=0):
+        """Return `moves` sorted best-first."""
+        squares = pos.squares
+        ep = pos.ep
+        killers = self.killers[ply] if ply < MAX_PLY else (0, 0)
+        history = self.history
+        scored = []
+        for move in moves:
+            if move == hash_move:
+                scored.append((HASH_SCORE, move))
+                continue
+            to = (move >> 6) & 63
+            piece = squares[move & 63]
+            victim = squares[to]
+            promo = move >> 12
+            if victim is not None:
+                score = CAPTURE_SCORE + _MVV[victim % 6] * 16 - piece % 6
+            elif promo:
+                score = CAPTURE_SCORE + _MVV[promo] * 16
+            elif to == ep and piece % 6 == PAWN:
+                score = CAPTURE_SCORE + _MVV[PAWN] * 16
+            elif move == killers[0]:
+                score = KILLER_SCORES[0]
+            elif move == killers[1]:
+                score = KILLER_SCORES[1]
+            else:
+                score = history[piece][to]
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    def is_quiet(self, pos, move):
+        to = (move >> 6) & 63
+        if pos.squares[to] is not None or move >> 12:
+            return False
+        return not (to == pos.ep and pos.squares[move & 63] % 6 == PAWN)
+
+    def record_cutoff(self, pos, move, depth, ply):
+        """Reward a quiet move that caused a beta cutoff (`pos` is the position before it)."""
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        piece = pos.squares[move & 63]
+        table = self.history[piece]
+        to = (move >> 6) & 63
+        table[to] += depth * depth
+        if table[to] > HISTORY_MAX:
+            for t in self.history:
+                for sq in range(64):
+                    t[sq] >>= 1
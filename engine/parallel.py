@@ -0,0 +1,125 @@
+"""Lazy SMP parallel search.
+
+Every worker process runs the ordinary iterative-deepening search on the
+same position; they cooperate only through a transposition table in
+shared memory. Helpers on odd ids start one ply deeper so the workers
+drift apart and fill the table with different subtrees. The result of
+worker 0 is used unless a helper completed a deeper iteration.
+"""
+
+import multiprocessing
+import os
+import time
+
+from .position import Position
+from .search import Searcher, MAX_DEPTH
+from .tablebase import Tablebases
+from .tt import TranspositionTable
+
+_searcher = None  # the Searcher owned by a worker process
+
+
+def _init_worker(hash_mb, buffers, stop_event, tb_dir=None):
+    global _searcher
+    # Each worker maps the tablebase files itself; the OS shares the pages
+    tablebases = Tablebases(tb_dir) if tb_dir else None
+    _searcher = Searcher(tt=TranspositionTable.attach(hash_mb, buffers), tablebases=tablebases)
+    _searcher.stop_event = stop_event
+
+
+def _worker_think(job):
+    fen, style, generation, worker_id, limits = job
+    searcher = _searcher
+    searcher.set_style(style)
+    searcher.tt.generation = generation
+    result = searcher.think(Position(fen), start_depth=1 + (worker_id & 1), **limits)
+    return worker_id, result, searcher.stats()
+
+
+class ParallelSearcher:
+    """Drop-in counterpart of Searcher.think() that searches on a process pool."""
+
+    def __init__(self, workers=None, hash_mb=64, style='standard', tablebases=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.tt = TranspositionTable(hash_mb, shared=self.workers > 1)
+        self.style = style
+        self.tablebases = tablebases
+        self.nodes = 0
+        self._stats = {}
+        if self.workers == 1:
+            self._pool = None
+            self._local = Searcher(style=style, tt=self.tt, tablebases=tablebases)
+            return
+        ctx = multiprocessing.get_context()
+        self._stop = ctx.Event()
+        tb_dir = tablebases.directory if tablebases else None
+        self._pool = ctx.Pool(self.workers, initializer=_init_worker,
+                              initargs=(hash_mb, self.tt.shared_buffers(), self._stop, tb_dir))
+
+    def set_style(self, style):
+        # The shared table keeps every style's entries (see Searcher.set_style)
+        self.style = style
+        if self._pool is None:
+            self._local.set_style(style)
+
+    def think(self, pos, max_depth=MAX_DEPTH, soft_time=None, hard_time=None, max_nodes=None):
+        if self._pool is None:
+            result = self._local.think(pos, max_depth, soft_time, hard_time, max_nodes)
+            self.nodes = result.nodes
+            return result
+
+        start = time.monotonic()
+        limits = dict(max_depth=max_depth, soft_time=soft_time, hard_time=hard_time, max_nodes=max_nodes)
+        fen = pos.fen()
+        jobs = [(fen, self.style, self.tt.generation, i, limits) for i in range(self.workers)]
+        self.tt.new_search()  # workers advance their own copies to the same generation
+        self._stop.clear()
+        results, stats = {}, {}
+        for worker_id, result, worker_stats in self._pool.imap_unordered(_worker_think, jobs):
+            results[worker_id] = result
+            stats[worker_id] = worker_stats
+            if worker_id == 0:
+                self._stop.set()  # main worker is done; helpers return their last iteration
+        best = 0
+        for worker_id, result in results.items():
+            if result.move is not None and result.depth > results[best].depth:
+                best = worker_id
+        self.nodes = sum(r.nodes for r in results.values())
+        self._stats = self._merge_stats(stats, best)
+        return results[best]._replace(nodes=self.nodes, time=time.monotonic() - start)
+
+    @staticmethod
+    def _merge_stats(stats, best):
+        # Counters are summed over workers; iterations come from the worker whose move is played
+        merged = dict(stats[best])
+        for key in ('nodes', 'qnodes', 'tt_probes', 'tt_hits', 'tt_cutoffs', 'beta_cutoffs',
+                    'first_move_cutoffs', 'tb_hits'):
+            merged[key] = sum(s[key] for s in stats.values())
+        probes, cutoffs = merged['tt_probes'], merged['beta_cutoffs']
+        merged['tt_hit_rate'] = round(merged['tt_hits'] / probes, 4) if probes else 0.0
+        merged['first_move_cutoff_rate'] = round(merged['first_move_cutoffs'] / cutoffs, 4) if cutoffs else 0.0
+        merged['workers'] = len(stats)
+        return merged
+
+    def stats(self):
+        """Searcher.stats() of the last think(), summed over the workers."""
+        if self._pool is None:
+            return self._local.stats()
+        return self._stats
+
+    def search(self, pos, depth):
+        result = self.think(pos, max_depth=depth)
+        return result.move, result.score
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._local = Searcher(style=self.style, tablebases=self.tablebases)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
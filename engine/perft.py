@@ -0,0 +1,67 @@
+"""Perft: move-generator correctness and throughput benchmark."""
+
+import time
+
+from .position import Position, move_to_uci
+
+# (name, fen, {depth: expected leaf count}) -- the standard perft positions
+PERFT_SUITE = [
+    ("startpos", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+]
+
+
+def perft(pos, depth):
+    """Number of leaf nodes `depth` plies below `pos` (bulk-counted at the last ply)."""
+    moves = pos.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        pos.make(move)
+        nodes += perft(pos, depth - 1)
+        pos.unmake()
+    return nodes
+
+
+def divide(pos, depth):
+    """Perft split per root move: {uci: count}."""
+    counts = {}
+    for move in pos.legal_moves():
+        pos.make(move)
+        counts[move_to_uci(move)] = perft(pos, depth - 1)
+        pos.unmake()
+    return counts
+
+
+def run_suite(max_depth=4, out=print):
+    """Run the standard positions up to `max_depth`; return (all_passed, nodes, seconds)."""
+    ok, total_nodes, total_time = True, 0, 0.0
+    for name, fen, expected in PERFT_SUITE:
+        for depth, want in sorted(expected.items()):
+            if depth > max_depth:
+                break
+            start = time.perf_counter()
+            got = perft(Position(fen), depth)
+            elapsed = time.perf_counter() - start
+            total_nodes += got
+            total_time += elapsed
+            status = "ok" if got == want else f"FAIL (expected {want})"
+            ok &= got == want
+            out(f"{name:<10} depth {depth}: {got:>10} nodes  {elapsed:7.2f}s  {status}")
+    out(f"Total: {total_nodes} nodes in {total_time:.2f}s ({nodes_per_second(total_nodes, total_time)} nps)")
+    return ok, total_nodes, total_time
+
+
+def nodes_per_second(nodes, seconds):
+    return int(nodes / seconds) if seconds > 0 else 0
@@ -0,0 +1,588 @@
+"""Board state, FEN I/O, make/unmake and move generation.
+
+Moves are plain ints: ``from | to << 6 | promo << 12`` where ``promo`` is the
+piece type a pawn promotes to (0 for ordinary moves). Castling is encoded as
+the king moving two files; en passant as the pawn moving onto the ep square.
+"""
+
+from .bitboard import (
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, FULL,
+    FILE_A, FILE_H, RANK_3, RANK_6, RANK_1, RANK_8,
+    SQUARE_NAMES, SQUARES, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS,
+    BETWEEN, LINE, ROOK_RAYS, BISHOP_RAYS, rook_attacks, bishop_attacks,
+)
+from .zobrist import PIECE_KEYS, SIDE_KEY, CASTLE_KEYS, EP_KEYS, compute_hash
+from .evaluate import PSQ_MG, PSQ_EG, PIECE_VALUES, PHASE_WEIGHTS
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+PIECE_SYMBOLS = 'PNBRQKpnbrqk'  # index = color * 6 + piece type
+
+CASTLE_WK, CASTLE_WQ, CASTLE_BK, CASTLE_BQ = 1, 2, 4, 8
+
+CASTLE_FLAGS = {'K': CASTLE_WK, 'Q': CASTLE_WQ, 'k': CASTLE_BK, 'q': CASTLE_BQ}
+# Flag -> ((king, square), (rook, square)) that must be in place for the right
+CASTLE_PIECES = {
+    CASTLE_WK: ((KING, SQUARES['e1']), (ROOK, SQUARES['h1'])),
+    CASTLE_WQ: ((KING, SQUARES['e1']), (ROOK, SQUARES['a1'])),
+    CASTLE_BK: ((6 + KING, SQUARES['e8']), (6 + ROOK, SQUARES['h8'])),
+    CASTLE_BQ: ((6 + KING, SQUARES['e8']), (6 + ROOK, SQUARES['a8'])),
+}
+
+# Rights that survive a move touching the given square
+CASTLE_MASK = [15] * 64
+CASTLE_MASK[SQUARES['a1']] = 15 & ~CASTLE_WQ
+CASTLE_MASK[SQUARES['h1']] = 15 & ~CASTLE_WK
+CASTLE_MASK[SQUARES['e1']] = 15 & ~(CASTLE_WK | CASTLE_WQ)
+CASTLE_MASK[SQUARES['a8']] = 15 & ~CASTLE_BQ
+CASTLE_MASK[SQUARES['h8']] = 15 & ~CASTLE_BK
+CASTLE_MASK[SQUARES['e8']] = 15 & ~(CASTLE_BK | CASTLE_BQ)
+
+# King destination -> (rook from, rook to)
+CASTLE_ROOK = {
+    SQUARES['g1']: (SQUARES['h1'], SQUARES['f1']),
+    SQUARES['c1']: (SQUARES['a1'], SQUARES['d1']),
+    SQUARES['g8']: (SQUARES['h8'], SQUARES['f8']),
+    SQUARES['c8']: (SQUARES['a8'], SQUARES['d8']),
+}
+
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+
+def make_move(frm, to, promo=0):
+    return frm | (to << 6) | (promo << 12)
+
+
+def move_to_uci(move):
+    uci = SQUARE_NAMES[move & 63] + SQUARE_NAMES[(move >> 6) & 63]
+    if move >> 12:
+        uci += 'pnbrqk'[move >> 12]
+    return uci
+
+
+class IllegalMoveError(ValueError):
+    pass
+
+
+class Position:
+    """Mutable chess position backed by one bitboard per piece and colour."""
+
+    __slots__ = ('bb', 'occ', 'squares', 'kings', 'side', 'castling', 'ep',
+                 'halfmove', 'fullmove', 'hash', 'mg', 'eg', 'phase', 'material',
+                 'counts', '_stack')
+
+    def __init__(self, fen=START_FEN):
+        self.set_fen(fen)
+
+    # --- FEN ---
+
+    def set_fen(self, fen):
+        """Load a FEN; ValueError for any malformed field or illegal position."""
+        parts = fen.split() if isinstance(fen, str) else []
+        if not 4 <= len(parts) <= 6:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        self.bb = [0] * 12
+        self.occ = [0, 0]
+        self.squares = [None] * 64
+        self.kings = [None, None]
+        self.mg = self.eg = self.phase = 0
+        self.material = [0, 0]
+        self.counts = [0] * 12
+        rows = parts[0].split('/')
+        if len(rows) != 8:
+            raise ValueError(f"Invalid FEN board: {parts[0]!r}")
+        for i, row in enumerate(rows):
+            rank, file = 7 - i, 0
+            for ch in row:
+                if ch in '12345678':
+                    file += int(ch)
+                    continue
+                piece = PIECE_SYMBOLS.find(ch)
+                if piece < 0 or file > 7:
+                    raise ValueError(f"Invalid FEN board: {parts[0]!r}")
+                self._put(piece, rank * 8 + file)
+                file += 1
+            if file != 8:
+                raise ValueError(f"Invalid FEN board: {parts[0]!r}")
+        if self.counts[KING] != 1 or self.counts[6 + KING] != 1:
+            raise ValueError(f"FEN needs one king per side: {parts[0]!r}")
+        if (self.bb[PAWN] | self.bb[6 + PAWN]) & (RANK_1 | RANK_8):
+            raise ValueError(f"FEN has a pawn on the first or last rank: {parts[0]!r}")
+
+        if parts[1] not in ('w', 'b'):
+            raise ValueError(f"Invalid FEN side to move: {parts[1]!r}")
+        self.side = WHITE if parts[1] == 'w' else BLACK
+        if self.is_attacked(self.kings[self.side ^ 1], self.side):
+            raise ValueError(f"Illegal FEN: the side not to move is in check: {fen!r}")
+
+        self.castling = 0
+        if parts[2] != '-':
+            for ch in parts[2]:
+                flag = CASTLE_FLAGS.get(ch)
+                if flag is None or self.castling & flag:
+                    raise ValueError(f"Invalid FEN castling rights: {parts[2]!r}")
+                king, rook = CASTLE_PIECES[flag]
+                if self.squares[king[1]] != king[0] or self.squares[rook[1]] != rook[0]:
+                    raise ValueError(f"FEN castling rights without king and rook at home: {parts[2]!r}")
+                self.castling |= flag
+
+        self.ep = None
+        if parts[3] != '-':
+            ep = SQUARES.get(parts[3])
+            # The pawn that just moved two squares stands in front of the ep square
+            up = 8 if self.side == WHITE else -8
+            pawn = (self.side ^ 1) * 6 + PAWN
+            if (ep is None or ep >> 3 != (5 if self.side == WHITE else 2)
+                    or self.squares[ep] is not None or self.squares[ep + up] is not None
+                    or self.squares[ep - up] != pawn):
+                raise ValueError(f"Invalid FEN en passant square: {parts[3]!r}")
+            self.ep = ep
+
+        counters = parts[4:]
+        if not all(c.isdigit() for c in counters) or len(counters) == 2 and int(counters[1]) < 1:
+            raise ValueError(f"Invalid FEN move counters: {' '.join(counters)!r}")
+        self.halfmove = int(counters[0]) if counters else 0
+        self.fullmove = int(counters[1]) if len(counters) > 1 else 1
+        self.hash = compute_hash(self)
+        self._stack = []
+
+    def fen(self):
+        rows = []
+        for rank in range(7, -1, -1):
+            row, empty = '', 0
+            for file in range(8):
+                piece = self.squares[rank * 8 + file]
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += PIECE_SYMBOLS[piece]
+            rows.append(row + (str(empty) if empty else ''))
+        castling = ''.join(ch for ch, flag in (('K', CASTLE_WK), ('Q', CASTLE_WQ), ('k', CASTLE_BK), ('q', CASTLE_BQ))
+                           if self.castling & flag) or '-'
+        ep = SQUARE_NAMES[self.ep] if self.ep is not None else '-'
+        return f"{'/'.join(rows)} {'wb'[self.side]} {castling} {ep} {self.halfmove} {self.fullmove}"
+
+    def copy(self):
+        return Position(self.fen())
+
+    def __repr__(self):
+        return f"Position({self.fen()!r})"
+
+    def _put(self, piece, sq):
+        bit = 1 << sq
+        self.bb[piece] |= bit
+        self.occ[piece // 6] |= bit
+        self.squares[sq] = piece
+        ptype = piece % 6
+        if ptype == KING:
+            self.kings[piece // 6] = sq
+        else:
+            self.material[piece // 6] += PIECE_VALUES[ptype]
+        self.mg += PSQ_MG[piece][sq]
+        self.eg += PSQ_EG[piece][sq]
+        self.phase += PHASE_WEIGHTS[ptype]
+        self.counts[piece] += 1
+
+    # --- Attacks ---
+
+    def king_square(self, color):
+        return self.kings[color]
+
+    def attackers_to(self, sq, by, occ):
+        """Bitboard of pieces of colour `by` attacking `sq` given occupancy `occ`."""
+        bb = self.bb
+        o = by * 6
+        return ((PAWN_ATTACKS[by ^ 1][sq] & bb[o + PAWN])
+                | (KNIGHT_ATTACKS[sq] & bb[o + KNIGHT])
+                | (KING_ATTACKS[sq] & bb[o + KING])
+                | (bishop_attacks(sq, occ) & (bb[o + BISHOP] | bb[o + QUEEN]))
+                | (rook_attacks(sq, occ) & (bb[o + ROOK] | bb[o + QUEEN])))
+
+    def checkers(self):
+        """Enemy pieces giving check to the side to move."""
+        us = self.side
+        return self.attackers_to(self.kings[us], us ^ 1, self.occ[0] | self.occ[1])
+
+    def pinned(self, color=None):
+        """Pieces of `color` that are absolutely pinned to their own king."""
+        if color is None:
+            color = self.side
+        bb = self.bb
+        o = (color ^ 1) * 6
+        ksq = self.kings[color]
+        occ = self.occ[0] | self.occ[1]
+        own = self.occ[color]
+        snipers = ((ROOK_RAYS[ksq] & (bb[o + ROOK] | bb[o + QUEEN]))
+                   | (BISHOP_RAYS[ksq] & (bb[o + BISHOP] | bb[o + QUEEN])))
+        pinned = 0
+        while snipers:
+            low = snipers & -snipers
+            snipers ^= low
+            blockers = BETWEEN[ksq][low.bit_length() - 1] & occ
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pinned |= blockers
+        return pinned
+
+    def is_attacked(self, sq, by):
+        """True if any piece of colour `by` attacks `sq`."""
+        bb = self.bb
+        o = by * 6
+        if PAWN_ATTACKS[by ^ 1][sq] & bb[o + PAWN]:
+            return True
+        if KNIGHT_ATTACKS[sq] & bb[o + KNIGHT]:
+            return True
+        if KING_ATTACKS[sq] & bb[o + KING]:
+            return True
+        occ = self.occ[0] | self.occ[1]
+        if bishop_attacks(sq, occ) & (bb[o + BISHOP] | bb[o + QUEEN]):
+            return True
+        return bool(rook_attacks(sq, occ) & (bb[o + ROOK] | bb[o + QUEEN]))
+
+    def in_check(self, color=None):
+        if color is None:
+            color = self.side
+        return self.is_attacked(self.kings[color], color ^ 1)
+
+    def ep_capturable(self):
+        """True if the side to move can legally capture en passant.
+
+        Only then is the ep square part of the hash, so a double push nobody
+        can take transposes with the same position reached another way.
+        """
+        ep = self.ep
+        if ep is None:
+            return False
+        us = self.side
+        them = us ^ 1
+        attackers = PAWN_ATTACKS[them][ep] & self.bb[us * 6 + PAWN]
+        cap_sq = ep - 8 if us == WHITE else ep + 8
+        occ = (self.occ[0] | self.occ[1]) ^ (1 << cap_sq) | (1 << ep)
+        while attackers:
+            low = attackers & -attackers
+            attackers ^= low
+            if not self.attackers_to(self.kings[us], them, occ ^ low) & ~(1 << cap_sq):
+                return True
+        return False
+
+    # --- Make / Unmake ---
+
+    def make(self, move):
+        frm = move & 63
+        to = (move >> 6) & 63
+        promo = move >> 12
+        bb, occ, squares = self.bb, self.occ, self.squares
+        us = self.side
+        them = us ^ 1
+        piece = squares[frm]
+        captured = squares[to]
+        ep = self.ep
+        ep_key = EP_KEYS[ep & 7] if ep is not None and self.ep_capturable() else 0
+        self._stack.append((move, captured, self.castling, self.ep, self.halfmove,
+                            self.hash, self.mg, self.eg, self.phase))
+
+        h = self.hash ^ SIDE_KEY ^ PIECE_KEYS[piece][frm] ^ PIECE_KEYS[piece][to]
+        mg = self.mg + PSQ_MG[piece][to] - PSQ_MG[piece][frm]
+        eg = self.eg + PSQ_EG[piece][to] - PSQ_EG[piece][frm]
+        from_to = (1 << frm) | (1 << to)
+        if captured is not None:
+            bb[captured] ^= 1 << to
+            occ[them] ^= 1 << to
+            h ^= PIECE_KEYS[captured][to]
+            mg -= PSQ_MG[captured][to]
+            eg -= PSQ_EG[captured][to]
+            self.phase -= PHASE_WEIGHTS[captured - them * 6]
+            self.material[them] -= PIECE_VALUES[captured - them * 6]
+            self.counts[captured] -= 1
+        bb[piece] ^= from_to
+        occ[us] ^= from_to
+        squares[frm] = None
+        squares[to] = piece
+
+        ptype = piece - us * 6
+        self.halfmove += 1
+        h ^= ep_key
+        self.ep = None
+        if ptype == PAWN:
+            self.halfmove = 0
+            if to == ep:
+                cap_sq = to - 8 if us == WHITE else to + 8
+                bb[them * 6 + PAWN] ^= 1 << cap_sq
+                occ[them] ^= 1 << cap_sq
+                squares[cap_sq] = None
+                h ^= PIECE_KEYS[them * 6 + PAWN][cap_sq]
+                mg -= PSQ_MG[them * 6 + PAWN][cap_sq]
+                eg -= PSQ_EG[them * 6 + PAWN][cap_sq]
+                self.material[them] -= PIECE_VALUES[PAWN]
+                self.counts[them * 6 + PAWN] -= 1
+            elif to - frm in (16, -16):
+                self.ep = (frm + to) >> 1
+            elif promo:
+                promoted = us * 6 + promo
+                bb[piece] ^= 1 << to
+                bb[promoted] |= 1 << to
+                squares[to] = promoted
+                h ^= PIECE_KEYS[piece][to] ^ PIECE_KEYS[promoted][to]
+                mg += PSQ_MG[promoted][to] - PSQ_MG[piece][to]
+                eg += PSQ_EG[promoted][to] - PSQ_EG[piece][to]
+                self.phase += PHASE_WEIGHTS[promo]
+                self.material[us] += PIECE_VALUES[promo] - PIECE_VALUES[PAWN]
+                self.counts[piece] -= 1
+                self.counts[promoted] += 1
+        elif ptype == KING:
+            self.kings[us] = to
+            if to - frm in (2, -2):
+                rook_from, rook_to = CASTLE_ROOK[to]
+                rook = us * 6 + ROOK
+                rook_bits = (1 << rook_from) | (1 << rook_to)
+                bb[rook] ^= rook_bits
+                occ[us] ^= rook_bits
+                squares[rook_from] = None
+                squares[rook_to] = rook
+                h ^= PIECE_KEYS[rook][rook_from] ^ PIECE_KEYS[rook][rook_to]
+                mg += PSQ_MG[rook][rook_to] - PSQ_MG[rook][rook_from]
+                eg += PSQ_EG[rook][rook_to] - PSQ_EG[rook][rook_from]
+        if captured is not None:
+            self.halfmove = 0
+        castling = self.castling & CASTLE_MASK[frm] & CASTLE_MASK[to]
+        if castling != self.castling:
+            h ^= CASTLE_KEYS[self.castling] ^ CASTLE_KEYS[castling]
+            self.castling = castling
+        if us == BLACK:
+            self.fullmove += 1
+        self.side = them
+        if self.ep is not None and self.ep_capturable():
+            h ^= EP_KEYS[to & 7]
+        self.hash = h
+        self.mg = mg
+        self.eg = eg
+
+    def unmake(self):
+        (move, captured, castling, ep, halfmove,
+         self.hash, self.mg, self.eg, self.phase) = self._stack.pop()
+        frm = move & 63
+        to = (move >> 6) & 63
+        promo = move >> 12
+        bb, occ, squares = self.bb, self.occ, self.squares
+        them = self.side
+        us = them ^ 1
+        self.side = us
+        self.castling = castling
+        self.ep = ep
+        self.halfmove = halfmove
+        if us == BLACK:
+            self.fullmove -= 1
+
+        piece = squares[to]
+        if promo:
+            bb[piece] ^= 1 << to
+            self.counts[piece] -= 1
+            piece = us * 6 + PAWN
+            bb[piece] |= 1 << to
+            self.counts[piece] += 1
+            self.material[us] -= PIECE_VALUES[promo] - PIECE_VALUES[PAWN]
+        from_to = (1 << frm) | (1 << to)
+        bb[piece] ^= from_to
+        occ[us] ^= from_to
+        squares[frm] = piece
+        squares[to] = captured
+        if captured is not None:
+            bb[captured] |= 1 << to
+            occ[them] |= 1 << to
+            self.material[them] += PIECE_VALUES[captured - them * 6]
+            self.counts[captured] += 1
+
+        ptype = piece - us * 6
+        if ptype == PAWN and to == ep:
+            cap_sq = to - 8 if us == WHITE else to + 8
+            bb[them * 6 + PAWN] |= 1 << cap_sq
+            occ[them] |= 1 << cap_sq
+            squares[cap_sq] = them * 6 + PAWN
+            self.material[them] += PIECE_VALUES[PAWN]
+            self.counts[them * 6 + PAWN] += 1
+        elif ptype == KING:
+            self.kings[us] = frm
+            if to - frm in (2, -2):
+                rook_from, rook_to = CASTLE_ROOK[to]
+                rook = us * 6 + ROOK
+                rook_bits = (1 << rook_from) | (1 << rook_to)
+                bb[rook] ^= rook_bits
+                occ[us] ^= rook_bits
+                squares[rook_to] = None
+                squares[rook_from] = rook
+
+    def push_uci(self, uci):
+        """Apply a move given in UCI notation after checking it is legal."""
+        move = self.parse_uci(uci)
+        self.make(move)
+        return move
+
+    def parse_uci(self, uci):
+        try:
+            frm, to = SQUARES[uci[:2]], SQUARES[uci[2:4]]
+            promo = 'pnbrqk'.index(uci[4]) if len(uci) > 4 else 0
+        except (KeyError, ValueError, IndexError):
+            raise IllegalMoveError(f"Malformed move: {uci!r}")
+        move = make_move(frm, to, promo)
+        if move not in self.legal_moves():
+            raise IllegalMoveError(f"Illegal move {uci} in {self.fen()}")
+        return move
+
+    # --- Move generation ---
+
+    def legal_moves(self, captures_only=False):
+        """All legal moves for the side to move.
+
+        Checkers and pinned pieces are computed once, so candidates are
+        filtered with bitboard masks instead of being made and unmade.
+        With `captures_only`, quiet moves are skipped except promotions.
+        """
+        moves = []
+        add = moves.append
+        bb = self.bb
+        us = self.side
+        them = us ^ 1
+        o = us * 6
+        ksq = self.kings[us]
+        own = self.occ[us]
+        enemy = self.occ[them]
+        occ = own | enemy
+
+        # King: destination must be safe once the king has left its square
+        occ_no_king = occ ^ (1 << ksq)
+        targets = KING_ATTACKS[ksq] & (enemy if captures_only else ~own)
+        while targets:
+            low = targets & -targets
+            targets ^= low
+            to = low.bit_length() - 1
+            if not self.attackers_to(to, them, occ_no_king):
+                add(ksq | (to << 6))
+
+        checkers = self.attackers_to(ksq, them, occ)
+        if checkers & (checkers - 1):
+            return moves  # double check: only the king may move
+        if checkers:
+            mask = BETWEEN[ksq][checkers.bit_length() - 1] | checkers
+        else:
+            mask = ~own & FULL
+            if self.castling and not captures_only:
+                self._castling_moves(add, occ)
+        pinned = self.pinned(us)
+        line = LINE[ksq]
+
+        # Pawns
+        pawns = bb[o + PAWN]
+        empty = ~occ & FULL
+        if us == WHITE:
+            single = (pawns << 8) & empty
+            double = ((single & RANK_3) << 8) & empty
+            left = ((pawns & ~FILE_A) << 7) & enemy
+            right = ((pawns & ~FILE_H) << 9) & enemy
+            up, promo_rank = 8, RANK_8
+        else:
+            single = (pawns >> 8) & empty
+            double = ((single & RANK_6) >> 8) & empty
+            left = ((pawns & ~FILE_A) >> 9) & enemy
+            right = ((pawns & ~FILE_H) >> 7) & enemy
+            up, promo_rank = -8, RANK_1
+        if captures_only:
+            single &= promo_rank
+            double = 0
+        for targets, delta in ((single, up), (double, 2 * up), (left, up - 1), (right, up + 1)):
+            targets &= mask
+            while targets:
+                low = targets & -targets
+                to = low.bit_length() - 1
+                targets ^= low
+                frm = to - delta
+                if pinned >> frm & 1 and not line[frm] & low:
+                    continue
+                if low & promo_rank:
+                    for promo in PROMOTIONS:
+                        add(frm | (to << 6) | (promo << 12))
+                else:
+                    add(frm | (to << 6))
+        ep = self.ep
+        if ep is not None:
+            cap_sq = ep - up
+            if (1 << ep) & mask or (1 << cap_sq) & checkers:
+                attackers = PAWN_ATTACKS[them][ep] & pawns
+                sliders_b = bb[them * 6 + BISHOP] | bb[them * 6 + QUEEN]
+                sliders_r = bb[them * 6 + ROOK] | bb[them * 6 + QUEEN]
+                while attackers:
+                    low = attackers & -attackers
+                    attackers ^= low
+                    # Both pawns leave their squares at once, so test the king directly
+                    after = (occ ^ low ^ (1 << cap_sq)) | (1 << ep)
+                    if not (bishop_attacks(ksq, after) & sliders_b or rook_attacks(ksq, after) & sliders_r):
+                        add((low.bit_length() - 1) | (ep << 6))
+
+        # Knights, sliders
+        if captures_only:
+            mask &= enemy
+        for ptype in (KNIGHT, BISHOP, ROOK, QUEEN):
+            pieces = bb[o + ptype]
+            while pieces:
+                low = pieces & -pieces
+                frm = low.bit_length() - 1
+                pieces ^= low
+                if ptype == KNIGHT:
+                    if low & pinned:
+                        continue
+                    targets = KNIGHT_ATTACKS[frm]
+                elif ptype == BISHOP:
+                    targets = bishop_attacks(frm, occ)
+                elif ptype == ROOK:
+                    targets = rook_attacks(frm, occ)
+                else:
+                    targets = bishop_attacks(frm, occ) | rook_attacks(frm, occ)
+                targets &= mask
+                if low & pinned:
+                    targets &= line[frm]
+                while targets:
+                    t = targets & -targets
+                    targets ^= t
+                    add(frm | ((t.bit_length() - 1) << 6))
+        return moves
+
+    def _castling_moves(self, add, occ):
+        # Caller guarantees the king is not in check
+        us, them = self.side, self.side ^ 1
+        if us == WHITE:
+            rights = ((CASTLE_WK, 4, 6, 0x60, (5, 6)), (CASTLE_WQ, 4, 2, 0x0E, (3, 2)))
+        else:
+            rights = ((CASTLE_BK, 60, 62, 0x60 << 56, (61, 62)), (CASTLE_BQ, 60, 58, 0x0E << 56, (59, 58)))
+        for flag, frm, to, path, safe in rights:
+            if self.castling & flag and not occ & path and self.squares[frm] == us * 6 + KING \
+                    and self.squares[CASTLE_ROOK[to][0]] == us * 6 + ROOK:
+                if not any(self.attackers_to(sq, them, occ) for sq in safe):
+                    add(frm | (to << 6))
+
+    # --- Game state ---
+
+    def is_checkmate(self):
+        return self.in_check() and not self.legal_moves()
+
+    def is_stalemate(self):
+        return not self.in_check() and not self.legal_moves()
+
+    def is_insufficient_material(self):
+        """Bare kings, or kings and a single minor piece."""
+        counts = self.counts
+        if any(counts[color * 6 + kind] for color in (WHITE, BLACK) for kind in (PAWN, ROOK, QUEEN)):
+            return False
+        return sum(counts[color * 6 + kind] for color in (WHITE, BLACK) for kind in (KNIGHT, BISHOP)) <= 1
+
+    def has_mating_material(self, color):
+        """False when `color` cannot possibly checkmate (a lone king, or king and one minor)."""
+        counts = self.counts
+        base = color * 6
+        if counts[base + PAWN] or counts[base + ROOK] or counts[base + QUEEN]:
+            return True
+        return counts[base + KNIGHT] + counts[base + BISHOP] >= 2
+
+    def piece_at(self, sq):
+        piece = self.squares[sq]
+        return None if piece is None else PIECE_SYMBOLS[piece]
@@ -0,0 +1,83 @@
+"""Standard Algebraic Notation for engine moves.
+
+``move_to_san`` adds the file/rank disambiguation and ``+``/``#`` suffixes
+PGN requires; ``parse_san`` is lenient about suffixes, annotations and
+``0-0`` style castling.
+"""
+
+import re
+
+from .bitboard import PAWN, KING, SQUARE_NAMES, SQUARES
+from .position import IllegalMoveError
+
+PIECE_LETTERS = 'PNBRQK'  # index = piece type
+
+SAN_RE = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+
+
+def move_to_san(pos, move, legal=None):
+    """SAN for a legal `move` in `pos` (pass `legal` to reuse a move list)."""
+    frm, to, promo = move & 63, (move >> 6) & 63, move >> 12
+    piece = pos.squares[frm]
+    ptype = piece % 6
+    if ptype == KING and abs(to - frm) == 2:
+        san = 'O-O' if to > frm else 'O-O-O'
+    elif ptype == PAWN:
+        san = SQUARE_NAMES[frm][0] + 'x' if frm % 8 != to % 8 else ''
+        san += SQUARE_NAMES[to]
+        if promo:
+            san += '=' + PIECE_LETTERS[promo]
+    else:
+        san = PIECE_LETTERS[ptype]
+        if legal is None:
+            legal = pos.legal_moves()
+        rivals = [m & 63 for m in legal
+                  if (m >> 6) & 63 == to and m & 63 != frm and pos.squares[m & 63] == piece]
+        if rivals:
+            if all(sq % 8 != frm % 8 for sq in rivals):
+                san += SQUARE_NAMES[frm][0]
+            elif all(sq // 8 != frm // 8 for sq in rivals):
+                san += SQUARE_NAMES[frm][1]
+            else:
+                san += SQUARE_NAMES[frm]
+        if pos.squares[to] is not None:
+            san += 'x'
+        san += SQUARE_NAMES[to]
+    pos.make(move)
+    if pos.in_check():
+        san += '#' if not pos.legal_moves() else '+'
+    pos.unmake()
+    return san
+
+
+def parse_san(pos, san, legal=None):
+    """Engine move for `san` in `pos`; raises IllegalMoveError."""
+    text = san.rstrip('+#!?')
+    if legal is None:
+        legal = pos.legal_moves()
+    if text in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        king = pos.king_square(pos.side)
+        to = king + (2 if len(text) == 3 else -2)
+        for move in legal:
+            if move & 63 == king and (move >> 6) & 63 == to:
+                return move
+        raise IllegalMoveError(f"Illegal move {san} in {pos.fen()}")
+    m = SAN_RE.match(text)
+    if not m:
+        raise IllegalMoveError(f"Malformed move: {san!r}")
+    letter, file, rank, square, promo = m.groups()
+    ptype = PIECE_LETTERS.index(letter) if letter else PAWN
+    to = SQUARES[square]
+    promo = PIECE_LETTERS.index(promo) if promo else 0
+    found = None
+    for move in legal:
+        frm = move & 63
+        if ((move >> 6) & 63 != to or move >> 12 != promo or pos.squares[frm] % 6 != ptype
+                or (file and SQUARE_NAMES[frm][0] != file) or (rank and SQUARE_NAMES[frm][1] != rank)):
+            continue
+        if found is not None:
+            raise IllegalMoveError(f"Ambiguous move {san} in {pos.fen()}")
+        found = move
+    if found is None:
+        raise IllegalMoveError(f"Illegal move {san} in {pos.fen()}")
+    return found
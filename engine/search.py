@@ -0,0 +1,356 @@
+"""Alpha-beta search over a Position."""
+
+import time
+from collections import namedtuple
+
+from .bitboard import PAWN, popcount
+from .evaluate import PIECE_VALUES, evaluate
+from .tt import TranspositionTable, EXACT, LOWER, UPPER
+from .ordering import MoveOrderer
+from .tablebase import decode
+from .zobrist import STYLE_KEYS
+
+MATE_SCORE = 30000
+MATE_BOUND = MATE_SCORE - 1000
+INFINITY = 100000
+MAX_DEPTH = 64
+DELTA_MARGIN = 200
+QS_NODE_BUDGET = 4000  # quiescence nodes allowed below a single leaf
+
+SearchResult = namedtuple('SearchResult', 'move score depth nodes time pv cutoff_rate')
+
+
+class SearchAborted(Exception):
+    """Raised inside the tree when the hard time or node limit is hit."""
+
+
+def allocate_time(time_left, increment=0.0, moves_to_go=None):
+    """Split the remaining clock into (soft, hard) per-move limits in seconds.
+
+    The soft limit is the target think time: no new iteration starts once
+    it is mostly used. The hard limit aborts the search outright.
+    """
+    if moves_to_go is None:
+        moves_to_go = 30
+    usable = max(0.0, time_left - min(1.0, time_left * 0.05))
+    soft = usable / max(1, moves_to_go) + increment * 0.75
+    hard = min(soft * 4, usable * 0.5)
+    hard = max(hard, 0.05)
+    return min(soft, hard), hard
+
+
+def score_to_tt(score, ply):
+    # Mate scores are stored relative to the node, not the root
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class Searcher:
+    """Negamax alpha-beta search with a transposition table.
+
+    Keep one Searcher per game so later bot turns reuse earlier work.
+    """
+
+    def __init__(self, hash_mb=16, style='standard', qsearch_checks=False, tt=None,
+                 tablebases=None):
+        self.tt = tt if tt is not None else TranspositionTable(hash_mb)
+        self.tablebases = tablebases  # optional engine.tablebase.Tablebases
+        self.orderer = MoveOrderer()
+        self.style = style
+        self.style_key = STYLE_KEYS.get(style, 0)  # table entries are per style
+        self.qsearch_checks = qsearch_checks
+        self.nodes = 0
+        self.qnodes = 0
+        self._qnode_limit = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.tb_hits = 0
+        self.iterations = []  # (depth, nodes, seconds, score) per completed iteration
+        self.deadline = None
+        self.max_nodes = None
+        self.stop_event = None  # optional external stop signal (parallel search)
+
+    def set_style(self, style):
+        if style != self.style:
+            # Stored scores depend on the evaluation, so entries are keyed by
+            # style and the other styles' entries stay in the table for later
+            self.style = style
+            self.style_key = STYLE_KEYS.get(style, 0)
+            self.orderer.clear()
+
+    def cutoff_rate(self):
+        """Fraction of beta cutoffs produced by the first move searched."""
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    def stats(self):
+        """Counters of the last think() call.
+
+        The effective branching factor is the geometric mean growth of the
+        node count from one completed iteration to the next.
+        """
+        iterations, prev_nodes, prev_time, growth = [], 0, 0.0, []
+        for depth, nodes, elapsed, score in self.iterations:
+            spent = nodes - prev_nodes
+            if prev_nodes and iterations[-1]['nodes']:
+                growth.append(spent / iterations[-1]['nodes'])
+            iterations.append({'depth': depth, 'nodes': spent, 'time_ms': round((elapsed - prev_time) * 1000, 3),
+                               'score': score})
+            prev_nodes, prev_time = nodes, elapsed
+        branching = 0.0
+        if growth and all(growth):
+            product = 1.0
+            for g in growth:
+                product *= g
+            branching = product ** (1 / len(growth))
+        probes = self.nodes - self.qnodes  # every main-search node probes the table once
+        return {
+            'nodes': self.nodes,
+            'qnodes': self.qnodes,
+            'tt_probes': probes,
+            'tt_hits': self.tt_hits,
+            'tt_cutoffs': self.tt_cutoffs,
+            'tt_hit_rate': round(self.tt_hits / probes, 4) if probes else 0.0,
+            'beta_cutoffs': self.beta_cutoffs,
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': round(self.cutoff_rate(), 4),
+            'tb_hits': self.tb_hits,
+            'branching_factor': round(branching, 3),
+            'iterations': iterations,
+        }
+
+    def search(self, pos, depth):
+        """Return (move, score) for a fixed-depth search, move is None if the game is over."""
+        result = self.think(pos, max_depth=depth)
+        return result.move, result.score
+
+    def think(self, pos, max_depth=MAX_DEPTH, soft_time=None, hard_time=None, max_nodes=None,
+              start_depth=1):
+        """Iterative deepening under optional time (seconds) and node limits.
+
+        Returns the SearchResult of the last completed iteration; the hard
+        limits bound the response time even in the middle of an iteration.
+        """
+        start = time.monotonic()
+        self.nodes = 0
+        self.qnodes = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.tb_hits = 0
+        self.iterations = []
+        self.deadline = start + hard_time if hard_time else None
+        self.max_nodes = max_nodes
+        self.tt.new_search()
+        self.orderer.new_search()
+        moves = pos.legal_moves()
+        if not moves:
+            return SearchResult(None, -MATE_SCORE if pos.in_check() else 0, 0, 0, 0.0, [], 0.0)
+        if self.tablebases:
+            hit = self.tablebases.best_move(pos)
+            if hit is not None:
+                move, wdl, plies = hit
+                self.tb_hits += 1
+                return SearchResult(move, wdl * (MATE_SCORE - plies), 1, 0,
+                                    time.monotonic() - start, [move], 0.0)
+        result = SearchResult(moves[0], 0, 0, 0, 0.0, [moves[0]], 0.0)
+        if len(moves) == 1:
+            return result
+        for depth in range(min(start_depth, max_depth), max_depth + 1):
+            try:
+                move, score = self._search_root(pos, moves, depth)
+            except SearchAborted:
+                break
+            elapsed = time.monotonic() - start
+            self.iterations.append((depth, self.nodes, elapsed, score))
+            result = SearchResult(move, score, depth, self.nodes, elapsed,
+                                  self.principal_variation(pos, depth), self.cutoff_rate())
+            if abs(score) > MATE_BOUND:
+                break
+            # The next iteration costs several times this one; don't start it late
+            if soft_time is not None and elapsed > soft_time * 0.5:
+                break
+        return result._replace(nodes=self.nodes, time=time.monotonic() - start,
+                               cutoff_rate=self.cutoff_rate())
+
+    def _search_root(self, pos, moves, depth):
+        key = pos.hash ^ self.style_key
+        entry = self.tt.probe(key)
+        moves[:] = self.orderer.order(pos, moves, entry[0] if entry else 0, 0)
+        best, alpha = moves[0], -INFINITY
+        for move in moves:
+            pos.make(move)
+            try:
+                score = -self.negamax(pos, depth - 1, -INFINITY, -alpha, 1)
+            finally:
+                pos.unmake()
+            if score > alpha:
+                best, alpha = move, score
+        self.tt.store(key, best, score_to_tt(alpha, 0), depth, EXACT)
+        return best, alpha
+
+    def principal_variation(self, pos, depth):
+        """Follow best moves stored in the table from `pos`."""
+        pv, seen = [], set()
+        while len(pv) < depth and pos.hash not in seen:
+            seen.add(pos.hash)
+            entry = self.tt.probe(pos.hash ^ self.style_key)
+            if entry is None or entry[0] not in pos.legal_moves():
+                break
+            pv.append(entry[0])
+            pos.make(entry[0])
+        for _ in pv:
+            pos.unmake()
+        return pv
+
+    def _check_limits(self):
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise SearchAborted
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise SearchAborted
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchAborted
+
+    def negamax(self, pos, depth, alpha, beta, ply):
+        self.nodes += 1
+        if not self.nodes & 1023:
+            self._check_limits()
+        key = pos.hash ^ self.style_key
+        entry = self.tt.probe(key)
+        hash_move = 0
+        if entry is not None:
+            self.tt_hits += 1
+            hash_move = entry[0]
+            if entry[2] >= depth:
+                score, flag = score_from_tt(entry[1], ply), entry[3]
+                if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                    self.tt_cutoffs += 1
+                    return score
+        tablebases = self.tablebases
+        if tablebases and popcount(pos.occ[0] | pos.occ[1]) <= tablebases.max_pieces:
+            score = self._probe_tablebases(pos, ply)
+            if score is not None:
+                return score
+        if depth <= 0:
+            self._qnode_limit = self.qnodes + QS_NODE_BUDGET
+            return self.quiesce(pos, alpha, beta, ply, 0)
+        moves = pos.legal_moves()
+        if not moves:
+            return -(MATE_SCORE - ply) if pos.in_check() else 0
+
+        alpha_orig = alpha
+        best_score, best_move = -INFINITY, 0
+        for i, move in enumerate(self.orderer.order(pos, moves, hash_move, ply)):
+            pos.make(move)
+            try:
+                score = -self.negamax(pos, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                pos.unmake()
+            if score > best_score:
+                best_score, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.beta_cutoffs += 1
+                        if i == 0:
+                            self.first_move_cutoffs += 1
+                        if self.orderer.is_quiet(pos, move):
+                            self.orderer.record_cutoff(pos, move, depth, ply)
+                        break
+        if best_score >= beta:
+            flag = LOWER
+        elif best_score > alpha_orig:
+            flag = EXACT
+        else:
+            flag = UPPER
+        self.tt.store(key, best_move, score_to_tt(best_score, ply), depth, flag)
+        return best_score
+
+    def _probe_tablebases(self, pos, ply):
+        code = self.tablebases.probe(pos)
+        if code is None:
+            return None
+        self.tb_hits += 1
+        wdl, plies = decode(code)
+        return wdl * (MATE_SCORE - ply - plies)
+
+    def quiesce(self, pos, alpha, beta, ply, qply):
+        """Resolve captures (and optionally checks) below the horizon.
+
+        The side to move may stand pat on the static score unless in check;
+        captures that cannot lift the score to alpha even with a margin are
+        skipped (delta pruning), and each leaf gets a bounded node budget.
+        """
+        self.nodes += 1
+        self.qnodes += 1
+        if not self.nodes & 1023:
+            self._check_limits()
+        in_check = pos.in_check()
+        if in_check:
+            moves = pos.legal_moves()
+            if not moves:
+                return -(MATE_SCORE - ply)
+            stand_pat = best_score = -INFINITY
+        else:
+            stand_pat = best_score = evaluate(pos, self.style)
+            if stand_pat >= beta or self.qnodes >= self._qnode_limit:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+            moves = pos.legal_moves(captures_only=True)
+            if self.qsearch_checks and qply == 0:
+                moves += self._quiet_checks(pos)
+
+        squares = pos.squares
+        for move in self.orderer.order(pos, moves, 0, ply):
+            if not in_check:
+                victim = squares[(move >> 6) & 63]
+                gain = PIECE_VALUES[victim % 6] if victim is not None else PIECE_VALUES[PAWN]
+                if move >> 12:
+                    gain += PIECE_VALUES[move >> 12] - PIECE_VALUES[PAWN]
+                if stand_pat + gain + DELTA_MARGIN < alpha and victim is not None:
+                    continue
+            pos.make(move)
+            try:
+                score = -self.quiesce(pos, -beta, -alpha, ply + 1, qply + 1)
+            finally:
+                pos.unmake()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _quiet_checks(self, pos):
+        checks = []
+        for move in pos.legal_moves():
+            if self.orderer.is_quiet(pos, move):
+                pos.make(move)
+                if pos.in_check():
+                    checks.append(move)
+                pos.unmake()
+        return checks
+
+
+def best_move(pos, depth, style='standard', searcher=None):
+    """Convenience wrapper: search `pos` to `depth` with a (possibly fresh) Searcher."""
+    if searcher is None:
+        searcher = Searcher(style=style)
+    else:
+        searcher.set_style(style)
+    return searcher.search(pos, depth)
@@ -0,0 +1,531 @@
+"""Endgame tablebases for three- and four-piece endings.
+
+Each table covers one material signature (``KQvK``, ``KRvKN``, ``KPvKP``
+...) for both sides to move, one byte per position::
+
+    0           draw (or an unreachable index)
+    1 + plies   decisive: odd plies = side to move mates in that many
+                plies, even plies = side to move is mated in that many
+
+Positions are reduced by symmetry before indexing: the white king is
+mapped into the a1-d1-d4 triangle (pawnless tables) or onto files a-d
+(tables with pawns). Tables are built by retrograde analysis, starting
+from the mates and working backwards with un-moves, and the files are
+memory-mapped when probed. Castling rights and en passant are not
+encoded, so positions with castling rights or a legal en passant capture
+are not probed.
+"""
+
+import mmap
+import os
+import struct
+
+from .bitboard import (
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, rook_attacks, bishop_attacks, popcount,
+)
+
+MAGIC = b"PCTB"
+VERSION = 1
+HEADER = struct.Struct(">4sI16s")
+FILE_SUFFIX = ".pctb"
+MAX_PIECES = 4
+MAX_PLIES = 254
+
+LETTERS = 'PNBRQK'  # index = piece type
+STRENGTH = 'QRBNP'  # order of non-king pieces in a signature
+
+UNKNOWN, FINAL, INVALID = 0, 1, 2
+
+
+# --- Symmetry ---
+
+def _transforms():
+    flips = []
+    for swap in (False, True):
+        for file_flip in (0, 7):
+            for rank_flip in (0, 56):
+                table = []
+                for sq in range(64):
+                    if swap:
+                        sq = ((sq & 7) << 3) | (sq >> 3)
+                    table.append(sq ^ file_flip ^ rank_flip)
+                flips.append(table)
+    return flips
+
+
+ALL_TRANSFORMS = _transforms()
+MIRROR_TRANSFORMS = [ALL_TRANSFORMS[0], ALL_TRANSFORMS[2]]  # identity, a<->h
+TRIANGLE = [sq for sq in range(64) if (sq & 7) <= 3 and (sq >> 3) <= (sq & 7)]
+QUEENSIDE = [sq for sq in range(64) if (sq & 7) <= 3]
+
+
+# --- Signatures ---
+
+def _sorted_pieces(letters):
+    return ''.join(sorted(letters, key=STRENGTH.index))
+
+
+def _strength(letters):
+    return (len(letters), [len(STRENGTH) - STRENGTH.index(ch) for ch in letters])
+
+
+def canonical_signature(white, black):
+    """(signature, flipped): the stronger side is written as White."""
+    white, black = _sorted_pieces(white), _sorted_pieces(black)
+    if _strength(white) >= _strength(black):
+        return f"K{white}vK{black}", False
+    return f"K{black}vK{white}", True
+
+
+def parse_signature(signature):
+    try:
+        white, black = signature.upper().split('V')
+    except ValueError:
+        raise ValueError(f"Invalid signature: {signature!r}")
+    if not (white.startswith('K') and black.startswith('K')) or any(
+            ch not in STRENGTH for ch in white[1:] + black[1:]):
+        raise ValueError(f"Invalid signature: {signature!r}")
+    if len(white) + len(black) > MAX_PIECES:
+        raise ValueError(f"Tablebases cover at most {MAX_PIECES} pieces: {signature!r}")
+    return _sorted_pieces(white[1:]), _sorted_pieces(black[1:])
+
+
+def signatures(pieces):
+    """Every canonical signature with exactly `pieces` pieces (kings included)."""
+    found = set()
+    extra = pieces - 2
+
+    def combos(n, start=0):
+        if n == 0:
+            yield ''
+            return
+        for i in range(start, len(STRENGTH)):
+            for rest in combos(n - 1, i):
+                yield STRENGTH[i] + rest
+
+    for n_white in range(extra + 1):
+        for white in combos(n_white):
+            for black in combos(extra - n_white):
+                found.add(canonical_signature(white, black)[0])
+    return sorted(found)
+
+
+class TableSpec:
+    """Piece layout and index arithmetic for one signature."""
+
+    def __init__(self, signature):
+        white, black = parse_signature(signature)
+        self.signature = f"K{white}vK{black}"
+        self.pieces = ([(WHITE, KING), (BLACK, KING)]
+                       + [(WHITE, LETTERS.index(ch)) for ch in white]
+                       + [(BLACK, LETTERS.index(ch)) for ch in black])
+        self.n = len(self.pieces)
+        self.pawns = any(ptype == PAWN for _, ptype in self.pieces)
+        self.region = QUEENSIDE if self.pawns else TRIANGLE
+        self.region_pos = {sq: i for i, sq in enumerate(self.region)}
+        transforms = MIRROR_TRANSFORMS if self.pawns else ALL_TRANSFORMS
+        self.wk_transforms = [[t for t in transforms if t[sq] in self.region_pos] for sq in range(64)]
+        self.size = len(self.region) * 64 ** (self.n - 1)
+        twins = [(i, j) for i in range(2, self.n) for j in range(i + 1, self.n)
+                 if self.pieces[i] == self.pieces[j]]
+        self.twin = twins[0] if twins else None
+
+    def index(self, squares):
+        """Index of the canonical (symmetry-reduced) form of a position."""
+        best = -1
+        for t in self.wk_transforms[squares[0]]:
+            mapped = [t[sq] for sq in squares]
+            if self.twin is not None:
+                a, b = self.twin
+                if mapped[a] > mapped[b]:
+                    mapped[a], mapped[b] = mapped[b], mapped[a]
+            idx = self.region_pos[mapped[0]]
+            for sq in mapped[1:]:
+                idx = idx * 64 + sq
+            if best < 0 or idx < best:
+                best = idx
+        return best
+
+    def squares(self, idx):
+        out = []
+        for _ in range(self.n - 1):
+            out.append(idx & 63)
+            idx >>= 6
+        out.append(self.region[idx])
+        out.reverse()
+        return out
+
+    def order(self, pieces, squares):
+        """Squares of `pieces` rearranged into this table's piece order."""
+        used = [False] * len(pieces)
+        out = []
+        for want in self.pieces:
+            for i, piece in enumerate(pieces):
+                if not used[i] and piece == want:
+                    used[i] = True
+                    out.append(squares[i])
+                    break
+            else:
+                raise ValueError(f"Pieces do not match {self.signature}")
+        return out
+
+    def subtables(self):
+        """Signatures reachable by a capture or a promotion."""
+        subs = set()
+        white = [LETTERS[t] for c, t in self.pieces[2:] if c == WHITE]
+        black = [LETTERS[t] for c, t in self.pieces[2:] if c == BLACK]
+        for side, other, flip in ((white, black, False), (black, white, True)):
+            for i, ch in enumerate(side):
+                rest = side[:i] + side[i + 1:]
+                options = [rest] + ([rest + [p] for p in 'QRBN'] if ch == 'P' else [])
+                for new in options:
+                    w, b = (other, new) if flip else (new, other)
+                    if w or b:
+                        subs.add(canonical_signature(''.join(w), ''.join(b))[0])
+        subs.discard(self.signature)
+        return sorted(subs)
+
+
+# --- Attacks on a few pieces ---
+
+def _attacks(color, ptype, sq, occ):
+    if ptype == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    if ptype == KING:
+        return KING_ATTACKS[sq]
+    if ptype == PAWN:
+        return PAWN_ATTACKS[color][sq]
+    if ptype == BISHOP:
+        return bishop_attacks(sq, occ)
+    if ptype == ROOK:
+        return rook_attacks(sq, occ)
+    return rook_attacks(sq, occ) | bishop_attacks(sq, occ)
+
+
+def _attacked(pieces, squares, target, by, occ, skip=-1):
+    for i, (color, ptype) in enumerate(pieces):
+        if color == by and i != skip and _attacks(color, ptype, squares[i], occ) >> target & 1:
+            return True
+    return False
+
+
+def _valid(pieces, squares, stm):
+    """Distinct squares, no pawn on a back rank, and the side not to move not in check."""
+    occ = 0
+    for sq in squares:
+        occ |= 1 << sq
+    if popcount(occ) != len(squares):
+        return False
+    for (color, ptype), sq in zip(pieces, squares):
+        if ptype == PAWN and not 8 <= sq < 56:
+            return False
+    if KING_ATTACKS[squares[0]] >> squares[1] & 1:
+        return False
+    return not _attacked(pieces, squares, squares[1 - stm], stm, occ)
+
+
+# --- Probing ---
+
+class Table:
+    """One signature's values over a buffer (memory map or bytearray)."""
+
+    def __init__(self, spec, data, offset=0):
+        self.spec = spec
+        self.data = data
+        self.offset = offset
+
+    def code(self, squares, stm):
+        return self.data[self.offset + stm * self.spec.size + self.spec.index(squares)]
+
+
+def decode(code):
+    """(wdl, plies) for the side to move: wdl is 1, 0 or -1."""
+    if not code:
+        return 0, 0
+    plies = code - 1
+    return (1 if plies & 1 else -1), plies
+
+
+class Tablebases:
+    """The tables found in a directory, memory-mapped and probed by position."""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.tables = {}
+        self.max_pieces = 0
+        self._files = []
+        if directory and os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(FILE_SUFFIX):
+                    self.load(os.path.join(directory, name))
+
+    def load(self, path):
+        f = open(path, "rb")
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, signature = HEADER.unpack_from(data, 0)
+        spec = TableSpec(signature.rstrip(b"\0").decode("ascii"))
+        if magic != MAGIC or version != VERSION or len(data) != HEADER.size + 2 * spec.size:
+            data.close()
+            f.close()
+            raise ValueError(f"Not a tablebase file: {path}")
+        self._files.append((f, data))
+        self.tables[spec.signature] = Table(spec, data, HEADER.size)
+        self.max_pieces = max(self.max_pieces, spec.n)
+
+    def close(self):
+        self.tables.clear()
+        self.max_pieces = 0
+        for f, data in self._files:
+            data.close()
+            f.close()
+        self._files = []
+
+    def __len__(self):
+        return len(self.tables)
+
+    def probe_pieces(self, pieces, squares, stm):
+        """Table byte for a piece list, or None when no table covers it."""
+        white = ''.join(LETTERS[t] for c, t in pieces if c == WHITE and t != KING)
+        black = ''.join(LETTERS[t] for c, t in pieces if c == BLACK and t != KING)
+        if not white and not black:
+            return 0
+        signature, flipped = canonical_signature(white, black)
+        table = self.tables.get(signature)
+        if table is None or len(pieces) != table.spec.n:
+            return None
+        if flipped:
+            pieces = [(1 - c, t) for c, t in pieces]
+            squares = [sq ^ 56 for sq in squares]
+            stm = 1 - stm
+        return table.code(table.spec.order(pieces, squares), stm)
+
+    def probe(self, pos):
+        """Table byte for a Position, or None if it cannot be probed."""
+        if pos.castling:
+            return None
+        occ = pos.occ[WHITE] | pos.occ[BLACK]
+        if popcount(occ) > MAX_PIECES:
+            return None
+        if pos.ep is not None and any((m >> 6) & 63 == pos.ep and pos.squares[m & 63] % 6 == PAWN
+                                      for m in pos.legal_moves()):
+            return None  # tables ignore en passant
+        pieces, squares = [], []
+        while occ:
+            low = occ & -occ
+            sq = low.bit_length() - 1
+            piece = pos.squares[sq]
+            pieces.append((piece // 6, piece % 6))
+            squares.append(sq)
+            occ ^= low
+        return self.probe_pieces(pieces, squares, pos.side)
+
+    def best_move(self, pos):
+        """(move, wdl, plies) of the fastest win / any draw / slowest loss, or None."""
+        if self.probe(pos) is None:
+            return None
+        best = None
+        for move in pos.legal_moves():
+            pos.make(move)
+            code = self.probe(pos)
+            pos.unmake()
+            if code is None:
+                return None
+            wdl, plies = decode(code)
+            wdl, plies = -wdl, plies + 1
+            # Wins by speed, then draws, then losses by length
+            rank = (wdl, -plies if wdl > 0 else plies if wdl < 0 else 0)
+            if best is None or rank > best[0]:
+                best = (rank, move, wdl, plies if wdl else 0)
+        return best[1:] if best else None
+
+
+# --- Generation ---
+
+class _Builder:
+    """Retrograde analysis of one table, using `tablebases` for the positions
+    a capture or promotion leads to."""
+
+    def __init__(self, spec, tablebases):
+        self.spec = spec
+        self.tablebases = tablebases
+        self.state = bytearray(2 * spec.size)
+        self.values = bytearray(2 * spec.size)
+
+    def children(self, squares, stm):
+        """('t', key) for moves staying in this table, ('x', code) for the others."""
+        spec, pieces = self.spec, self.spec.pieces
+        size = spec.size
+        occ = own = 0
+        for (color, _), sq in zip(pieces, squares):
+            occ |= 1 << sq
+            if color == stm:
+                own |= 1 << sq
+        enemy = occ & ~own
+        king = stm  # index of the mover's king in the piece list
+        out = []
+        for i, (color, ptype) in enumerate(pieces):
+            if color != stm:
+                continue
+            frm = squares[i]
+            if ptype == PAWN:
+                step = 8 if stm == WHITE else -8
+                targets = PAWN_ATTACKS[stm][frm] & enemy
+                if not occ >> (frm + step) & 1:
+                    targets |= 1 << (frm + step)
+                    start = frm >> 3 == (1 if stm == WHITE else 6)
+                    if start and not occ >> (frm + 2 * step) & 1:
+                        targets |= 1 << (frm + 2 * step)
+            else:
+                targets = _attacks(color, ptype, frm, occ) & ~own
+            while targets:
+                low = targets & -targets
+                to = low.bit_length() - 1
+                targets ^= low
+                moved = list(squares)
+                moved[i] = to
+                captured = squares.index(to) if enemy & low else -1
+                new_occ = (occ ^ (1 << frm)) | low
+                if _attacked(pieces, moved, moved[king], 1 - stm, new_occ, captured):
+                    continue
+                promotes = ptype == PAWN and (to >> 3 == 7 or to >> 3 == 0)
+                if captured < 0 and not promotes:
+                    out.append(('t', (1 - stm) * size + spec.index(moved)))
+                    continue
+                child = [(p, sq) for j, (p, sq) in enumerate(zip(pieces, moved)) if j != captured]
+                kinds = (QUEEN, ROOK, BISHOP, KNIGHT) if promotes else (ptype,)
+                for kind in kinds:
+                    child_pieces = [(color, kind) if sq == to and p == (color, ptype) else p for p, sq in child]
+                    code = self.tablebases.probe_pieces(child_pieces, [sq for _, sq in child], 1 - stm)
+                    if code is None:
+                        raise LookupError(f"{spec.signature} needs the table for {child_pieces}")
+                    out.append(('x', code))
+        return out
+
+    def predecessors(self, squares, stm):
+        """Keys of positions from which the last move (by the other side) led here."""
+        spec, pieces = self.spec, self.spec.pieces
+        mover = 1 - stm
+        occ = 0
+        for sq in squares:
+            occ |= 1 << sq
+        base = mover * spec.size
+        for i, (color, ptype) in enumerate(pieces):
+            if color != mover:
+                continue
+            to = squares[i]
+            if ptype == PAWN:
+                step = 8 if mover == WHITE else -8
+                origins = 0
+                frm = to - step
+                if 8 <= frm < 56 and not occ >> frm & 1:
+                    origins |= 1 << frm
+                    if to >> 3 == (3 if mover == WHITE else 4) and not occ >> (frm - step) & 1:
+                        origins |= 1 << (frm - step)
+            else:
+                origins = _attacks(color, ptype, to, occ) & ~occ
+            while origins:
+                low = origins & -origins
+                origins ^= low
+                prev = list(squares)
+                prev[i] = low.bit_length() - 1
+                if _valid(pieces, prev, mover):
+                    yield base + spec.index(prev)
+
+    def _resolve(self, key):
+        """Push a fully known loss for `key` into its bucket (if it is one)."""
+        spec = self.spec
+        stm, idx = divmod(key, spec.size)
+        worst = -1
+        for kind, value in self.children(spec.squares(idx), stm):
+            if kind == 't':
+                if self.state[value] != FINAL:
+                    return None
+                value = self.values[value]
+            if not value or not (value - 1) & 1:
+                return None  # a draw, or the opponent loses: not a loss
+            worst = max(worst, value)
+        return worst
+
+    def run(self, out=None):
+        spec, state, values = self.spec, self.state, self.values
+        size = spec.size
+        buckets = [[] for _ in range(MAX_PLIES + 2)]
+        for key in range(2 * size):
+            stm, idx = divmod(key, size)
+            squares = spec.squares(idx)
+            if spec.index(squares) != idx or not _valid(spec.pieces, squares, stm):
+                state[key] = INVALID
+                continue
+            kids = self.children(squares, stm)
+            if not kids:
+                if _attacked(spec.pieces, squares, squares[stm], 1 - stm, sum(1 << sq for sq in squares)):
+                    buckets[0].append(key)  # checkmated
+                else:
+                    state[key] = FINAL  # stalemate
+                continue
+            best_win, worst_loss, draw, inside = None, -1, False, False
+            for kind, value in kids:
+                if kind == 't':
+                    inside = True
+                elif not value:
+                    draw = True
+                elif (value - 1) & 1:
+                    worst_loss = max(worst_loss, value)  # the child wins
+                else:
+                    best_win = value if best_win is None else min(best_win, value)
+            if best_win is not None:
+                buckets[best_win].append(key)
+            elif not inside:
+                if draw:
+                    state[key] = FINAL
+                else:
+                    buckets[worst_loss].append(key)
+        for plies in range(MAX_PLIES + 1):
+            pending = set()
+            for key in buckets[plies]:
+                if state[key]:
+                    continue
+                state[key] = FINAL
+                values[key] = plies + 1
+                stm, idx = divmod(key, size)
+                for prev in self.predecessors(spec.squares(idx), stm):
+                    if state[prev]:
+                        continue
+                    if plies & 1:
+                        pending.add(prev)  # we win here: the mover may now be lost
+                    else:
+                        buckets[plies + 1].append(prev)  # we are lost: the mover wins
+            for key in pending:
+                if not state[key]:
+                    worst = self._resolve(key)
+                    if worst is not None:
+                        buckets[worst].append(key)
+            if out and buckets[plies]:
+                out(f"  {spec.signature}: {len(buckets[plies])} positions at {plies} plies")
+        return values
+
+
+def generate(signature, directory, tablebases=None, out=print):
+    """Build `signature` (and the tables it converts into) into `directory`.
+
+    Returns the Tablebases holding every table built or found.
+    """
+    spec = TableSpec(canonical_signature(*parse_signature(signature))[0])
+    if tablebases is None:
+        tablebases = Tablebases(directory)
+    if spec.signature in tablebases.tables:
+        return tablebases
+    for sub in spec.subtables():
+        generate(sub, directory, tablebases, out)
+    if out:
+        out(f"Building {spec.signature} ({2 * spec.size} positions)")
+    values = _Builder(spec, tablebases).run(out)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, spec.signature + FILE_SUFFIX)
+    with open(path + ".tmp", "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, spec.signature.encode("ascii")))
+        f.write(values)
+    os.replace(path + ".tmp", path)
+    tablebases.load(path)
+    return tablebases
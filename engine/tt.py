@@ -0,0 +1,100 @@
+"""Fixed-size transposition table.
+
+Entries live in two flat 64-bit buffers (key and packed data, 16 bytes per
+entry), so the memory budget is exact. Buckets hold two entries: slot 0 is
+depth-preferred, slot 1 is always-replace. Keys are stored XORed with the
+data word so a torn write -- e.g. from another search process sharing the
+table -- is detected as a miss.
+"""
+
+import ctypes
+from array import array
+from multiprocessing.sharedctypes import RawArray
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+ENTRY_BYTES = 16
+_SCORE_OFFSET = 1 << 19
+_MASK16 = 0xFFFF
+_MASK20 = 0xFFFFF
+
+
+class TranspositionTable:
+    """Two-slot bucketed hash table; pass ``shared=True`` to place it in
+    shared memory that worker processes can attach to (see ``shared_buffers``).
+    """
+
+    def __init__(self, size_mb=16, shared=False):
+        self.shared = shared
+        self.resize(size_mb)
+
+    def resize(self, size_mb):
+        self.size_mb = size_mb
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_BYTES))
+        if self.shared:
+            self._raw = (RawArray(ctypes.c_uint64, 2 * self.buckets),
+                         RawArray(ctypes.c_uint64, 2 * self.buckets))
+            self.keys, self.data = (memoryview(raw).cast('B').cast('Q') for raw in self._raw)
+        else:
+            self._raw = None
+            self.keys = array('Q', bytes(16 * self.buckets))
+            self.data = array('Q', bytes(16 * self.buckets))
+        self.generation = 0
+
+    @classmethod
+    def attach(cls, size_mb, buffers):
+        """Wrap shared buffers created by another process's table."""
+        tt = cls.__new__(cls)
+        tt.shared = True
+        tt.size_mb = size_mb
+        tt.buckets = len(buffers[0]) // 2
+        tt._raw = buffers
+        tt.keys, tt.data = (memoryview(raw).cast('B').cast('Q') for raw in buffers)
+        tt.generation = 0
+        return tt
+
+    def shared_buffers(self):
+        return self._raw
+
+    def clear(self):
+        if self.shared:
+            for raw in self._raw:
+                ctypes.memset(raw, 0, ctypes.sizeof(raw))
+            self.generation = 0
+        else:
+            self.resize(self.size_mb)
+
+    def new_search(self):
+        """Age the table so entries from earlier searches are replaced first."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key):
+        """Return (move, score, depth, flag) for `key`, or None."""
+        i = (key % self.buckets) << 1
+        keys, data = self.keys, self.data
+        for slot in (i, i + 1):
+            d = data[slot]
+            if keys[slot] ^ d == key and d:
+                return (d & _MASK16, ((d >> 16) & _MASK20) - _SCORE_OFFSET,
+                        (d >> 36) & 0xFF, (d >> 44) & 3)
+        return None
+
+    def store(self, key, move, score, depth, flag):
+        i = (key % self.buckets) << 1
+        keys, data = self.keys, self.data
+        d = (move | ((score + _SCORE_OFFSET) << 16) | (depth << 36)
+             | (flag << 44) | (self.generation << 46))
+        old = data[i]
+        if (keys[i] ^ old == key or depth >= (old >> 36) & 0xFF
+                or (old >> 46) & 0xFF != self.generation):
+            slot = i
+        else:
+            slot = i + 1
+        data[slot] = d
+        keys[slot] = key ^ d
+
+    def hashfull(self):
+        """Permille of sampled slots written during the current search."""
+        sample = min(1000, len(self.data))
+        used = sum(1 for d in self.data[:sample] if d and (d >> 46) & 0xFF == self.generation)
+        return used * 1000 // sample
@@ -0,0 +1,37 @@
+"""Zobrist keys for incremental position hashing."""
+
+import random
+
+from .evaluate import STYLES, STYLE_SCALE
+
+_rng = random.Random(0x5EED_C4E55)
+
+# PIECE_KEYS[piece][sq] for piece = color * 6 + type
+PIECE_KEYS = [[_rng.getrandbits(64) for _ in range(64)] for _ in range(12)]
+SIDE_KEY = _rng.getrandbits(64)
+# One key per castling-rights bitmask (0..15)
+_CASTLE_BITS = [_rng.getrandbits(64) for _ in range(4)]
+CASTLE_KEYS = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            CASTLE_KEYS[_rights] ^= _CASTLE_BITS[_bit]
+EP_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+# XORed into transposition-table keys so each evaluation keeps its own entries
+# in a shared table; styles that evaluate like 'standard' share its key.
+# Position hashes (and the book) are unaffected
+STYLE_KEYS = {style: _rng.getrandbits(64) if style in STYLE_SCALE else 0 for style in STYLES}
+
+
+def compute_hash(pos):
+    """Hash a position from scratch (make/unmake keep it up to date afterwards)."""
+    h = 0
+    for sq, piece in enumerate(pos.squares):
+        if piece is not None:
+            h ^= PIECE_KEYS[piece][sq]
+    if pos.side:
+        h ^= SIDE_KEY
+    h ^= CASTLE_KEYS[pos.castling]
+    if pos.ep_capturable():
+        h ^= EP_KEYS[pos.ep & 7]
+    return h
@@ -0,0 +1,116 @@
+"""Batched, non-blocking game-event logging.
+
+Request handlers only enqueue events; a background thread drains the
+bounded queue and appends NDJSON records to a size-rotated log file. When
+the queue is full new events are dropped and counted rather than blocking
+the request.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+DEFAULT_LOG_PATH = os.path.join("logs", "game_events.ndjson")
+_STOP = object()
+
+
+class EventLog:
+    def __init__(self, path=DEFAULT_LOG_PATH, max_bytes=10 * 1024 * 1024, backups=5,
+                 queue_size=10000, echo=False):
+        self.path = path
+        self.echo = echo
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.accepted = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self._counter_lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    def submit(self, events, client=None):
+        """Queue a batch of events (dicts or strings); returns how many were accepted."""
+        received = time.time()
+        accepted = dropped = 0
+        for event in events:
+            if not isinstance(event, dict):
+                event = {"msg": str(event)}
+            # Server fields last, so a client cannot overwrite them
+            record = {**event, "ts": round(received, 3), "client": client}
+            try:
+                self.queue.put_nowait(record)
+                accepted += 1
+            except queue.Full:
+                dropped += 1
+        with self._counter_lock:
+            self.accepted += accepted
+            self.dropped += dropped
+        return accepted
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            # Drain whatever else is waiting so the file is written in batches
+            while len(batch) < 500:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in batch
+            records = [r for r in batch if r is not _STOP]
+            for record in records:
+                line = json.dumps(record, separators=(",", ":"))
+                self._handler.handle(logging.makeLogRecord({"msg": line}))
+                if self.echo:
+                    print(f"[Game Event] {record.get('msg', line)}")
+            if records:
+                self._handler.flush()
+                with self._counter_lock:
+                    self.written += len(records)
+                    self.batches += 1
+            if stop:
+                return
+
+    def stats(self):
+        with self._counter_lock:
+            return {
+                "accepted": self.accepted,
+                "dropped": self.dropped,
+                "written": self.written,
+                "batches": self.batches,
+                "queued": self.queue.qsize(),
+                "capacity": self.queue.maxsize,
+            }
+
+    def close(self, timeout=5.0):
+        """Flush queued events and stop the writer thread."""
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+        self._handler.close()
+
+
+def parse_batch(body, content_type=""):
+    """Events from an NDJSON body; anything else is treated as one plain-text event."""
+    text = body.decode("utf-8", errors="replace")
+    if "ndjson" not in content_type and not text.lstrip().startswith("{"):
+        return [text] if text else []
+    events = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            event = line
+        events.append(event)
+    return events
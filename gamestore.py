@@ -0,0 +1,240 @@
+"""Persistent archive of finished games (SQLite in WAL mode).
+
+Listing uses keyset pagination on (finished_at, id) so a page costs the
+same at game one million as at game one. Player lookups go through the
+`game_players` table, which indexes both colours of every game; opening
+lookups go through `game_openings`, which indexes every prefix of the
+first OPENING_PLIES moves, so both stay exact-match index range scans.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = "chess_games.db"
+OPENING_PLIES = 6  # moves kept in the `opening` key
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id           INTEGER PRIMARY KEY,
+    white        TEXT NOT NULL,
+    black        TEXT NOT NULL,
+    result       TEXT NOT NULL,
+    termination  TEXT,
+    mode         TEXT,
+    level        INTEGER,
+    style        TEXT,
+    time_control INTEGER,
+    start_fen    TEXT,
+    moves        TEXT NOT NULL,
+    ply_count    INTEGER NOT NULL,
+    opening      TEXT NOT NULL,
+    started_at   REAL,
+    finished_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    player      TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    game_id     INTEGER NOT NULL,
+    color       TEXT NOT NULL,
+    PRIMARY KEY (player, finished_at, game_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS game_openings (
+    opening     TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    game_id     INTEGER NOT NULL,
+    PRIMARY KEY (opening, finished_at, game_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_games_finished ON games(finished_at, id);
+CREATE INDEX IF NOT EXISTS ix_games_result ON games(result, finished_at, id);
+DROP INDEX IF EXISTS ix_games_opening;
+"""
+
+_COLUMNS = ("id", "white", "black", "result", "termination", "mode", "level", "style",
+            "time_control", "start_fen", "moves", "ply_count", "opening", "started_at", "finished_at")
+
+
+class GameStore:
+    """Thread-safe store: each thread gets its own SQLite connection."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            self._index_openings(conn)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _index_openings(self, conn):
+        # Databases written before `game_openings` existed: index their games once
+        if conn.execute("SELECT EXISTS (SELECT 1 FROM game_openings)").fetchone()[0]:
+            return
+        rows = conn.execute("SELECT id, opening, finished_at FROM games").fetchall()
+        conn.executemany(
+            "INSERT OR IGNORE INTO game_openings (opening, finished_at, game_id) VALUES (?, ?, ?)",
+            (entry for row in rows for entry in _opening_rows(row[1].split(), row[2], row[0])))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- Writing ---
+
+    def add_game(self, game):
+        """Store one finished game (dict); returns its id."""
+        return self.add_games([game])[0]
+
+    def add_games(self, games):
+        """Store many games in one transaction; returns their ids."""
+        conn = self._conn()
+        ids = []
+        with conn:
+            for game in games:
+                row = _normalise(game)
+                cur = conn.execute(
+                    "INSERT INTO games (white, black, result, termination, mode, level, style, "
+                    "time_control, start_fen, moves, ply_count, opening, started_at, finished_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+                game_id = cur.lastrowid
+                conn.executemany(
+                    "INSERT OR IGNORE INTO game_players (player, finished_at, game_id, color) VALUES (?, ?, ?, ?)",
+                    ((row[0], row[13], game_id, "w"), (row[1], row[13], game_id, "b")))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO game_openings (opening, finished_at, game_id) VALUES (?, ?, ?)",
+                    _opening_rows(row[11].split(), row[13], game_id))
+                ids.append(game_id)
+        return ids
+
+    # --- Reading ---
+
+    def get_game(self, game_id):
+        row = self._conn().execute("SELECT * FROM games WHERE id = ?", (game_id,)).fetchone()
+        return _to_dict(row) if row else None
+
+    def list_games(self, player=None, result=None, opening=None, since=None, until=None,
+                   limit=50, cursor=None, with_moves=False):
+        """Newest-first page of game summaries (move lists only with `with_moves`).
+
+        `opening` is the first 1 to OPENING_PLIES moves in UCI, space
+        separated, and matches whole moves only ("e2e4" finds games
+        opening 1. e4, not 1. e3). `cursor` is the `next_cursor` of the
+        previous page. Returns (games, next_cursor); next_cursor is None
+        on the last page.
+        """
+        limit = max(1, min(int(limit), 500))
+        where, args = [], []
+        opening = " ".join(opening.split()) if opening is not None else ""
+        if len(opening.split()) > OPENING_PLIES:
+            raise ValueError(f"Opening filter is limited to {OPENING_PLIES} moves")
+        if player is not None:
+            source = "game_players p JOIN games g ON g.id = p.game_id"
+            where.append("p.player = ?")
+            args.append(player)
+            order_cols = ("p.finished_at", "p.game_id")
+            if opening:
+                where.append("EXISTS (SELECT 1 FROM game_openings o WHERE o.opening = ? "
+                             "AND o.finished_at = p.finished_at AND o.game_id = p.game_id)")
+                args.append(opening)
+        elif opening:
+            # Exact key, rows already in (finished_at, game_id) order: no sort
+            source = "game_openings o JOIN games g ON g.id = o.game_id"
+            where.append("o.opening = ?")
+            args.append(opening)
+            order_cols = ("o.finished_at", "o.game_id")
+        else:
+            source = "games g"
+            order_cols = ("g.finished_at", "g.id")
+        if result is not None:
+            where.append("g.result = ?")
+            args.append(result)
+        if since is not None:
+            where.append(f"{order_cols[0]} >= ?")
+            args.append(float(since))
+        if until is not None:
+            where.append(f"{order_cols[0]} < ?")
+            args.append(float(until))
+        if cursor:
+            finished, game_id = cursor.split(":")
+            where.append(f"({order_cols[0]}, {order_cols[1]}) < (?, ?)")
+            args.extend((float(finished), int(game_id)))
+        sql = ("SELECT g.id, g.white, g.black, g.result, g.termination, g.mode, g.level, g.style, "
+               "g.time_control, g.ply_count, g.opening, g.started_at, g.finished_at"
+               + (", g.start_fen, g.moves " if with_moves else " ")
+               + f"FROM {source}")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order_cols[0]} DESC, {order_cols[1]} DESC LIMIT ?"
+        rows = self._conn().execute(sql, args + [limit + 1]).fetchall()
+        games = [dict(row) for row in rows[:limit]]
+        if with_moves:
+            for game in games:
+                game["moves"] = game["moves"].split() if game["moves"] else []
+        next_cursor = None
+        if len(rows) > limit:
+            last = games[-1]
+            next_cursor = f"{last['finished_at']!r}:{last['id']}"
+        return games, next_cursor
+
+    def iter_games(self, batch=500, **filters):
+        """Every matching game with its moves, newest first, one page in memory at a time."""
+        cursor = None
+        while True:
+            games, cursor = self.list_games(limit=batch, cursor=cursor, with_moves=True, **filters)
+            yield from games
+            if cursor is None:
+                return
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+
+def _normalise(game):
+    moves = game.get("moves") or []
+    if isinstance(moves, str):
+        moves = moves.split()
+    result = game.get("result") or "*"
+    if result not in RESULTS:
+        raise ValueError(f"Invalid result: {result!r}")
+    finished = float(game.get("finished_at") or time.time())
+    return (
+        str(game.get("white") or "White"),
+        str(game.get("black") or "Black"),
+        result,
+        game.get("termination"),
+        game.get("mode"),
+        int(game["level"]) if game.get("level") is not None else None,
+        game.get("style"),
+        int(game["time_control"]) if game.get("time_control") is not None else None,
+        game.get("start_fen"),
+        " ".join(moves),
+        len(moves),
+        " ".join(moves[:OPENING_PLIES]),
+        float(game["started_at"]) if game.get("started_at") is not None else None,
+        finished,
+    )
+
+
+def _opening_rows(moves, finished_at, game_id):
+    # One game_openings row per prefix of the opening: "e2e4", "e2e4 e7e5", ...
+    return [(" ".join(moves[:n]), finished_at, game_id) for n in range(1, len(moves) + 1)]
+
+
+def _to_dict(row):
+    game = dict(zip(_COLUMNS, (row[c] for c in _COLUMNS)))
+    game["moves"] = game["moves"].split() if game["moves"] else []
+    return game
@@ -0,0 +1,295 @@
+"""Engine instrumentation: Prometheus metrics and profiling hooks.
+
+``SearchMetrics`` adds up the counters of every bot search
+(``Searcher.stats()``) and keeps latency and depth histograms; ``render``
+writes those, plus the stats dicts of the other server components, in
+the Prometheus text exposition format served at ``/metrics``.
+``profile_call`` runs a single call under cProfile or a low-overhead
+stack sampler and returns a text report, so one slow request can be
+profiled on a live server; ``ProfileCollector`` merges many cProfile
+runs for ``--profile``.
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEPTH_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 12, 16)
+PROFILE_LINES = 30       # functions listed in a profile report
+SAMPLE_INTERVAL = 0.001  # seconds between stack samples
+
+_profile_lock = threading.Lock()  # the interpreter allows one cProfile at a time
+_profiling = threading.local()     # set while this thread runs under cProfile
+
+
+# --- Prometheus text format ---
+
+class Histogram:
+    """Cumulative-bucket histogram as Prometheus expects it."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def samples(self, labels=None):
+        labels = labels or {}
+        for bound, count in zip(self.buckets, self.counts):
+            yield '_bucket', dict(labels, le=f"{bound:g}"), count
+        yield '_bucket', dict(labels, le="+Inf"), self.count
+        yield '_sum', labels, self.sum
+        yield '_count', labels, self.count
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def render(families):
+    """Prometheus text for (name, type, help, samples) families.
+
+    `samples` is a list of (suffix, labels, value); suffix is appended to
+    the family name ('' for plain counters and gauges).
+    """
+    lines = []
+    for name, kind, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+def stats_families(prefix, stats, counters=(), description=''):
+    """Families for the numeric values of a component's stats() dict.
+
+    Keys in `counters` become ``<prefix>_<key>_total`` counters, the rest gauges.
+    """
+    families = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if key in counters:
+            families.append((f"{prefix}_{key}_total", 'counter', f"{description} {key}".strip(), [('', {}, value)]))
+        else:
+            families.append((f"{prefix}_{key}", 'gauge', f"{description} {key}".strip(), [('', {}, value)]))
+    return families
+
+
+# --- Search metrics ---
+
+class SearchMetrics:
+    """Totals over every bot search, by source ('search', 'book', 'tablebase')."""
+
+    COUNTERS = (
+        ('nodes', "Nodes searched, quiescence included"),
+        ('qnodes', "Quiescence nodes searched"),
+        ('tt_probes', "Transposition table probes"),
+        ('tt_hits', "Transposition table probes that found an entry"),
+        ('tt_cutoffs', "Nodes answered from the transposition table"),
+        ('beta_cutoffs', "Beta cutoffs"),
+        ('first_move_cutoffs', "Beta cutoffs by the first move searched"),
+        ('tb_hits', "Tablebase probes that found the position"),
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.searches = Counter()
+        self.totals = {name: 0 for name, _ in self.COUNTERS}
+        self.seconds = Histogram(SECONDS_BUCKETS)
+        self.depth = Histogram(DEPTH_BUCKETS)
+        self.last = {}
+
+    def record(self, source, seconds, depth=0, stats=None):
+        with self.lock:
+            self.searches[source] += 1
+            self.seconds.observe(seconds)
+            if source != 'search':
+                return
+            self.depth.observe(depth)
+            if stats:
+                for name in self.totals:
+                    self.totals[name] += stats.get(name, 0)
+                self.last = {
+                    'depth': depth,
+                    'nodes_per_second': stats['nodes'] / seconds if seconds > 0 else 0.0,
+                    'branching_factor': stats['branching_factor'],
+                    'tt_hit_rate': stats['tt_hit_rate'],
+                    'first_move_cutoff_rate': stats['first_move_cutoff_rate'],
+                }
+
+    def families(self):
+        with self.lock:
+            families = [
+                ('chess_searches_total', 'counter', "Bot moves chosen, by source",
+                 [('', {'source': source}, count) for source, count in sorted(self.searches.items())]),
+                ('chess_search_seconds', 'histogram', "Time to choose a bot move",
+                 list(self.seconds.samples())),
+                ('chess_search_depth', 'histogram', "Completed iterative-deepening depth",
+                 list(self.depth.samples())),
+            ]
+            for name, help_text in self.COUNTERS:
+                families.append((f"chess_search_{name}_total", 'counter', help_text, [('', {}, self.totals[name])]))
+            for name, value in self.last.items():
+                families.append((f"chess_last_search_{name}", 'gauge', f"Last search: {name.replace('_', ' ')}",
+                                 [('', {}, value)]))
+        return families
+
+
+# --- Profiling ---
+
+class SamplingProfiler:
+    """Samples one thread's Python stack from a helper thread.
+
+    Much cheaper than cProfile (the search runs at close to full speed),
+    at the price of statistical counts; the sampling rate is bounded by
+    the interpreter's thread switch interval.
+    """
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.samples = 0
+        self.own = Counter()         # function at the top of the stack
+        self.cumulative = Counter()  # function anywhere on the stack
+        self._stop = threading.Event()
+        self._thread = None
+        self.started = self.elapsed = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            top = True
+            while frame is not None:
+                code = frame.f_code
+                key = f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+                if top:
+                    self.own[key] += 1
+                    top = False
+                if key not in seen:
+                    seen.add(key)
+                    self.cumulative[key] += 1
+                frame = frame.f_back
+
+    def report(self, limit=PROFILE_LINES):
+        total = self.samples or 1
+        lines = [f"{self.samples} samples in {self.elapsed:.3f}s",
+                 f"{'own%':>7} {'cum%':>7}  function"]
+        for key, own in self.own.most_common(limit):
+            lines.append(f"{own * 100 / total:7.1f} {self.cumulative[key] * 100 / total:7.1f}  {key}")
+        return '\n'.join(lines) + '\n'
+
+
+def _run_profiled(profiler, func):
+    # A call nested in another profiled call is only counted by the outer profile
+    if getattr(_profiling, 'active', False):
+        return func()
+    with _profile_lock:
+        _profiling.active = True
+        try:
+            return profiler.runcall(func)
+        finally:
+            _profiling.active = False
+
+
+def _cprofile_report(stats, limit):
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def profile_call(func, mode='cprofile', limit=PROFILE_LINES):
+    """Run func() under a profiler ('cprofile' or 'sample'); returns (result, report text)."""
+    if mode == 'sample':
+        sampler = SamplingProfiler().start()
+        try:
+            result = func()
+        finally:
+            sampler.stop()
+        return result, sampler.report(limit)
+    if mode != 'cprofile':
+        raise ValueError(f"Unknown profiler: {mode!r} (cprofile or sample)")
+    profiler = cProfile.Profile()
+    result = _run_profiled(profiler, func)
+    profiler.create_stats()
+    if not profiler.stats:
+        return result, "No profile data (already profiled by --profile)\n"
+    return result, _cprofile_report(pstats.Stats(profiler), limit)
+
+
+class ProfileCollector:
+    """Merges cProfile runs from any thread into one report."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = None
+        self.runs = 0
+
+    def call(self, func):
+        profiler = cProfile.Profile()
+        try:
+            return _run_profiled(profiler, func)
+        finally:
+            self.add(profiler)
+
+    def add(self, profiler):
+        profiler.create_stats()
+        if not profiler.stats:
+            return
+        with self.lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profiler)
+            else:
+                self.stats.add(profiler)
+            self.runs += 1
+
+    def report(self, limit=PROFILE_LINES):
+        with self.lock:
+            if self.stats is None:
+                return "No profile data\n"
+            return f"{self.runs} profiled runs\n" + _cprofile_report(self.stats, limit)
+
+    def dump(self, path):
+        with self.lock:
+            if self.stats is not None:
+                self.stats.dump_stats(path)
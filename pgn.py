@@ -0,0 +1,247 @@
+"""Streaming PGN reader and writer.
+
+``PgnReader`` walks a text stream line by line and yields one parsed game
+at a time, so multi-gigabyte databases import in constant memory. Moves
+are validated by replaying them on an engine ``Position``; games that do
+not replay are skipped and counted. ``write_games`` formats games from the
+game store with full SAN (disambiguation, ``+``/``#``) and tag pairs.
+"""
+
+import calendar
+import re
+import time
+
+from engine import Position, START_FEN, move_to_uci, move_to_san, parse_san
+
+# The Seven Tag Roster, always written first and in this order
+ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+LINE_WIDTH = 80
+
+TAG_RE = re.compile(r'\[\s*([A-Za-z0-9_]+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+TOKEN_RE = re.compile(r'\{[^}]*\}?|;[^\n]*|\$\d+|[()]|[^\s(){};]+')
+MOVE_NUMBER_RE = re.compile(r'^\d+\.+')
+
+
+class PgnError(ValueError):
+    pass
+
+
+class PgnGame:
+    """One game: tag pairs, start FEN (None for the standard start) and UCI moves."""
+
+    __slots__ = ("tags", "fen", "moves", "result")
+
+    def __init__(self, tags, fen, moves, result):
+        self.tags = tags
+        self.fen = fen
+        self.moves = moves
+        self.result = result
+
+
+# --- Reading ---
+
+def _in_comment(line, comment):
+    # Whether a {brace comment} is still open after `line`; they do not nest
+    for ch in line:
+        if comment:
+            comment = ch != '}'
+        elif ch == '{':
+            comment = True
+        elif ch == ';':
+            break  # the rest of the line is a comment
+    return comment
+
+
+def _raw_games(lines):
+    """(tags, movetext) per game; a tag line after movetext starts a new game.
+
+    Movetext lines stay newline-separated, so a ';' comment ends with its line.
+    """
+    tags, text, comment = {}, [], False
+    for line in lines:
+        line = line.strip()
+        if not line or (line[0] == '%' and not comment):
+            continue
+        if line[0] == '[' and not comment:
+            if text:
+                yield tags, '\n'.join(text)
+                tags, text = {}, []
+            m = TAG_RE.match(line)
+            if m:
+                tags[m.group(1)] = re.sub(r'\\(.)', r'\1', m.group(2))
+        else:
+            text.append(line)
+            comment = _in_comment(line, comment)
+    if tags or text:
+        yield tags, '\n'.join(text)
+
+
+def parse_game(tags, movetext):
+    """Replay `movetext` (SAN) from the game's start position; raises PgnError."""
+    fen = tags.get("FEN") if tags.get("SetUp", "1") == "1" else None
+    try:
+        pos = Position(fen or START_FEN)
+    except (ValueError, KeyError, IndexError):
+        raise PgnError(f"Invalid FEN tag: {fen!r}")
+    moves, depth = [], 0
+    result = tags.get("Result", "*")
+    for token in TOKEN_RE.findall(movetext):
+        first = token[0]
+        if first in '{;$':
+            continue
+        if token == '(':
+            depth += 1  # variations are skipped
+            continue
+        if token == ')':
+            depth -= 1
+            continue
+        if depth:
+            continue
+        if token in RESULTS:
+            result = token
+            continue
+        token = MOVE_NUMBER_RE.sub('', token)
+        if not token or token in ('e.p.', '--'):
+            continue
+        try:
+            move = parse_san(pos, token)
+        except ValueError as e:
+            raise PgnError(f"Move {len(moves) // 2 + 1}: {e}")
+        moves.append(move_to_uci(move))
+        pos.make(move)
+    return PgnGame(tags, fen, moves, result if result in RESULTS else "*")
+
+
+class PgnReader:
+    """Iterate the games of a PGN stream; keeps counters for throughput reports."""
+
+    def __init__(self, lines, strict=False):
+        self.lines = lines
+        self.strict = strict
+        self.games = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    def __iter__(self):
+        for tags, text in _raw_games(self.lines):
+            try:
+                game = parse_game(tags, text)
+            except PgnError:
+                self.errors += 1
+                if self.strict:
+                    raise
+                continue
+            self.games += 1
+            yield game
+
+    def rate(self):
+        """Games per second so far."""
+        elapsed = time.perf_counter() - self.started
+        return self.games / elapsed if elapsed > 0 else 0.0
+
+
+# --- Writing ---
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def movetext(moves, fen=None, result="*"):
+    """SAN movetext for UCI `moves`, wrapped at LINE_WIDTH columns."""
+    pos = Position(fen or START_FEN)
+    tokens = []
+    for i, uci in enumerate(moves):
+        legal = pos.legal_moves()
+        move = next((m for m in legal if move_to_uci(m) == uci), None)
+        if move is None:
+            raise PgnError(f"Illegal move {uci} in {pos.fen()}")
+        if pos.side == 0:
+            tokens.append(f"{pos.fullmove}.")
+        elif i == 0:
+            tokens.append(f"{pos.fullmove}...")
+        tokens.append(move_to_san(pos, move, legal))
+        pos.make(move)
+    tokens.append(result)
+    lines, line = [], ''
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > LINE_WIDTH:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return '\n'.join(lines)
+
+
+def format_game(tags, moves, fen=None):
+    """Complete PGN text (tag section, blank line, movetext) for one game."""
+    tags = dict(tags)
+    tags.setdefault("Result", "*")
+    if fen and fen != START_FEN:
+        tags["SetUp"], tags["FEN"] = "1", fen
+    out = [f'[{name} "{_escape(tags.get(name, "????.??.??" if name == "Date" else "?"))}"]' for name in ROSTER]
+    out += [f'[{name} "{_escape(value)}"]' for name, value in tags.items() if name not in ROSTER]
+    out.append('')
+    out.append(movetext(moves, fen, tags["Result"]))
+    return '\n'.join(out) + '\n\n'
+
+
+# --- Game store conversion ---
+
+def store_tags(game):
+    """PGN tags for a game-store record."""
+    finished = game.get("finished_at")
+    tags = {
+        "Event": "Python Chess Pro",
+        "Site": "?",
+        "Date": time.strftime("%Y.%m.%d", time.gmtime(finished)) if finished else "????.??.??",
+        "Round": "-",
+        "White": game.get("white") or "?",
+        "Black": game.get("black") or "?",
+        "Result": game.get("result") or "*",
+    }
+    if game.get("time_control"):
+        tags["TimeControl"] = str(game["time_control"])
+    if game.get("termination"):
+        tags["Termination"] = game["termination"]
+    if game.get("mode") == "bot":
+        tags["BotLevel"] = str(game.get("level"))
+        tags["BotStyle"] = game.get("style") or "standard"
+    return tags
+
+
+def write_games(out, games):
+    """Write game-store records as PGN; returns the number written."""
+    count = 0
+    for game in games:
+        out.write(format_game(store_tags(game), game["moves"], game.get("start_fen")))
+        count += 1
+    return count
+
+
+def _parse_date(value):
+    try:
+        return float(calendar.timegm(time.strptime(value, "%Y.%m.%d")))
+    except (TypeError, ValueError):
+        return None
+
+
+def to_store_game(game):
+    """Game-store record for a parsed PgnGame."""
+    tags = game.tags
+    control = tags.get("TimeControl", "").split("+")[0]
+    level = tags.get("BotLevel", "")
+    return {
+        "white": tags.get("White", "?"),
+        "black": tags.get("Black", "?"),
+        "result": game.result,
+        "termination": tags.get("Termination"),
+        "mode": "bot" if level.isdigit() else None,
+        "level": int(level) if level.isdigit() else None,
+        "style": tags.get("BotStyle"),
+        "time_control": int(control) if control.isdigit() else None,
+        "start_fen": game.fen,
+        "moves": game.moves,
+        "finished_at": _parse_date(tags.get("Date")),
+    }
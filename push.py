@@ -0,0 +1,181 @@
+"""Server-Sent Events push channel for server-side games.
+
+The threaded HTTP server answers ``GET /api/sessions/<id>/events`` with
+the SSE headers and then hands the socket over to the hub, whose asyncio
+event loop runs in its own thread. The loop holds every subscriber as a
+bare ``asyncio.Protocol`` (no reader/writer streams), so thousands of
+idle connections cost a few kilobytes each and no HTTP worker thread.
+Each event is encoded once and written to every participant and
+spectator of the game; subscribers that stop reading are dropped once
+their send buffer passes a limit.
+"""
+
+import asyncio
+import json
+import threading
+
+HEARTBEAT = 15          # seconds between keep-alive comments
+MAX_BUFFER = 256 * 1024  # bytes queued for one subscriber before it is dropped
+RETRY_MS = 3000          # reconnect delay suggested to browsers
+
+
+def encode_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+class _Subscriber(asyncio.Protocol):
+    """One SSE connection; owned by the hub's loop thread."""
+
+    __slots__ = ("hub", "game_id", "role", "transport")
+
+    def __init__(self, hub, game_id, role):
+        self.hub = hub
+        self.game_id = game_id
+        self.role = role
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        pass  # SSE is one-way; anything the client sends is ignored
+
+    def connection_lost(self, exc):
+        self.hub._unsubscribe(self)
+
+    def send(self, payload):
+        transport = self.transport
+        if transport is None or transport.is_closing():
+            return False
+        if transport.get_write_buffer_size() > MAX_BUFFER:
+            self.hub.dropped += 1
+            transport.abort()  # slow consumer
+            return False
+        transport.write(payload)
+        return True
+
+
+class PushHub:
+    """Per-game SSE fan-out on an asyncio loop running in a daemon thread.
+
+    ``publish`` and ``attach`` are safe to call from any thread.
+    """
+
+    def __init__(self, heartbeat=HEARTBEAT):
+        self.heartbeat = heartbeat
+        self.channels = {}  # game id -> set of _Subscriber
+        self.loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._started = threading.Event()
+        self.connections = 0
+        self.peak_connections = 0
+        self.events = 0
+        self.messages = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="push-hub", daemon=True)
+                self._thread.start()
+        self._started.wait()
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_later(self.heartbeat, self._beat)
+        self._started.set()
+        self.loop.run_forever()
+
+    def close(self):
+        if self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self._shutdown)
+        self._thread.join(timeout=5)
+
+    def _shutdown(self):
+        for subscribers in list(self.channels.values()):
+            for sub in list(subscribers):
+                if sub.transport is not None:
+                    sub.transport.close()
+        self.loop.stop()
+
+    # --- Subscribing ---
+
+    def attach(self, sock, game_id, role='spectator', snapshot=None):
+        """Take over an accepted socket whose SSE headers were already sent.
+
+        `snapshot` is called on the loop once the subscription is live and
+        its result is sent as the first 'state' event, so no later event
+        can be missed (one may arrive twice; events carry the ply).
+        """
+        self.start()
+        asyncio.run_coroutine_threadsafe(self._attach(sock, game_id, role, snapshot), self.loop)
+
+    async def _attach(self, sock, game_id, role, snapshot):
+        sub = _Subscriber(self, game_id, role)
+        try:
+            await self.loop.connect_accepted_socket(lambda: sub, sock)
+        except OSError:
+            sock.close()
+            return
+        self.channels.setdefault(game_id, set()).add(sub)
+        self.connections += 1
+        self.peak_connections = max(self.peak_connections, self.connections)
+        payload = f"retry: {RETRY_MS}\n\n".encode('ascii')
+        if snapshot is not None:
+            try:
+                payload += encode_event('state', snapshot())
+            except KeyError:
+                payload += encode_event('end', {'result': None, 'termination': 'evicted'})
+        self._send(sub, payload)
+
+    def _unsubscribe(self, sub):
+        subscribers = self.channels.get(sub.game_id)
+        if subscribers is not None and sub in subscribers:
+            subscribers.discard(sub)
+            self.connections -= 1
+            if not subscribers:
+                del self.channels[sub.game_id]
+
+    # --- Publishing ---
+
+    def publish(self, game_id, event, data):
+        """Queue `event` for everyone watching `game_id`."""
+        if self.loop is None or game_id not in self.channels:
+            return
+        self.loop.call_soon_threadsafe(self._fan_out, game_id, encode_event(event, data))
+
+    def _fan_out(self, game_id, payload):
+        self.events += 1
+        for sub in list(self.channels.get(game_id, ())):
+            self._send(sub, payload)
+
+    def _send(self, sub, payload):
+        if sub.send(payload):
+            self.messages += 1
+            self.bytes_sent += len(payload)
+
+    def _beat(self):
+        ping = b": ping\n\n"
+        for subscribers in list(self.channels.values()):
+            for sub in list(subscribers):
+                sub.send(ping)
+        self.loop.call_later(self.heartbeat, self._beat)
+
+    def stats(self):
+        players = sum(1 for subs in list(self.channels.values()) for s in list(subs) if s.role == 'player')
+        return {
+            'connections': self.connections,
+            'peak_connections': self.peak_connections,
+            'participants': players,
+            'spectators': self.connections - players,
+            'games_watched': len(self.channels),
+            'events': self.events,
+            'messages': self.messages,
+            'bytes_sent': self.bytes_sent,
+            'dropped_slow': self.dropped,
+        }
@@ -0,0 +1,165 @@
+"""Compact binary save files (``.chess``) and conversion of old JSON saves.
+
+Layout, shared with ``encodeSave``/``decodeSave`` in the page::
+
+    b"PCS1"                       magic
+    flags                         1 = bot game, 2 = start FEN follows
+    level, style                  one byte each (style indexes STYLES)
+    varint tW, varint tB          clocks in seconds
+    [varint n, n bytes]           start FEN (ASCII), only with flag 2
+    varint count                  number of moves
+    count * uint16 (LE)           from | to << 6 | promo << 12, as engine moves
+
+A game of 80 moves fits in about 170 bytes; the old JSON saves stored a
+full board snapshot per ply and grew quadratically.
+"""
+
+import json
+import struct
+
+from engine import Position, STYLES, START_FEN, move_to_uci
+
+MAGIC = b"PCS1"
+FLAG_BOT = 1
+FLAG_FEN = 2
+
+
+def _put_varint(out, n):
+    n = max(0, int(n))
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(data, i):
+    n = shift = 0
+    while True:
+        if i >= len(data) or shift > 63:
+            raise ValueError("Truncated save")
+        b = data[i]
+        i += 1
+        n |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return n, i
+        shift += 7
+
+
+def encode_save(game):
+    """Pack a game dict (mode, level, style, tW, tB, fen, moves) into bytes."""
+    pos = Position(game.get("fen") or START_FEN)
+    codes = []
+    for uci in game.get("moves", ()):
+        codes.append(pos.parse_uci(uci))
+        pos.make(codes[-1])
+    fen = game.get("fen") or ""
+    out = bytearray(MAGIC)
+    style = game.get("style") or "standard"
+    out += bytes((
+        (FLAG_BOT if game.get("mode") == "bot" else 0) | (FLAG_FEN if fen else 0),
+        int(game.get("level") or 1),
+        STYLES.index(style) if style in STYLES else 0,
+    ))
+    _put_varint(out, game.get("tW") or 0)
+    _put_varint(out, game.get("tB") or 0)
+    if fen:
+        _put_varint(out, len(fen))
+        out += fen.encode("ascii")
+    _put_varint(out, len(codes))
+    out += struct.pack(f"<{len(codes)}H", *codes)
+    return bytes(out)
+
+
+def decode_save(data):
+    """Inverse of encode_save; moves come back as UCI strings."""
+    if data[:4] != MAGIC:
+        raise ValueError("Not a binary chess save")
+    if len(data) < 7:
+        raise ValueError("Truncated save")
+    flags, level, style = data[4], data[5], data[6]
+    tw, i = _get_varint(data, 7)
+    tb, i = _get_varint(data, i)
+    fen = ""
+    if flags & FLAG_FEN:
+        n, i = _get_varint(data, i)
+        if i + n > len(data):
+            raise ValueError("Truncated save")
+        fen = data[i:i + n].decode("ascii")
+        i += n
+    count, i = _get_varint(data, i)
+    if i + 2 * count > len(data):
+        raise ValueError("Truncated save")
+    codes = struct.unpack_from(f"<{count}H", data, i)
+    return {
+        "mode": "bot" if flags & FLAG_BOT else "pvp",
+        "level": level,
+        "style": STYLES[style] if style < len(STYLES) else "standard",
+        "tW": tw,
+        "tB": tb,
+        "fen": fen,
+        "moves": [move_to_uci(code) for code in codes],
+    }
+
+
+# --- Old JSON saves ---
+
+def _board_fen(board, turn):
+    """FEN for a page board (rows from rank 8, pieces like 'wp')."""
+    ranks = []
+    for row in board:
+        text, empty = "", 0
+        for p in row:
+            if not p:
+                empty += 1
+                continue
+            if empty:
+                text += str(empty)
+                empty = 0
+            text += p[1].upper() if p[0] == "w" else p[1]
+        ranks.append(text + (str(empty) if empty else ""))
+    castle = ""
+    if board[7][4] == "wk":
+        castle += ("K" if board[7][7] == "wr" else "") + ("Q" if board[7][0] == "wr" else "")
+    if board[0][4] == "bk":
+        castle += ("k" if board[0][7] == "br" else "") + ("q" if board[0][0] == "br" else "")
+    return f"{'/'.join(ranks)} {turn} {castle or '-'} - 0 1"
+
+
+def _find_move(pos, placement):
+    for move in pos.legal_moves():
+        pos.make(move)
+        found = pos.fen().split()[0] == placement
+        pos.unmake()
+        if found:
+            return move
+    return None
+
+
+def convert_json_save(data):
+    """Turn an old JSON save (board snapshot per ply) into a game dict.
+
+    Uses the saved UCI list when complete, otherwise recovers each move by
+    matching consecutive board snapshots against the legal moves.
+    """
+    old = json.loads(data)
+    game = {k: old.get(k) for k in ("mode", "level", "style", "tW", "tB")}
+    history = old.get("history") or []
+    moves = old.get("uciMoves") or []
+    if history and len(moves) == len(history):
+        game["fen"], game["moves"] = "", moves
+        return game
+    snapshots = [(h["board"], h["turn"]) for h in history] + [(old["board"], old["turn"])]
+    start = _board_fen(*snapshots[0])
+    pos = Position(start)
+    moves = []
+    for board, turn in snapshots[1:]:
+        move = _find_move(pos, _board_fen(board, turn).split()[0])
+        if move is None:
+            # Unrecoverable gap: keep the final position without history
+            start, moves = _board_fen(old["board"], old["turn"]), []
+            break
+        pos.make(move)
+        moves.append(move_to_uci(move))
+    game["fen"] = "" if start.split()[:3] == START_FEN.split()[:3] else start
+    game["moves"] = moves
+    return game
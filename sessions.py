@@ -0,0 +1,560 @@
+"""Server-side game sessions: many concurrent games in one process.
+
+Each game is a small ``__slots__`` object keyed by a random id: a live
+engine ``Position`` plus the moves as a ``uint16`` array, so a lobby of
+thousands of games costs a few kilobytes each. Moves on one game are
+serialised by that game's lock; the manager's own lock only guards the
+id table. Games idle for longer than the timeout are written to the game
+store and dropped from memory; finished games are archived at once.
+Timed games carry a server-side ``GameClock``: think time is charged
+from when the server applied the previous move to when the next one
+arrived (bot searches included), and a watcher thread flags players who
+run out of time without moving.
+"""
+
+import array
+import contextlib
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from clock import GameClock, ClockWatcher, NS
+from engine import Position, START_FEN, move_to_uci
+
+IDLE_TIMEOUT = 30 * 60   # seconds without a move before a game is evicted
+FINISHED_LINGER = 60     # finished games stay readable this long
+REAP_INTERVAL = 30       # seconds between eviction sweeps
+BOT_THREADS = 4          # bot replies searched at once (they also wait for a free searcher)
+BOT_ATTEMPTS = 2         # searches tried before the bot plays a fallback move
+
+
+class SessionError(ValueError):
+    pass
+
+
+class GameSession:
+    """One game: players, settings, current position and move list."""
+
+    __slots__ = ("id", "mode", "white", "black", "level", "style", "bot_color", "time_control",
+                 "start_fen", "pos", "moves", "seen", "result", "termination",
+                 "clock", "version", "started_at", "last_active", "lock", "store_id")
+
+    def __init__(self, game_id, mode='pvp', white=None, black=None, level=1, style='standard',
+                 bot_color=1, time_control=None, fen=None, increment=0.0, delay=0.0):
+        self.id = game_id
+        self.mode = mode
+        self.white = white or ("Bot" if mode == 'bot' and bot_color == 0 else "White")
+        self.black = black or ("Bot" if mode == 'bot' and bot_color == 1 else "Black")
+        self.level = level
+        self.style = style
+        self.bot_color = bot_color if mode == 'bot' else None
+        self.time_control = time_control
+        self.start_fen = fen if fen and fen != START_FEN else None
+        self.pos = Position(fen or START_FEN)
+        self.moves = array.array('H')
+        self.seen = {self.pos.hash: 1}  # repetition counts since the last irreversible move
+        self.result = None
+        self.termination = None
+        self.clock = GameClock(time_control, increment, delay, self.pos.side) if time_control else None
+        self.started_at = time.time()
+        self.last_active = time.monotonic()
+        self.lock = threading.Lock()
+        self.store_id = None
+        self.version = 0  # bumped by every move and takeback
+
+    @property
+    def finished(self):
+        return self.result is not None
+
+    def bot_to_move(self):
+        return self.bot_color is not None and not self.finished and self.pos.side == self.bot_color
+
+    def out_of_time(self, now=None):
+        """End the game if the side to move has run out of time (lock held).
+
+        Losing on time is a draw when the opponent has no mating material.
+        """
+        clock = self.clock
+        if clock is None or self.finished or clock.check(now) is None:
+            return False
+        side = clock.flagged
+        self.result = ('0-1', '1-0')[side] if self.pos.has_mating_material(1 - side) else '1/2-1/2'
+        self.termination = 'time forfeit'
+        self.last_active = time.monotonic()
+        return True
+
+    def apply(self, move, now=None):
+        """Play a legal engine move and update the game status (lock held).
+
+        The clock is pressed at `now`; call out_of_time(now) first.
+        """
+        if self.clock is not None:
+            self.clock.press(now)
+        pos = self.pos
+        pos.make(move)
+        self.moves.append(move)
+        self.version += 1
+        if pos.halfmove == 0:
+            self.seen.clear()
+        self.seen[pos.hash] = self.seen.get(pos.hash, 0) + 1
+        self.last_active = time.monotonic()
+        if not pos.legal_moves():
+            if pos.in_check():
+                self.result, self.termination = ('0-1', '1-0')[pos.side], 'checkmate'
+            else:
+                self.result, self.termination = '1/2-1/2', 'stalemate'
+        elif self.seen[pos.hash] >= 3:
+            self.result, self.termination = '1/2-1/2', 'repetition'
+        elif pos.halfmove >= 100:
+            self.result, self.termination = '1/2-1/2', '50-move rule'
+        elif pos.is_insufficient_material():
+            self.result, self.termination = '1/2-1/2', 'insufficient material'
+        if self.finished and self.clock is not None:
+            self.clock.stop(now)
+
+    def takeback(self, plies):
+        """Undo the last `plies` moves and rebuild the repetition counts (lock held)."""
+        pos = self.pos
+        for _ in range(plies):
+            pos.unmake()
+            self.moves.pop()
+        self.version += 1
+        # Positions since the last irreversible move: step back through them and replay
+        back = min(pos.halfmove, len(self.moves))
+        seen = {pos.hash: 1}
+        for _ in range(back):
+            pos.unmake()
+            seen[pos.hash] = seen.get(pos.hash, 0) + 1
+        for move in self.moves[len(self.moves) - back:]:
+            pos.make(move)
+        self.seen = seen
+
+    def state(self):
+        """JSON-ready snapshot for clients (lock held)."""
+        return {
+            'id': self.id,
+            'mode': self.mode,
+            'white': self.white,
+            'black': self.black,
+            'level': self.level,
+            'style': self.style,
+            'bot_color': 'wb'[self.bot_color] if self.bot_color is not None else None,
+            'start_fen': self.start_fen,
+            'fen': self.pos.fen(),
+            'moves': [move_to_uci(m) for m in self.moves],
+            'turn': 'wb'[self.pos.side],
+            'check': self.pos.in_check(),
+            'result': self.result,
+            'termination': self.termination,
+            'clock': self.clock.snapshot() if self.clock is not None else None,
+        }
+
+    def event(self):
+        """Small push payload: the last move and the position after it (lock held)."""
+        return {
+            'ply': len(self.moves),
+            'move': move_to_uci(self.moves[-1]) if self.moves else None,
+            'fen': self.pos.fen(),
+            'turn': 'wb'[self.pos.side],
+            'check': self.pos.in_check(),
+            'result': self.result,
+            'termination': self.termination,
+            'clock': self.clock.snapshot() if self.clock is not None else None,
+        }
+
+    def record(self):
+        """Game-store record (unfinished games are stored as '*')."""
+        return {
+            'white': self.white,
+            'black': self.black,
+            'result': self.result or '*',
+            'termination': self.termination or 'abandoned',
+            'mode': self.mode,
+            'level': self.level if self.mode == 'bot' else None,
+            'style': self.style if self.mode == 'bot' else None,
+            'time_control': int(self.time_control) if self.time_control else None,
+            'start_fen': self.start_fen,
+            'moves': [move_to_uci(m) for m in self.moves],
+            'started_at': self.started_at,
+        }
+
+    def size(self):
+        """Approximate bytes held by this session."""
+        pos = self.pos
+        total = sys.getsizeof(self) + sys.getsizeof(self.moves) + sys.getsizeof(self.seen)
+        total += sys.getsizeof(pos) + sys.getsizeof(pos.squares) + sys.getsizeof(pos.bb)
+        total += sys.getsizeof(pos._stack) + len(pos._stack) * 120  # undo tuples
+        if self.clock is not None:
+            total += sys.getsizeof(self.clock) + sys.getsizeof(self.clock.think) + sys.getsizeof(self.clock.after)
+        return total
+
+
+class SessionManager:
+    """The id -> GameSession table with eviction, bot replies and metrics.
+
+    `bot` is an optional callable (position, level, style, clock, key) ->
+    reply dict (with at least 'move', in UCI) used for the bot side of
+    'bot' games. `clock` is None in untimed games, otherwise a function
+    returning the bot's (time_left, increment) in seconds, to be called
+    once the search can start; `key` identifies the game. A search that
+    fails or returns no legal move is retried, then the bot plays its first
+    legal move instead (the 'bot' event has `fallback` set). Bot replies run
+    on `bot_threads` threads of their own (0: on the calling thread), so
+    a move request returns as soon as the player's move is applied.
+    `store` receives evicted games; `listener(game_id, event, data)` is
+    called after every change ('move', 'bot', 'undo', 'end').
+    """
+
+    def __init__(self, store=None, bot=None, idle_timeout=IDLE_TIMEOUT, listener=None,
+                 bot_threads=BOT_THREADS):
+        self.store = store
+        self.bot = bot
+        self.bot_threads = bot_threads
+        self._executor = None
+        self.listener = listener
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.archived = {}  # evicted session id -> game-store id
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        # Counters are bumped under per-game locks, so they are approximate under contention
+        self.created = 0
+        self.evicted = 0
+        self.moves_played = 0
+        self.bot_moves = 0
+        self.bot_failures = 0  # replies that fell back to a legal move
+        self.move_time = 0.0  # seconds spent validating and applying moves
+        self.bot_time = 0.0
+        self.flagged = 0
+        self._reaper = None
+        self._stop = threading.Event()
+        self.watcher = ClockWatcher(self._check_clock)
+
+    # --- Games ---
+
+    def create(self, mode='pvp', white=None, black=None, level=1, style='standard',
+               bot_color='b', time_control=None, fen=None, increment=0.0, delay=0.0):
+        """Start a game; in a bot game where the bot has White it starts searching at once.
+
+        `time_control` is each side's base time in seconds (None: untimed),
+        with an `increment` added after every move or a `delay` of free
+        time at the start of every turn.
+        """
+        if mode not in ('pvp', 'bot'):
+            raise ValueError(f"Unknown mode: {mode!r}")
+        if bot_color not in ('w', 'b'):
+            raise ValueError(f"Invalid bot colour: {bot_color!r}")
+        if time_control is not None:
+            time_control, increment, delay = float(time_control), float(increment or 0), float(delay or 0)
+            if time_control <= 0 or increment < 0 or delay < 0:
+                raise ValueError("Time control, increment and delay must be positive")
+        try:
+            session = GameSession(secrets.token_hex(8), mode, white, black, int(level), style,
+                                  'wb'.index(bot_color), time_control, fen, increment, delay)
+        except (KeyError, IndexError) as e:
+            raise ValueError(f"Invalid FEN: {fen!r} ({e})")
+        with self.lock:
+            self.sessions[session.id] = session
+            self.created += 1
+        self._schedule(session)
+        if session.bot_to_move():
+            self._request_bot(session)
+        return session
+
+    def get(self, game_id):
+        session = self.sessions.get(game_id)
+        if session is None:
+            raise KeyError(game_id)
+        return session
+
+    @contextlib.contextmanager
+    def _locked(self, game_id):
+        # The game's lock, making sure it was not evicted while we waited for it
+        session = self.get(game_id)
+        with session.lock:
+            if self.sessions.get(game_id) is not session:
+                raise KeyError(game_id)
+            yield session
+
+    def state(self, game_id):
+        with self._locked(game_id) as session:
+            return session.state()
+
+    def play(self, game_id, uci):
+        """Play `uci` for the side to move and return the state; a bot reply follows in the background."""
+        now = time.monotonic_ns()  # the move's arrival: waiting for the game lock is not think time
+        with self._locked(game_id) as session:
+            if session.finished:
+                raise SessionError(f"Game is over ({session.result})")
+            if session.bot_to_move():
+                raise SessionError("Waiting for the bot")
+            start = time.perf_counter()
+            move = session.pos.parse_uci(uci)  # raises IllegalMoveError
+            flagged = session.out_of_time(now)
+            if not flagged:
+                session.apply(move, now)
+                self.move_time += time.perf_counter() - start
+                self.moves_played += 1
+                update = session.event()
+        if flagged:
+            self._flag(session)
+            raise SessionError(f"Out of time ({session.result})")
+        self._schedule(session)
+        self._emit(game_id, 'move', update)
+        if session.finished:
+            self._finish(session)
+        elif session.bot_to_move():
+            self._request_bot(session)
+        with session.lock:
+            return session.state()
+
+    def _request_bot(self, session):
+        if self.bot is None:
+            return
+        if not self.bot_threads:
+            self._bot_reply(session)
+            return
+        with self.lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.bot_threads, thread_name_prefix="session-bot")
+            executor = self._executor
+        executor.submit(self._bot_reply_safe, session)
+
+    def _bot_reply_safe(self, session):
+        try:
+            self._bot_reply(session)
+        except Exception as e:  # a failed reply must not take the bot thread down
+            print(f"Bot reply failed in game {session.id}: {e!r}", file=sys.stderr)
+
+    def _bot_clock(self, session):
+        # The bot's (time left, increment) in seconds, read when its search starts
+        with session.lock:
+            clock = session.clock
+            # A delay is spendable like an increment, it just cannot be banked
+            return clock.left(session.bot_color) / NS, (clock.increment + clock.delay) / NS
+
+    def _bot_reply(self, session):
+        # Search a copy outside the lock; the game stays readable meanwhile
+        with session.lock:
+            if not session.bot_to_move():
+                return
+            pos, version = session.pos.copy(), session.version
+            clock = (lambda: self._bot_clock(session)) if session.clock is not None else None
+        start = time.perf_counter()
+        move = None
+        for attempt in range(1, BOT_ATTEMPTS + 1):
+            try:
+                # Each attempt searches its own copy: a failed search may leave moves made on it
+                reply = self.bot(pos.copy(), session.level, session.style, clock, session.id) or {}
+                move = pos.parse_uci(reply.get('move') or '')
+                break
+            except Exception as e:
+                print(f"Bot reply failed in game {session.id} (attempt {attempt}): {e!r}", file=sys.stderr)
+        with self.lock:
+            self.bot_time += time.perf_counter() - start
+            if move is None:
+                self.bot_failures += 1
+        if move is None:
+            move = pos.legal_moves()[0]  # the bot is to move, so the game is not over
+            reply = {'move': move_to_uci(move), 'fallback': True}
+        now = time.monotonic_ns()
+        with session.lock:
+            if (session.version != version or not session.bot_to_move()
+                    or self.sessions.get(session.id) is not session):
+                return  # the game moved on (undo, resignation, eviction, flag) while searching
+            flagged = session.out_of_time(now)
+            if not flagged:
+                session.apply(move, now)
+                self.moves_played += 1
+                self.bot_moves += 1
+                update = session.event()
+        if flagged:
+            self._flag(session)
+            return
+        self._schedule(session)
+        info = {k: reply.get(k) for k in ('move', 'score', 'depth', 'nodes', 'time_ms', 'book', 'fallback')}
+        info['ply'] = update['ply']
+        self._emit(session.id, 'bot', info)
+        self._emit(session.id, 'move', update)
+        if session.finished:
+            self._finish(session)
+
+    def _emit(self, game_id, event, data):
+        if self.listener is not None:
+            self.listener(game_id, event, data)
+
+    def _finish(self, session):
+        with session.lock:
+            end = {'result': session.result, 'termination': session.termination,
+                   'clock': session.clock.snapshot() if session.clock is not None else None}
+        self._emit(session.id, 'end', end)
+        self._archive(session)
+
+    # --- Clocks ---
+
+    def _schedule(self, session):
+        # Wake the watcher when the side to move would flag
+        clock = session.clock
+        if clock is not None and clock.running:
+            self.watcher.schedule(clock.deadline(), session.id)
+
+    def _check_clock(self, game_id):
+        # Watcher callback; most wake-ups are stale (the player moved in time)
+        session = self.sessions.get(game_id)
+        if session is None:
+            return
+        with session.lock:
+            flagged = session.out_of_time()
+        if flagged:
+            self._flag(session)
+
+    def _flag(self, session):
+        self.flagged += 1
+        self._finish(session)
+
+    def timings(self, game_id):
+        """Per-move think times with the clock left after each move."""
+        with self._locked(game_id) as session:
+            clock = session.clock
+            if clock is None:
+                raise SessionError("Game is untimed")
+            moves = clock.timings()
+            for record, move in zip(moves, session.moves):
+                record['move'] = move_to_uci(move)
+            state = clock.snapshot()
+        sides = {}
+        for color in 'wb':
+            think = [m['think_ms'] for m in moves if m['side'] == color]
+            sides[color] = {
+                'moves': len(think),
+                'avg_think_ms': round(sum(think) / len(think), 3) if think else 0.0,
+                'max_think_ms': max(think) if think else 0.0,
+            }
+        return {'id': game_id, 'time_control': session.time_control, 'clock': state,
+                'moves': moves, 'white': sides['w'], 'black': sides['b']}
+
+    def resign(self, game_id, color):
+        if color not in ('w', 'b'):
+            raise ValueError(f"Invalid colour: {color!r}")
+        with self._locked(game_id) as session:
+            if session.finished:
+                raise SessionError(f"Game is over ({session.result})")
+            session.result = '0-1' if color == 'w' else '1-0'
+            session.termination = 'resignation'
+            session.last_active = time.monotonic()
+            if session.clock is not None:
+                session.clock.stop()
+            state = session.state()
+        self._finish(session)
+        return state
+
+    def undo(self, game_id, plies=1):
+        """Take back `plies` moves of an unfinished game (the bot replies if it is left to move)."""
+        plies = int(plies)
+        if plies < 1:
+            raise ValueError(f"Cannot take back {plies} moves")
+        with self._locked(game_id) as session:
+            if session.finished:
+                raise SessionError(f"Game is over ({session.result})")
+            plies = min(plies, len(session.moves))
+            session.takeback(plies)
+            if session.clock is not None:
+                session.clock.undo(plies)
+            session.last_active = time.monotonic()
+            update = session.event()
+        self._schedule(session)
+        self._emit(game_id, 'undo', update)
+        if session.bot_to_move():
+            self._request_bot(session)
+        with session.lock:
+            return session.state()
+
+    # --- Eviction ---
+
+    def _archive(self, session):
+        if self.store is None:
+            return
+        with session.lock:
+            if session.store_id is not None:
+                return
+            record = session.record()
+        try:
+            store_id = self.store.add_game(record)
+        except Exception as e:  # keep the game in memory; a later sweep retries
+            print(f"Could not archive game {session.id}: {e}", file=sys.stderr)
+            return
+        with session.lock:
+            session.store_id = store_id
+
+    def evict_idle(self, now=None):
+        """Archive and drop idle games (finished ones after a short linger); returns the count."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            idle = [s for s in self.sessions.values()
+                    if now - s.last_active > (FINISHED_LINGER if s.finished else self.idle_timeout)]
+        evicted = 0
+        for session in idle:
+            # Unlist first so no new request can reach the game, then archive it
+            with self.lock:
+                if self.sessions.pop(session.id, None) is None:
+                    continue
+            self._archive(session)
+            with self.lock:
+                if self.store is not None and session.store_id is None:
+                    self.sessions[session.id] = session  # store failed: keep it for the next sweep
+                    continue
+                self.archived[session.id] = session.store_id
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def start_reaper(self, interval=REAP_INTERVAL):
+        """Evict idle games from a daemon thread every `interval` seconds."""
+        if self._reaper is not None:
+            return
+
+        def reap():
+            while not self._stop.wait(interval):
+                self.evict_idle()
+
+        self._reaper = threading.Thread(target=reap, name="session-reaper", daemon=True)
+        self._reaper.start()
+
+    def close(self):
+        """Stop the reaper, watcher and bot threads and archive every game still in memory."""
+        self._stop.set()
+        self.watcher.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        for session in list(self.sessions.values()):
+            self._archive(session)
+
+    # --- Metrics ---
+
+    def metrics(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+        memory = sum(s.size() for s in sessions)
+        uptime = time.monotonic() - self.started
+        moves = self.moves_played - self.bot_moves
+        return {
+            'sessions': len(sessions),
+            'active': sum(1 for s in sessions if not s.finished),
+            'bot_games': sum(1 for s in sessions if s.mode == 'bot'),
+            'timed_games': sum(1 for s in sessions if s.clock is not None),
+            'time_forfeits': self.flagged,
+            'clock_timers': self.watcher.pending(),
+            'created': self.created,
+            'evicted': self.evicted,
+            'moves_played': self.moves_played,
+            'bot_moves': self.bot_moves,
+            'bot_failures': self.bot_failures,
+            'moves_per_s': round(self.moves_played / uptime, 2) if uptime > 0 else 0.0,
+            'move_apply_us': round(self.move_time / moves * 1e6, 1) if moves else 0.0,
+            'bot_move_ms': round(self.bot_time / self.bot_moves * 1000, 1) if self.bot_moves else 0.0,
+            'memory_bytes': memory,
+            'bytes_per_session': memory // len(sessions) if sessions else 0,
+            'uptime_s': round(uptime, 1),
+        }
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from clock import GameClock, ClockWatcher, NS, MS
+
+
+def test_press_charges_think_time_and_adds_increment():
+    clock = GameClock(60, increment_s=2, now=0)
+    assert clock.press(now=5 * NS)
+    assert clock.remaining == [57 * NS, 60 * NS]
+    assert clock.side == 1 and clock.left(1, now=6 * NS) == 59 * NS
+
+
+def test_delay_is_free_time():
+    clock = GameClock(60, delay_s=3, now=0)
+    clock.press(now=2 * NS)
+    assert clock.remaining[0] == 60 * NS
+    clock.press(now=7 * NS)  # Black thinks 5 s, 3 of them free
+    assert clock.remaining[1] == 58 * NS
+
+
+def test_flag_at_the_deadline():
+    clock = GameClock(10, now=0)
+    deadline = clock.deadline()
+    assert clock.check(now=deadline - 1) is None
+    assert clock.check(now=deadline) == 0
+    assert clock.remaining[0] == 0 and not clock.running
+    assert not clock.press(now=deadline + 1)
+
+
+def test_late_move_flags_instead_of_moving():
+    clock = GameClock(1, now=0)
+    assert not clock.press(now=2 * NS)
+    assert clock.flagged == 0 and clock.side == 0
+
+
+def test_undo_restores_clocks():
+    clock = GameClock(60, increment_s=1, now=0)
+    for t in (4, 10, 11, 20):
+        clock.press(now=t * NS)
+    # White 60-4+1-1+1 = 57, Black 60-6+1-9+1 = 47
+    assert clock.remaining == [57 * NS, 47 * NS]
+    clock.undo(1, now=30 * NS)
+    assert clock.side == 1 and clock.remaining == [57 * NS, 55 * NS]
+    clock.undo(2, now=40 * NS)
+    assert clock.side == 1 and clock.remaining == [57 * NS, 60 * NS]
+    clock.undo(5, now=50 * NS)
+    assert clock.side == 0 and clock.remaining == [60 * NS, 60 * NS] and clock.turn_start == 50 * NS
+
+
+def test_undo_clears_flag():
+    clock = GameClock(1, now=0)
+    clock.press(now=NS // 2)
+    clock.check(now=3 * NS)
+    assert clock.flagged == 1
+    clock.undo(1, now=4 * NS)
+    assert clock.flagged is None and clock.running and clock.side == 0
+
+
+def test_snapshot_and_timings():
+    clock = GameClock(60, increment_s=1, now=0)
+    clock.press(now=1500 * MS)
+    snap = clock.snapshot(now=2 * NS)
+    assert snap == {'white_ms': 59500, 'black_ms': 59500, 'running': 'b', 'increment_ms': 1000,
+                    'delay_ms': 0, 'flagged': None}
+    assert clock.timings() == [{'ply': 1, 'side': 'w', 'think_ms': 1500.0, 'charged_ms': 1500.0,
+                                'left_ms': 59500}]
+
+
+def test_watcher_calls_back_after_deadline():
+    fired = []
+    done = threading.Event()
+    watcher = ClockWatcher(lambda key: (fired.append(key), done.set()))
+    try:
+        now = time.monotonic_ns()
+        watcher.schedule(now + 10 * NS, "late")
+        watcher.schedule(now + 20 * MS, "soon")
+        assert done.wait(2)
+        assert fired == ["soon"] and watcher.pending() == 1
+    finally:
+        watcher.stop()
@@ -0,0 +1,13 @@
+import json
+
+from eventlog import EventLog, parse_batch
+
+
+def test_client_cannot_overwrite_server_fields(tmp_path):
+    path = tmp_path / "events.ndjson"
+    log = EventLog(str(path))
+    events = parse_batch(b'{"type": "move", "ts": 1, "client": "forged"}\n', "application/x-ndjson")
+    assert log.submit(events, client="10.0.0.1") == 1
+    log.close()
+    record = json.loads(path.read_text())
+    assert record["type"] == "move" and record["client"] == "10.0.0.1" and record["ts"] > 1
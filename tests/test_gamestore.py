@@ -0,0 +1,94 @@
+import pytest
+
+from gamestore import GameStore
+
+OPENINGS = [["e2e4", "e7e5", "g1f3"], ["e2e4", "c7c5"], ["d2d4", "d7d5"], ["e2e3"]]
+
+
+def _games(n):
+    # Several games share each timestamp so the cursor has to break ties on id
+    return [{"white": f"p{i % 3}", "black": "Bot", "result": ("1-0", "0-1", "1/2-1/2")[i % 3],
+             "moves": OPENINGS[i % 4], "finished_at": 1000.0 + i // 3} for i in range(n)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = GameStore(str(tmp_path / "games.db"))
+    store.add_games(_games(100))
+    yield store
+    store.close()
+
+
+def _all_pages(store, limit, **filters):
+    ids, cursor = [], None
+    while True:
+        games, cursor = store.list_games(limit=limit, cursor=cursor, **filters)
+        ids += [g["id"] for g in games]
+        if cursor is None:
+            return ids
+
+
+def _newest_first(games):
+    return [g["id"] for g in sorted(games, key=lambda g: (g["finished_at"], g["id"]), reverse=True)]
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50, 500])
+def test_keyset_pages_cover_every_game_once(store, limit):
+    ids = _all_pages(store, limit)
+    assert ids == sorted(ids, reverse=True) and len(ids) == 100
+
+
+@pytest.mark.parametrize("filters", [
+    {"player": "p1"},
+    {"result": "0-1"},
+    {"opening": "e2e4"},
+    {"opening": "e2e4 e7e5"},
+    {"opening": "e2e4", "player": "p2"},
+    {"opening": "d2d4", "result": "1-0"},
+    {"since": 1010, "until": 1020},
+])
+def test_filtered_pages(store, filters):
+    expected = []
+    for game in store.iter_games():
+        opening = filters.get("opening", "").split()
+        if ("player" in filters and filters["player"] not in (game["white"], game["black"])
+                or "result" in filters and game["result"] != filters["result"]
+                or game["moves"][:len(opening)] != opening
+                or "since" in filters and not filters["since"] <= game["finished_at"] < filters["until"]):
+            continue
+        expected.append(game)
+    assert expected
+    assert _all_pages(store, 4, **filters) == _newest_first(expected)
+
+
+def test_opening_matches_whole_moves(store):
+    assert all(g["opening"].startswith("e2e4") for g in store.iter_games(opening="e2e4"))
+    assert not store.list_games(opening="e2e")[0]
+    with pytest.raises(ValueError):
+        store.list_games(opening="e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4")
+
+
+def test_opening_filter_uses_the_index(store):
+    plan = store._conn().execute(
+        "EXPLAIN QUERY PLAN SELECT g.id FROM game_openings o JOIN games g ON g.id = o.game_id "
+        "WHERE o.opening = ? ORDER BY o.finished_at DESC, o.game_id DESC LIMIT 10", ("e2e4",)).fetchall()
+    assert not any("TEMP B-TREE" in row[3] for row in plan)
+
+
+def test_games_from_before_the_opening_index_are_indexed(tmp_path):
+    path = str(tmp_path / "old.db")
+    store = GameStore(path)
+    store.add_games(_games(12))
+    with store._conn() as conn:
+        conn.execute("DELETE FROM game_openings")
+    store.close()
+    assert len(list(GameStore(path).iter_games(opening="e2e4"))) == 6
+
+
+def test_get_game(store):
+    game_id = store.add_game({"white": "A", "black": "B", "result": "*", "moves": ["g1f3"]})
+    game = store.get_game(game_id)
+    assert game["moves"] == ["g1f3"] and game["opening"] == "g1f3" and game["ply_count"] == 1
+    assert store.get_game(10 ** 6) is None
+    with pytest.raises(ValueError):
+        store.add_game({"result": "2-0"})
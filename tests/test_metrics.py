@@ -0,0 +1,74 @@
+import pytest
+
+from engine import Position, Searcher
+from metrics import Histogram, ProfileCollector, SearchMetrics, profile_call, render, stats_families
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = Histogram((1, 5))
+    for value in (0.5, 3, 3, 10):
+        hist.observe(value)
+    samples = list(hist.samples({'kind': 'x'}))
+    assert samples == [
+        ('_bucket', {'kind': 'x', 'le': '1'}, 1),
+        ('_bucket', {'kind': 'x', 'le': '5'}, 3),
+        ('_bucket', {'kind': 'x', 'le': '+Inf'}, 4),
+        ('_sum', {'kind': 'x'}, 16.5),
+        ('_count', {'kind': 'x'}, 4),
+    ]
+
+
+def test_render_text_format():
+    text = render([
+        ('chess_games_total', 'counter', "Games", [('', {'mode': 'bot'}, 3), ('', {'mode': 'a"b\\c'}, 1)]),
+        ('chess_rate', 'gauge', "Rate", [('', {}, 0.5), ('', {'up': 'x'}, True)]),
+    ])
+    assert text == (
+        '# HELP chess_games_total Games\n'
+        '# TYPE chess_games_total counter\n'
+        'chess_games_total{mode="bot"} 3\n'
+        'chess_games_total{mode="a\\"b\\\\c"} 1\n'
+        '# HELP chess_rate Rate\n'
+        '# TYPE chess_rate gauge\n'
+        'chess_rate 0.5\n'
+        'chess_rate{up="x"} 1\n'
+    )
+
+
+def test_stats_families_skip_non_numbers():
+    families = stats_families('chess_x', {'moves': 4, 'rate': 1.5, 'name': 'a', 'ok': True}, counters=('moves',))
+    assert [(name, kind) for name, kind, _, _ in families] == [('chess_x_moves_total', 'counter'),
+                                                               ('chess_x_rate', 'gauge')]
+
+
+def test_search_metrics_from_a_real_search():
+    searcher = Searcher(hash_mb=1)
+    result = searcher.think(Position(), max_depth=3)
+    stats = searcher.stats()
+    assert stats['nodes'] == result.nodes and stats['tt_probes'] == stats['nodes'] - stats['qnodes']
+    assert [i['depth'] for i in stats['iterations']] == [1, 2, 3]
+    metrics = SearchMetrics()
+    metrics.record('search', 0.2, result.depth, stats)
+    metrics.record('book', 0.001)
+    text = render(metrics.families())
+    assert f"chess_search_nodes_total {stats['nodes']}" in text
+    assert 'chess_searches_total{source="book"} 1' in text
+    assert 'chess_search_depth_bucket{le="3"} 1' in text
+    assert 'chess_last_search_depth 3' in text
+
+
+def test_profile_call_modes():
+    result, report = profile_call(lambda: sum(range(1000)))
+    assert result == 499500 and 'function calls' in report
+    result, report = profile_call(lambda: 7, 'sample')
+    assert result == 7 and 'samples in' in report
+    with pytest.raises(ValueError):
+        profile_call(lambda: None, 'perf')
+
+
+def test_profile_collector_merges_runs():
+    collector = ProfileCollector()
+    assert collector.report() == "No profile data\n"
+    for _ in range(2):
+        collector.call(lambda: sorted(range(100), reverse=True))
+    assert collector.report().startswith("2 profiled runs\n")
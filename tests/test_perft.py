@@ -0,0 +1,18 @@
+import pytest
+
+from engine import Position
+from engine.perft import PERFT_SUITE, divide, perft
+
+PERFT_MAX_NODES = 500000  # deepest expected count per position that stays quick
+
+
+@pytest.mark.parametrize("name, fen, expected", PERFT_SUITE, ids=[case[0] for case in PERFT_SUITE])
+def test_perft(name, fen, expected):
+    depth = max(d for d, nodes in expected.items() if nodes <= PERFT_MAX_NODES)
+    assert perft(Position(fen), depth) == expected[depth]
+
+
+def test_divide_adds_up():
+    name, fen, expected = PERFT_SUITE[1]
+    counts = divide(Position(fen), 2)
+    assert len(counts) == expected[1] and sum(counts.values()) == expected[2]
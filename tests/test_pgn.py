@@ -0,0 +1,61 @@
+import io
+
+import pytest
+
+from pgn import PgnError, PgnReader, format_game, movetext, to_store_game, store_tags, write_games
+
+MOVES = ["e2e4", "e7e5", "g1f3", "b8c6", "f1b5", "a7a6", "b5c6", "d7c6", "e1g1", "f7f6"]
+
+
+def test_movetext_is_san():
+    assert movetext(MOVES[:9], result="1-0") == "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Bxc6 dxc6 5. O-O 1-0"
+
+
+def test_round_trip():
+    tags = {"Event": "Test", "White": "Alice", "Black": "Bob", "Result": "1/2-1/2"}
+    games = list(PgnReader(io.StringIO(format_game(tags, MOVES))))
+    assert len(games) == 1
+    game = games[0]
+    assert game.moves == MOVES and game.result == "1/2-1/2" and game.fen is None
+    assert game.tags["White"] == "Alice"
+
+
+def test_round_trip_from_fen_with_promotion():
+    fen = "8/P7/8/8/8/8/k7/4K3 w - - 0 1"
+    text = format_game({"Result": "*"}, ["a7a8q", "a2b3", "a8b8"], fen)
+    game = next(iter(PgnReader(io.StringIO(text))))
+    assert game.fen == fen and game.moves == ["a7a8q", "a2b3", "a8b8"]
+
+
+def test_comments_and_variations_are_skipped():
+    text = '[Result "*"]\n\n1. e4 {best by test} (1. d4 d5) e5 $1 2. Nf3 *\n'
+    assert next(iter(PgnReader(io.StringIO(text)))).moves == ["e2e4", "e7e5", "g1f3"]
+
+
+def test_rest_of_line_comment_ends_at_the_line():
+    text = ('[Result "1-0"]\n\n1. e4 e5 ; king pawn {not a brace comment\n2. Nf3 Nc6 3. Bb5 a6 1-0\n\n'
+            '[Result "*"]\n\n1. d4 {multi\nline} d5 *\n')
+    first, second = PgnReader(io.StringIO(text))
+    assert first.moves == ["e2e4", "e7e5", "g1f3", "b8c6", "f1b5", "a7a6"] and first.result == "1-0"
+    assert second.moves == ["d2d4", "d7d5"]
+
+
+def test_bad_game_is_counted_and_skipped():
+    text = '[Result "*"]\n\n1. e5 *\n\n[Result "*"]\n\n1. e4 *\n'
+    reader = PgnReader(io.StringIO(text))
+    assert [g.moves for g in reader] == [["e2e4"]]
+    assert (reader.games, reader.errors) == (1, 1)
+    with pytest.raises(PgnError):
+        list(PgnReader(io.StringIO(text), strict=True))
+
+
+def test_store_record_round_trip():
+    record = {"white": "W", "black": "Bot", "result": "0-1", "termination": "checkmate", "mode": "bot",
+              "level": 3, "style": "aggressive", "time_control": 600, "start_fen": None,
+              "moves": ["f2f3", "e7e5", "g2g4", "d8h4"], "finished_at": 1700000000.0}
+    out = io.StringIO()
+    assert write_games(out, [record]) == 1
+    back = to_store_game(next(iter(PgnReader(io.StringIO(out.getvalue())))))
+    for key in ("white", "black", "result", "termination", "mode", "level", "style", "time_control", "moves"):
+        assert back[key] == record[key]
+    assert store_tags(record)["Date"] == "2023.11.14"
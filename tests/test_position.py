@@ -0,0 +1,76 @@
+import pytest
+
+from engine import Position, move_to_uci
+from engine.perft import PERFT_SUITE
+
+
+def test_make_unmake_restores_position():
+    pos = Position(PERFT_SUITE[1][1])
+    fen, key = pos.fen(), pos.hash
+    for move in pos.legal_moves():
+        pos.make(move)
+        pos.unmake()
+        assert pos.fen() == fen and pos.hash == key
+
+
+def test_fen_round_trip():
+    for _, fen, _ in PERFT_SUITE:
+        assert Position(fen).fen() == fen
+
+
+def test_special_moves():
+    pos = Position("r3k2r/8/8/3pP3/8/8/8/R3K2R w KQkq d6 0 2")
+    moves = {move_to_uci(m) for m in pos.legal_moves()}
+    assert {"e1g1", "e1c1", "e5d6"} <= moves
+    pos.push_uci("e5d6")
+    assert pos.fen().split()[0] == "r3k2r/8/3P4/8/8/8/8/R3K2R"
+
+
+def test_ep_square_is_hashed_only_when_capturable():
+    a, b = Position(), Position()
+    for uci in ("e2e4", "e7e6", "d2d4"):
+        a.push_uci(uci)
+    for uci in ("d2d4", "e7e6", "e2e4"):
+        b.push_uci(uci)
+    assert a.ep is not None and a.hash == b.hash
+    # A pawn on d4 can take e3 e.p., so there the double push does change the hash
+    c = Position("4k3/8/8/8/3p4/8/4P3/4K3 w - - 0 1")
+    c.push_uci("e2e4")
+    assert c.hash != Position("4k3/8/8/8/3pP3/8/8/4K3 b - - 0 1").hash
+    # ...unless the capture would expose the king
+    d = Position("8/8/8/8/k2p3R/8/4P3/4K3 w - - 0 1")
+    d.push_uci("e2e4")
+    assert d.hash == Position("8/8/8/8/k2pP2R/8/8/4K3 b - - 0 1").hash
+
+
+def test_incremental_hash_matches_a_fresh_one():
+    for _, fen, _ in PERFT_SUITE:
+        pos = Position(fen)
+        for move in pos.legal_moves():
+            pos.make(move)
+            assert pos.hash == Position(pos.fen()).hash
+            pos.unmake()
+
+
+@pytest.mark.parametrize("fen", [
+    None,
+    "8/8/8/8/8/8/8/8 w - - 0 1",                                   # no kings
+    "4k3/8/8/8/8/8/8/3KK3 w - - 0 1",                              # two white kings
+    "4k3/8/8/8/8/8/8/4K3 x - - 0 1",                               # side
+    "4k3/8/8/8/8/8/8/4K2 w - - 0 1",                               # short rank
+    "4k3/8/8/8/8/8/8/4K4 w - - 0 1",                               # long rank
+    "4k3/8/8/8/8/8/8/4K2P w - - 0 1",                              # pawn on the first rank
+    "4k3/8/8/8/8/8/8/4K3 w X - 0 1",                               # castling letter
+    "4k3/8/8/8/8/8/8/4K3 w K - 0 1",                               # castling without the rook
+    "4k3/8/8/8/8/8/8/4K2R w KK - 0 1",                             # repeated right
+    "4k3/8/8/8/8/8/8/4K3 w - z9 0 1",                              # ep square name
+    "4k3/8/8/8/8/8/8/4K3 w - e6 0 1",                              # ep without the pushed pawn
+    "4k3/8/8/4p3/8/8/8/4K3 w - e3 0 1",                            # ep on the wrong rank
+    "4k3/8/8/8/8/8/8/4K3 w - - x 1",                               # halfmove
+    "4k3/8/8/8/8/8/8/4K3 w - - 0 0",                               # fullmove
+    "4k3/8/8/8/8/8/8/4K3 w - - 0 1 extra",                         # trailing field
+    "4k3/4R3/8/8/8/8/8/4K3 w - - 0 1",                             # black, not to move, is in check
+])
+def test_set_fen_rejects_malformed_or_illegal(fen):
+    with pytest.raises(ValueError):
+        Position(fen)
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from engine import Position
+from savefile import decode_save, encode_save, convert_json_save
+
+GAME = {
+    "mode": "bot", "level": 3, "style": "gambit", "tW": 600, "tB": 543,
+    "fen": "", "moves": ["e2e4", "e7e5", "g1f3", "b8c6", "f1b5", "a7a6"],
+}
+
+
+def test_round_trip():
+    assert decode_save(encode_save(GAME)) == GAME
+
+
+def test_round_trip_from_fen():
+    game = dict(GAME, mode="pvp", fen="4k3/P7/8/8/8/8/8/4K3 w - - 0 1", moves=["a7a8n", "e8d7"])
+    assert decode_save(encode_save(game)) == game
+
+
+def test_two_bytes_per_move():
+    short = encode_save(dict(GAME, moves=[]))
+    assert len(encode_save(GAME)) == len(short) + 2 * len(GAME["moves"])
+
+
+def test_illegal_move_is_rejected():
+    with pytest.raises(ValueError):
+        encode_save(dict(GAME, moves=["e2e5"]))
+
+
+def test_every_truncation_raises_value_error():
+    data = encode_save(dict(GAME, fen="4k3/8/8/8/8/8/4P3/4K3 w - - 0 1", moves=["e2e4"]))
+    for n in range(len(data)):
+        with pytest.raises(ValueError):
+            decode_save(data[:n])
+
+
+def test_runaway_varint():
+    with pytest.raises(ValueError):
+        decode_save(b"PCS1\x00\x01\x00" + b"\xff" * 20)
+
+
+def _board(pos):
+    # The page's board: rows from rank 8 down, pieces as colour + type letter
+    rows = []
+    for r in range(8):
+        row = []
+        for c in range(8):
+            piece = pos.squares[(7 - r) * 8 + c]
+            row.append("" if piece is None else "wb"[piece // 6] + "pnbrqk"[piece % 6])
+        rows.append(row)
+    return rows
+
+
+def test_convert_json_save_recovers_moves_from_snapshots():
+    pos, history = Position(), []
+    for uci in ("e2e4", "c7c5", "e1e2"):
+        history.append({"board": _board(pos), "turn": "wb"[pos.side]})
+        pos.push_uci(uci)
+    old = {"mode": "pvp", "level": 1, "style": "standard", "tW": 300, "tB": 300,
+           "history": history, "board": _board(pos), "turn": "wb"[pos.side]}
+    game = convert_json_save(json.dumps(old))
+    assert game["fen"] == "" and game["moves"] == ["e2e4", "c7c5", "e1e2"]
+    assert decode_save(encode_save(game))["moves"] == game["moves"]
@@ -0,0 +1,64 @@
+from engine import Position, Searcher, TranspositionTable, allocate_time, move_to_uci
+from engine.tt import EXACT, LOWER
+from engine.zobrist import STYLE_KEYS
+
+
+# --- Transposition table ---
+
+def test_tt_store_and_probe():
+    tt = TranspositionTable(1)
+    key = 0x1234_5678_9ABC_DEF0
+    assert tt.probe(key) is None
+    tt.store(key, 1350, -250, 7, LOWER)
+    assert tt.probe(key) == (1350, -250, 7, LOWER)
+    assert tt.probe(key ^ 1) is None
+
+
+def test_tt_keeps_deeper_entry_of_current_search():
+    tt = TranspositionTable(1)
+    key = 42
+    other = key + tt.buckets  # same bucket, different key
+    tt.store(key, 1, 10, 8, EXACT)
+    tt.store(other, 2, 20, 2, EXACT)
+    assert tt.probe(key) == (1, 10, 8, EXACT)
+    assert tt.probe(other) == (2, 20, 2, EXACT)
+
+
+def test_style_keys_separate_table_entries():
+    assert STYLE_KEYS['standard'] == STYLE_KEYS['defensive'] == STYLE_KEYS['gambit'] == 0
+    assert STYLE_KEYS['aggressive'] != 0
+    searcher = Searcher(hash_mb=1)
+    pos = Position()
+    searcher.think(pos, max_depth=3)
+    searcher.set_style('aggressive')
+    searcher.think(pos, max_depth=3)
+    searcher.set_style('standard')
+    # The standard entries survived the style change
+    assert searcher.tt.probe(pos.hash) is not None
+    searcher.think(pos, max_depth=3)
+    assert searcher.stats()['tt_hit_rate'] == 1.0
+
+
+
+def test_uncapturable_ep_square_does_not_split_entries():
+    # After 1.e4 the ep square is set; after the knights go out and back it is not
+    pos = Position()
+    pos.push_uci("e2e4")
+    searcher = Searcher(hash_mb=1)
+    searcher.think(pos, max_depth=2)
+    again = pos.copy()
+    for uci in ("g8f6", "g1f3", "f6g8", "f3g1"):
+        again.push_uci(uci)
+    assert again.ep is None and again.hash == pos.hash
+    assert searcher.tt.probe(again.hash) is not None
+
+
+def test_search_finds_mate_in_one():
+    result = Searcher(hash_mb=1).think(Position("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"), max_depth=3)
+    assert move_to_uci(result.move) == "a1a8"
+
+
+def test_allocate_time_stays_inside_the_clock():
+    soft, hard = allocate_time(60, 1)
+    assert 0 < soft <= hard < 30
+    assert allocate_time(0.01)[1] == 0.05  # floor for the last seconds
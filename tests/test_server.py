@@ -0,0 +1,117 @@
+import http.client
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import analysis
+import app
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = app.ChessHTTPServer(("127.0.0.1", 0), app.LogHandler, workers=2)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _request(url, payload=None, method=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data, method=method), timeout=10) as r:
+            return r.status, r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_page(server):
+    status, body = _request(server + "/")
+    assert status == 200 and b"<script>" in body
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", "identity"),
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0, *", "identity"),
+    ("GZIP; q=0.5, identity", "gzip"),
+    ("deflate, *;q=0", "identity"),
+])
+def test_page_encoding_choice(header, expected):
+    page = app.CompressedPage("<p>x</p>")
+    page.variants.pop("br", None)  # same answers with or without brotli installed
+    assert page.choose(header) == expected
+
+
+@pytest.mark.parametrize("path", ["/chess_games.db", "/logs/game_events.ndjson", "/app.py", "/../etc/passwd"])
+def test_files_are_not_served(server, path):
+    assert _request(server + path)[0] == 404
+    assert _request(server + path, method="HEAD")[0] == 404
+
+
+def test_legal_moves(server):
+    status, body = _request(server + "/api/legal_moves", {"moves": ["f2f3", "e7e5", "g2g4", "d8h4"]})
+    reply = json.loads(body)
+    assert status == 200 and reply["status"] == "checkmate" and reply["moves"] == []
+    assert _request(server + "/api/legal_moves", {"moves": ["e2e5"]})[0] == 400
+    for fen in ("4k3/8/8/8/8/8/8/4K3 w - e9 0 1", "4k3/4R3/8/8/8/8/8/4K3 w - - 0 1", 7):
+        assert _request(server + "/api/legal_moves", {"fen": fen})[0] == 400
+        assert _request(server + "/api/bestmove", {"fen": fen})[0] == 400
+
+
+def test_bestmove_with_profile_and_metrics(server):
+    status, body = _request(server + "/api/bestmove", {"level": 1, "movetime": 0.1, "profile": "sample"})
+    reply = json.loads(body)
+    assert status == 200 and reply["move"] and "samples in" in reply["profile"]
+    status, body = _request(server + "/metrics")
+    assert status == 200 and b"# TYPE chess_searches_total counter" in body
+
+
+@pytest.mark.parametrize("length, status", [("abc", 400), ("-5", 400), (str(app.MAX_BODY_BYTES + 1), 413)])
+def test_bad_or_oversized_body_is_refused(server, length, status):
+    conn = http.client.HTTPConnection(server.split("//")[1], timeout=10)
+    try:
+        conn.putrequest("POST", "/log_action")
+        conn.putheader("Content-Length", length)
+        conn.endheaders()
+        response = conn.getresponse()
+        assert response.status == status and response.getheader("Connection") == "close"
+    finally:
+        conn.close()
+
+
+def test_idle_keepalive_connections_do_not_block_new_ones(server):
+    # The fixture has two workers; park an idle keep-alive connection on each
+    idle = []
+    try:
+        for _ in range(2):
+            conn = http.client.HTTPConnection(server.split("//")[1], timeout=10)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            idle.append(conn)
+        start = time.monotonic()
+        assert _request(server + "/")[0] == 200
+        assert time.monotonic() - start < app.KEEPALIVE_TIMEOUT / 2
+    finally:
+        for conn in idle:
+            conn.close()
+
+
+def test_analyse_stops_expanding_jobs_past_the_limit(server, monkeypatch):
+    produced = []
+
+    def game_jobs(games):
+        for job in analysis.game_jobs(games):
+            produced.append(job)
+            yield job
+
+    monkeypatch.setattr(app, "MAX_ANALYSIS_JOBS", 3)
+    monkeypatch.setattr(app, "game_jobs", game_jobs)
+    moves = ["g1f3", "g8f6", "f3g1", "f6g8"] * 5
+    status, body = _request(server + "/api/analyse", {"games": [{"moves": moves}]})
+    assert status == 400 and b"At most 3" in body
+    assert len(produced) == 4
@@ -0,0 +1,169 @@
+import threading
+
+import pytest
+
+from engine import IllegalMoveError, move_to_uci
+from sessions import SessionError, SessionManager
+
+KNIGHT_DANCE = ["g1f3", "g8f6", "f3g1", "f6g8"]
+
+
+def _moves(manager, game_id):
+    return [move_to_uci(m) for m in manager.get(game_id).moves]
+
+
+@pytest.fixture
+def manager():
+    manager = SessionManager(bot_threads=0)
+    yield manager
+    manager.close()
+
+
+def test_play_and_checkmate(manager):
+    game = manager.create()
+    for uci in ("f2f3", "e7e5", "g2g4"):
+        manager.play(game.id, uci)
+    state = manager.play(game.id, "d8h4")
+    assert (state['result'], state['termination']) == ('0-1', 'checkmate')
+    with pytest.raises(SessionError):
+        manager.play(game.id, "a2a3")
+
+
+def test_illegal_move(manager):
+    game = manager.create()
+    with pytest.raises(IllegalMoveError):
+        manager.play(game.id, "e2e5")
+
+
+def test_repetition_counts_survive_undo(manager):
+    game = manager.create()
+    for uci in KNIGHT_DANCE + KNIGHT_DANCE[:3]:
+        manager.play(game.id, uci)
+    manager.undo(game.id)
+    manager.play(game.id, "f3g1")  # the start position comes back a second time
+    state = manager.play(game.id, "f6g8")  # ...and a third
+    assert (state['result'], state['termination']) == ('1/2-1/2', 'repetition')
+
+
+def test_undo_past_an_irreversible_move(manager):
+    game = manager.create()
+    for uci in ["e2e3", "g8f6", "g1f3", "f6g8", "f3g1", "g8f6", "g1f3"]:
+        manager.play(game.id, uci)
+    manager.undo(game.id, 2)
+    # Only positions after e3 count: that one twice, then three others
+    assert game.seen[game.pos.hash] == 2 and sum(game.seen.values()) == 5
+
+
+def test_undo_and_resign_validate_arguments(manager):
+    game = manager.create()
+    manager.play(game.id, "e2e4")
+    for plies in (0, -1):
+        with pytest.raises(ValueError):
+            manager.undo(game.id, plies)
+    with pytest.raises(ValueError):
+        manager.resign(game.id, "x")
+    assert _moves(manager, game.id) == ["e2e4"]
+    assert manager.resign(game.id, "b")['result'] == '1-0'
+
+
+def test_bot_replies_inline():
+    bot = lambda pos, level, style, clock, key: {'move': move_to_uci(sorted(pos.legal_moves())[0])}
+    manager = SessionManager(bot=bot, bot_threads=0)
+    try:
+        game = manager.create(mode='bot')
+        manager.play(game.id, "e2e4")
+        assert len(game.moves) == 2 and not game.bot_to_move()
+    finally:
+        manager.close()
+
+
+def test_failed_bot_search_is_retried_then_falls_back():
+    replies = [RuntimeError("search crashed"), {'move': 'e7e5'}, None, {'move': 'a1a1'}]
+    events = []
+
+    def bot(pos, level, style, clock, key):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    manager = SessionManager(bot=bot, listener=lambda game_id, event, data: events.append((event, data)),
+                             bot_threads=0)
+    try:
+        game = manager.create(mode='bot')
+        manager.play(game.id, "e2e4")  # first search fails, the retry answers
+        manager.play(game.id, "d2d4")  # both searches fail: the first legal move is played
+        bot_events = [data for event, data in events if event == 'bot']
+        assert [(e['move'], e['fallback']) for e in bot_events] == [('e7e5', None), ('e8e7', True)]
+        assert len(game.moves) == 4 and not game.bot_to_move()
+        assert manager.metrics()['bot_failures'] == 1
+    finally:
+        manager.close()
+
+
+def test_stale_bot_reply_is_discarded():
+    # The first search is held until the player has taken back e4 and played d4.
+    # With one bot thread its reply is handled before the second search starts,
+    # at the same ply count as the position it searched, but in a different game
+    release, calls, events = threading.Event(), [], []
+    done = threading.Event()
+
+    def bot(pos, level, style, clock, key):
+        calls.append(pos.fen())
+        if len(calls) == 1:
+            release.wait(5)
+            return {'move': 'e7e5'}
+        return {'move': 'd7d5'}
+
+    def listener(game_id, event, data):
+        events.append((event, data.get('move')))
+        if event == 'bot':
+            done.set()
+
+    manager = SessionManager(bot=bot, listener=listener, bot_threads=1)
+    try:
+        game = manager.create(mode='bot')
+        manager.play(game.id, "e2e4")
+        manager.undo(game.id)
+        manager.play(game.id, "d2d4")
+        release.set()
+        assert done.wait(5)
+        assert _moves(manager, game.id) == ["d2d4", "d7d5"]
+        assert [e for e in events if e[0] == 'bot'] == [('bot', 'd7d5')]
+    finally:
+        manager.close()
+
+
+def test_clock_flag_ends_game():
+    ended = threading.Event()
+    results = []
+
+    def listener(game_id, event, data):
+        if event == 'end':
+            results.append((data['result'], data['termination']))
+            ended.set()
+
+    manager = SessionManager(listener=listener, bot_threads=0)
+    try:
+        game = manager.create(time_control=0.05)
+        assert ended.wait(5)
+        assert results == [('0-1', 'time forfeit')]
+        with pytest.raises(SessionError):
+            manager.play(game.id, "e2e4")
+        assert manager.metrics()['time_forfeits'] == 1
+    finally:
+        manager.close()
+
+
+def test_undo_restores_the_clock():
+    manager = SessionManager(bot_threads=0)
+    try:
+        game = manager.create(time_control=60, increment=5)
+        manager.play(game.id, "e2e4")
+        manager.play(game.id, "e7e5")
+        manager.undo(game.id, 2)
+        state = manager.state(game.id)['clock']
+        assert state['black_ms'] == 60000 and 59000 < state['white_ms'] <= 60000
+        assert len(manager.timings(game.id)['moves']) == 0
+    finally:
+        manager.close()
@@ -0,0 +1,39 @@
+import pytest
+
+from engine import Position, generate_tablebase, move_to_uci
+from engine.tablebase import HEADER, decode
+
+
+@pytest.fixture(scope="module")
+def tablebases(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("tablebases"))
+    tables = generate_tablebase("KQvK", directory, out=None)
+    generate_tablebase("KRvK", directory, tables, out=None)
+    yield tables
+    tables.close()
+
+
+def _longest(table):
+    data = table.data[HEADER.size:HEADER.size + 2 * table.spec.size]
+    return max(decode(code)[1] for code in set(data))
+
+
+def test_tablebase_longest_mates(tablebases):
+    # KQvK mates in at most 10 moves, KRvK in 16; the side to move loses one ply later
+    assert _longest(tablebases.tables["KQvK"]) == 20
+    assert _longest(tablebases.tables["KRvK"]) == 32
+
+
+@pytest.mark.parametrize("fen, value", [
+    ("k7/8/1K6/8/8/8/7Q/8 w - - 0 1", (1, 1)),   # Qh8 mates
+    ("8/8/8/3k4/8/8/8/KR6 w - - 0 1", (1, 29)),
+    ("8/8/8/3k4/8/8/8/KR6 b - - 0 1", (-1, 30)),
+    ("8/8/8/3k4/8/8/8/K7 w - - 0 1", (0, 0)),      # bare kings: draw
+])
+def test_tablebase_values(tablebases, fen, value):
+    assert decode(tablebases.probe(Position(fen))) == value
+
+
+def test_tablebase_best_move_mates(tablebases):
+    move, wdl, plies = tablebases.best_move(Position("k7/8/1K6/8/8/8/7Q/8 w - - 0 1"))
+    assert (move_to_uci(move), wdl, plies) == ("h2h8", 1, 1)
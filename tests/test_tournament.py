@@ -0,0 +1,58 @@
+import io
+
+import pytest
+
+from tournament import MatchStats, elo_from_score, load_openings, parse_player
+
+
+def _stats(wins, draws, losses, **kw):
+    stats = MatchStats(**kw)
+    for score, n in ((1, wins), (0.5, draws), (0, losses)):
+        for _ in range(n):
+            stats.add(score)
+    return stats
+
+
+def test_elo_from_score():
+    assert elo_from_score(0.5) == 0.0
+    assert elo_from_score(0.75) == pytest.approx(190.85, abs=0.01)
+    assert elo_from_score(0.25) == pytest.approx(-190.85, abs=0.01)
+    assert elo_from_score(1.0) > 2000  # clamped, not infinite
+
+
+def test_elo_and_error():
+    elo, error = _stats(60, 20, 20).elo()
+    assert elo == pytest.approx(elo_from_score(0.7))
+    assert 0 < error < elo
+    assert MatchStats().elo() == (0.0, float('inf'))
+
+
+def test_sprt_accepts_clear_improvement():
+    stats = _stats(600, 200, 400)
+    assert stats.llr() >= stats.upper and stats.sprt() == 'H1'
+
+
+def test_sprt_rejects_regression():
+    stats = _stats(400, 200, 600)
+    assert stats.llr() <= stats.lower and stats.sprt() == 'H0'
+
+
+def test_sprt_undecided_on_even_score():
+    assert _stats(10, 10, 10).sprt() is None
+    assert _stats(0, 10, 0).llr() == 0.0  # no variance yet
+
+
+def test_parse_player():
+    player = parse_player("new:level=2,style=aggressive,tc=10+0.1", levels={2: 3})
+    assert (player.name, player.depth, player.style, player.base, player.increment) == ("new", 3, "aggressive", 10.0, 0.1)
+    with pytest.raises(ValueError):
+        parse_player("x:style=reckless")
+    with pytest.raises(ValueError):
+        parse_player("x:level=9", levels={1: 1})
+
+
+def test_load_openings_from_pgn_and_fen():
+    openings = load_openings(io.StringIO('[Result "*"]\n\n1. e4 e5 2. Nf3 Nc6 3. Bb5 *\n'), plies=3)
+    assert len(openings) == 1 and openings[0][1] == ["e2e4", "e7e5", "g1f3"]
+    fen = "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1"
+    assert load_openings(io.StringIO(fen + "\n")) == [(fen, [])]
@@ -0,0 +1,313 @@
+"""Headless self-play between engine configurations.
+
+Two players (level/depth, style, time control) play an opening suite on
+a process pool, each opening once with either colour. Results are
+reported from the first player's point of view: Elo difference with a
+95% confidence interval and, optionally, a sequential probability
+ratio test that stops the match as soon as it is decided. Every side
+also reports its average nodes per second and time per move, so a
+change can be weighed by strength and by cost.
+"""
+
+import math
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+
+from engine import (
+    Position, Searcher, Tablebases, STYLES, START_FEN, allocate_time, move_to_uci,
+)
+from pgn import PgnReader
+
+MAX_PLIES = 400  # longer games are adjudicated drawn
+TIME_CONTROL_DEFAULT = (10.0, 0.1)
+
+# A small, balanced default suite (UCI moves from the start position)
+DEFAULT_OPENINGS = [
+    "e2e4 e7e5 g1f3 b8c6 f1b5 a7a6",
+    "e2e4 c7c5 g1f3 d7d6 d2d4 c5d4",
+    "e2e4 e7e6 d2d4 d7d5 b1c3 g8f6",
+    "e2e4 c7c6 d2d4 d7d5 e4e5 c8f5",
+    "d2d4 d7d5 c2c4 e7e6 b1c3 g8f6",
+    "d2d4 g8f6 c2c4 g7g6 b1c3 f8g7",
+    "d2d4 g8f6 c2c4 e7e6 g1f3 b7b6",
+    "c2c4 e7e5 b1c3 g8f6 g1f3 b8c6",
+    "g1f3 d7d5 g2g3 g8f6 f1g2 c7c6",
+    "e2e4 e7e5 g1f3 g8f6 f3e5 d7d6",
+]
+
+Player = namedtuple('Player', 'name depth style base increment movetime nodes hash_mb')
+
+
+def parse_player(spec, levels=None):
+    """Player from ``name:key=value,...``.
+
+    Keys: level (looked up in `levels`), depth, style, tc (``base+inc`` in
+    seconds), movetime, nodes, hash. Without tc or movetime the player
+    uses the default time control.
+    """
+    name, _, options = spec.partition(':') if ':' in spec else ('', '', spec)
+    values = dict(depth=64, style='standard', base=None, increment=0.0, movetime=None, nodes=None, hash_mb=16)
+    for item in filter(None, options.split(',')):
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Expected key=value in {spec!r}")
+        if key == 'level':
+            if not levels or int(value) not in levels:
+                raise ValueError(f"Unknown level {value!r}")
+            values['depth'] = levels[int(value)]
+        elif key == 'depth':
+            values['depth'] = int(value)
+        elif key == 'style':
+            if value not in STYLES:
+                raise ValueError(f"Unknown style {value!r} (one of {', '.join(STYLES)})")
+            values['style'] = value
+        elif key == 'tc':
+            base, _, inc = value.partition('+')
+            values['base'], values['increment'] = float(base), float(inc or 0)
+        elif key == 'movetime':
+            values['movetime'] = float(value)
+        elif key == 'nodes':
+            values['nodes'] = int(value)
+        elif key == 'hash':
+            values['hash_mb'] = int(value)
+        else:
+            raise ValueError(f"Unknown option {key!r} in {spec!r}")
+    if values['base'] is None and values['movetime'] is None:
+        values['base'], values['increment'] = TIME_CONTROL_DEFAULT
+    return Player(name or options or 'engine', **values)
+
+
+# --- Openings ---
+
+def load_openings(lines, plies=8):
+    """(fen, uci moves) openings from a PGN stream or from FEN/EPD lines."""
+    lines = list(lines)
+    if any(line.lstrip().startswith('[') for line in lines[:50]):
+        return [(game.fen, game.moves[:plies]) for game in PgnReader(lines)]
+    openings = []
+    for line in lines:
+        fields = line.split(';')[0].split()
+        if not fields or fields[0][0] == '#':
+            continue
+        # EPD lines carry operations instead of move counters
+        counters = fields[4:6] if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit() else ['0', '1']
+        fen = ' '.join(fields[:4] + counters)
+        try:
+            Position(fen)
+        except (ValueError, KeyError, IndexError):
+            raise ValueError(f"Invalid opening position: {line.strip()!r}")
+        openings.append((fen, []))
+    return openings
+
+
+def default_openings():
+    return [(None, line.split()) for line in DEFAULT_OPENINGS]
+
+
+# --- Playing ---
+
+def play_game(job):
+    """Play one game; returns a result dict with per-side search statistics."""
+    number, fen, opening, white, black, tb_path = job
+    tablebases = Tablebases(tb_path) if tb_path and os.path.isdir(tb_path) else None
+    players = (white, black)
+    searchers = [Searcher(hash_mb=p.hash_mb, style=p.style, tablebases=tablebases) for p in players]
+    clocks = [p.base for p in players]
+    stats = [{'moves': 0, 'nodes': 0, 'time': 0.0} for _ in players]
+    pos = Position(fen or START_FEN)
+    moves = []
+    for uci in opening:
+        pos.push_uci(uci)
+        moves.append(uci)
+    seen = {pos.hash: 1}
+    result, termination = '1/2-1/2', 'adjudication'
+    while len(moves) < MAX_PLIES:
+        legal = pos.legal_moves()
+        if not legal:
+            if pos.in_check():
+                result, termination = ('0-1', '1-0')[pos.side == 1], 'checkmate'
+            else:
+                termination = 'stalemate'
+            break
+        if pos.halfmove >= 100:
+            termination = '50-move rule'
+            break
+        if seen.get(pos.hash, 0) >= 3:
+            termination = 'repetition'
+            break
+        if pos.is_insufficient_material():
+            termination = 'insufficient material'
+            break
+        side = pos.side
+        player = players[side]
+        if player.movetime is not None:
+            soft = hard = player.movetime
+        else:
+            soft, hard = allocate_time(clocks[side], player.increment)
+        start = time.monotonic()
+        found = searchers[side].think(pos, max_depth=player.depth, soft_time=soft, hard_time=hard,
+                                      max_nodes=player.nodes)
+        elapsed = time.monotonic() - start
+        stats[side]['moves'] += 1
+        stats[side]['nodes'] += found.nodes
+        stats[side]['time'] += elapsed
+        if player.movetime is None:
+            clocks[side] -= elapsed
+            if clocks[side] < 0:
+                result, termination = ('0-1', '1-0')[side == 1], 'time forfeit'
+                break
+            clocks[side] += player.increment
+        move = found.move if found.move is not None else legal[0]
+        pos.make(move)
+        moves.append(move_to_uci(move))
+        seen[pos.hash] = seen.get(pos.hash, 0) + 1
+    return {
+        'game': number, 'white': white.name, 'black': black.name, 'fen': fen,
+        'moves': moves, 'result': result, 'termination': termination, 'stats': stats,
+    }
+
+
+# --- Statistics ---
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1) + 0.0  # avoid printing -0.0
+
+
+def _score_from_elo(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+class MatchStats:
+    """Wins/draws/losses of the first player and the derived estimates."""
+
+    def __init__(self, elo0=0.0, elo1=5.0, alpha=0.05, beta=0.05):
+        self.wins = self.draws = self.losses = 0
+        self.elo0, self.elo1 = elo0, elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+    def add(self, score):
+        if score == 1:
+            self.wins += 1
+        elif score == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def score(self):
+        return (self.wins + 0.5 * self.draws) / self.games if self.games else 0.5
+
+    def _variance(self):
+        # Per-game variance of the score (trinomial)
+        s, n = self.score(), self.games
+        return (self.wins * (1 - s) ** 2 + self.draws * (0.5 - s) ** 2 + self.losses * s ** 2) / n
+
+    def elo(self):
+        """(elo, error) with the half-width of the 95% interval."""
+        if not self.games:
+            return 0.0, float('inf')
+        s = self.score()
+        margin = 1.96 * math.sqrt(self._variance() / self.games)
+        low, high = elo_from_score(s - margin), elo_from_score(s + margin)
+        return elo_from_score(s), (high - low) / 2
+
+    def llr(self):
+        """Log-likelihood ratio of H1 (elo1) against H0 (elo0), normal approximation."""
+        if not self.games:
+            return 0.0
+        var = self._variance()
+        if var == 0:
+            return 0.0
+        s0, s1 = _score_from_elo(self.elo0), _score_from_elo(self.elo1)
+        return self.games * (s1 - s0) * (2 * self.score() - s0 - s1) / (2 * var)
+
+    def sprt(self):
+        """'H1' or 'H0' once the test is decided, else None."""
+        llr = self.llr()
+        if llr >= self.upper:
+            return 'H1'
+        if llr <= self.lower:
+            return 'H0'
+        return None
+
+
+class Tournament:
+    """A match between two players over an opening suite, on `workers` processes."""
+
+    def __init__(self, first, second, openings=None, games=None, workers=None, tb_path=None,
+                 elo0=0.0, elo1=5.0):
+        if first.name == second.name:
+            raise ValueError(f"Both players are named {first.name!r}")
+        self.players = (first, second)
+        self.openings = openings or default_openings()
+        self.total = games or 2 * len(self.openings)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.tb_path = tb_path
+        self.stats = MatchStats(elo0, elo1)
+        self.side_stats = {p.name: {'moves': 0, 'nodes': 0, 'time': 0.0} for p in self.players}
+        self.started = None
+
+    def jobs(self):
+        # Each opening is played twice, colours reversed
+        first, second = self.players
+        for number in range(self.total):
+            fen, moves = self.openings[(number // 2) % len(self.openings)]
+            white, black = (first, second) if number % 2 == 0 else (second, first)
+            yield number + 1, fen, moves, white, black, self.tb_path
+
+    def record(self, game):
+        first = self.players[0].name
+        points = {'1-0': 1.0, '0-1': 0.0}.get(game['result'], 0.5)
+        self.stats.add(points if game['white'] == first else 1 - points)
+        for name, side in zip((game['white'], game['black']), game['stats']):
+            for key in ('moves', 'nodes', 'time'):
+                self.side_stats[name][key] += side[key]
+
+    def run(self, sprt=False):
+        """Yield each finished game; stops early when `sprt` and the test is decided."""
+        self.started = time.perf_counter()
+        if self.workers == 1:
+            for job in self.jobs():
+                game = play_game(job)
+                self.record(game)
+                yield game
+                if sprt and self.stats.sprt():
+                    return
+            return
+        pool = multiprocessing.get_context().Pool(self.workers)
+        try:
+            for game in pool.imap_unordered(play_game, self.jobs()):
+                self.record(game)
+                yield game
+                if sprt and self.stats.sprt():
+                    return
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def summary(self):
+        """Report lines: score, Elo, SPRT state and cost per side."""
+        s = self.stats
+        elo, error = s.elo()
+        first, second = self.players
+        lines = [
+            f"{first.name} vs {second.name}: +{s.wins} ={s.draws} -{s.losses} "
+            f"({s.score() * 100:.1f}% of {s.games} games)",
+            f"Elo difference: {elo:+.1f} +/- {error:.1f} (95%)",
+            f"SPRT [{s.elo0:g}, {s.elo1:g}]: LLR {s.llr():.2f} [{s.lower:.2f}, {s.upper:.2f}]"
+            + (f" -> {s.sprt()} accepted" if s.sprt() else ""),
+        ]
+        for name, side in self.side_stats.items():
+            nps = side['nodes'] / side['time'] if side['time'] else 0.0
+            per_move = side['time'] / side['moves'] * 1000 if side['moves'] else 0.0
+            lines.append(f"{name}: {nps:.0f} nodes/s, {per_move:.0f} ms/move over {side['moves']} moves")
+        if self.started is not None:
+            lines.append(f"Wall time {time.perf_counter() - self.started:.1f}s on {self.workers} processes")
+        return lines